@@ -8,20 +8,39 @@ from typing import Any, Iterable, Optional
 import uuid
 
 from top_loras import cache as tl_cache
-import fetch_top_models as fetch_module
+from top_loras import fetcher as fetch_module
 from top_loras.download import sanitize_filename
+from top_loras import api as tl_api
+from top_loras import gallery as tl_gallery
+from top_loras.refresh import REFRESHES
+from top_loras.search import FACETS
 from ui.loaders import (
+    DEFAULT_PAGE_SIZE,
+    PAGE_SIZE_CHOICES,
+    card_page,
+    facet_choices,
     get_cache_path,
-    load_results_from_cache,
-    sanitize_models,
+    gallery_page,
+    page_label,
     render_markdown_for_models,
+    resolve_models,
     _tasks_from_presets,
 )
 
-try:
-    import gradio as gr
-except Exception:  # pragma: no cover - optional UI dependency
-    gr = None
+# gradio is imported by build_ui(), not at module import, so importing this
+# module (workers, tests, tooling) stays cheap.
+gr = None
+
+
+def _load_gradio():
+    global gr
+    if gr is None:
+        try:
+            import gradio as _gradio
+        except Exception:  # pragma: no cover - optional UI dependency
+            return None
+        gr = _gradio
+    return gr
 
 
 def _safe_update(**kwargs):
@@ -31,17 +50,45 @@ def _safe_update(**kwargs):
 
 
 _PLACEHOLDER_DATA_URI = (
-    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAAWgmWQ0AAAAASUVORK5CYII="
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNgYGBgAAAABQABeqhXUAAAAABJRU5ErkJggg=="
 )
 
-
-
-
-
-def build_ui() -> None:
-    if gr is None:
+SORT_CHOICES = [
+    ("Downloads", "downloads"),
+    ("Likes", "likes"),
+    ("Recently updated", "updated_at"),
+    # composite ranking profiles (top_loras.ranking), re-ranked from the cache
+    ("Popular (downloads + likes)", "popular"),
+    ("Trending (popular + recent)", "trending"),
+    ("Fresh", "fresh"),
+]
+# Gallery tiles are selectable; Cards add stats, aspect-ratio boxes and LQIP placeholders
+VIEW_CHOICES = [("Gallery", "gallery"), ("Cards", "cards")]
+FACET_LABELS = {
+    "base_models": "Base model",
+    "tags_en": "Tags",
+    "vision_foundation": "Foundation",
+    "author": "Author",
+}
+
+
+def build_ui(concurrency: Optional[dict[str, Any]] = None, queue_size: Optional[int] = None, **launch_kwargs) -> None:
+    """Build and launch the UI.
+
+    ``concurrency`` overrides per-event-type queue limits (see ui.serving);
+    ``launch_kwargs`` go to ``demo.launch`` (e.g. server_name, server_port).
+    """
+    if _load_gradio() is None:
         print("Gradio is not installed. Run `pip install gradio` to launch the UI.")
         return
+    from ui import serving
+
+    limits = serving.concurrency_limits(concurrency)
+    # cheap browsing events share one high limit; generate/refresh get their own queues
+    select_kw = {"concurrency_limit": limits["select"], "concurrency_id": "select"}
+    fetch_module.configure_logging()
+    # .env provides MODELSCOPE_API_TOKEN for generation as well as refreshes
+    tl_api.load_env()
 
     tasks = _tasks_from_presets()
     default_task = "text-to-image-synthesis"
@@ -53,9 +100,7 @@ def build_ui() -> None:
         initial_task = default_task
 
     cache_file = get_cache_path(initial_task, per_task_cache=True)
-    initial_models = load_results_from_cache(cache_file)
-    initial_norm, initial_gallery = sanitize_models(initial_models)
-    initial_gallery_ui = [(item.get("cover"), item.get("title")) for item in initial_gallery]
+    initial_gallery_ui, initial_page = gallery_page(cache_file, page=0, page_size=DEFAULT_PAGE_SIZE)
 
     with gr.Blocks(css="body { background: #0f1117; }") as demo:
         with gr.Row(elem_id="tl-header", variant="panel"):
@@ -77,6 +122,7 @@ def build_ui() -> None:
                         )
                         per_task_cb = gr.Checkbox(value=True, label="Per-task cache")
                         refresh_btn = gr.Button("Refresh Cache")
+                        refresh_status = gr.Markdown("")
                         gr.Markdown(
                             "Refresh fetches the selected task from ModelScope, updates the "
                             "local cache, and downloads covers when available."
@@ -84,6 +130,24 @@ def build_ui() -> None:
                         selected_md = gr.HTML("<div><strong>Selected model:</strong> None</div>")
                         selected_state = gr.State(value=None)
                     with gr.Column(scale=9):
+                        with gr.Row():
+                            search_tb = gr.Textbox(
+                                placeholder="Search titles and trigger words",
+                                show_label=False,
+                                scale=4,
+                            )
+                            sort_dd = gr.Dropdown(choices=SORT_CHOICES, value="downloads", label="Sort by", scale=1)
+                            view_radio = gr.Radio(choices=VIEW_CHOICES, value="gallery", label="View", scale=1)
+                        with gr.Row():
+                            facet_dds = [
+                                gr.Dropdown(
+                                    choices=facet_choices(cache_file, facet),
+                                    value=[],
+                                    multiselect=True,
+                                    label=FACET_LABELS[facet],
+                                )
+                                for facet in FACETS
+                            ]
                         gallery = gr.Gallery(
                             label="Top LoRAs",
                             value=initial_gallery_ui or None,
@@ -92,7 +156,21 @@ def build_ui() -> None:
                             elem_id="tl_gallery",
                             height=520,
                         )
-                        models_state = gr.State(value=initial_norm)
+                        # Cards view of the same page; select models from the Gallery view
+                        cards_html = gr.HTML(value="", visible=False)
+                        with gr.Row():
+                            prev_btn = gr.Button("◀ Prev", size="sm")
+                            page_md = gr.Markdown(page_label(initial_page))
+                            next_btn = gr.Button("Next ▶", size="sm")
+                            page_size_dd = gr.Dropdown(
+                                choices=PAGE_SIZE_CHOICES,
+                                value=DEFAULT_PAGE_SIZE,
+                                label="Per page",
+                                scale=0,
+                            )
+                        # Only paging info + the visible page's model keys; full
+                        # records are resolved server-side (ui.loaders store).
+                        page_state = gr.State(value=initial_page)
 
             with gr.TabItem("Generate"):
                 with gr.Row():
@@ -121,51 +199,175 @@ def build_ui() -> None:
                         job_status = gr.Markdown("")
                         last_job_file = gr.Textbox(label="Job File", value="", interactive=False, visible=False)
 
-        def _models_for_dropdown(task_value, per_task_enabled, token):
+        def _show_page(cache_file, page, page_size, query=None, view="gallery"):
+            ui_items, state = gallery_page(cache_file, page=page, page_size=page_size, query=query)
+            state["view"] = view
+            # the card grid is only rendered while the Cards view is shown
+            cards = card_page(state) if view == "cards" else ""
+            return _safe_update(value=ui_items), state, page_label(state), _safe_update(value=cards)
+
+        page_outputs = [gallery, page_state, page_md, cards_html]
+
+        def _facet_updates(cache_file, reset):
+            updates = []
+            for facet in FACETS:
+                kwargs = {"choices": facet_choices(cache_file, facet)}
+                if reset:
+                    kwargs["value"] = []
+                updates.append(_safe_update(**kwargs))
+            return updates
+
+        def _models_for_dropdown(task_value, per_task_enabled, token, page_size, view="gallery"):
             sel = task_value or None
             cache_file = get_cache_path(sel, per_task_cache=per_task_enabled)
-            models = load_results_from_cache(cache_file)
-            norm, gallery_items = sanitize_models(models)
-            # Gallery now expects a list of dicts with keys
-            # {"cover": ..., "title": ...}. We only expose these two
-            # to the UI; idx/id 仍保留在 item 中供回调使用。
-            ui_items = [(item.get("cover"), item.get("title")) for item in gallery_items]
-            return _safe_update(value=ui_items), norm
+            # a new leaderboard starts from an unfiltered view
+            return (*_show_page(cache_file, 0, page_size, view=view), "", "downloads",
+                    *_facet_updates(cache_file, reset=True))
 
         task_dd.change(
             fn=_models_for_dropdown,
-            inputs=[task_dd, per_task_cb, token_state],
-            outputs=[gallery, models_state],
+            inputs=[task_dd, per_task_cb, token_state, page_size_dd, view_radio],
+            outputs=[*page_outputs, search_tb, sort_dd, *facet_dds],
+            **select_kw,
         )
 
-        def _refresh_cache(task_value, per_task_enabled, token):
+        def _apply_query(state, text, sort, *facet_values):
+            state = state or initial_page
+            query = {
+                "text": text or "",
+                "sort": sort or "downloads",
+                "filters": {facet: list(values or []) for facet, values in zip(FACETS, facet_values)},
+            }
+            return _show_page(state["cache_file"], 0, state["page_size"], query, state.get("view", "gallery"))
+
+        # queries hit the in-memory index, so they can run on every keystroke
+        query_inputs = [page_state, search_tb, sort_dd, *facet_dds]
+        for component in (search_tb, sort_dd, *facet_dds):
+            component.change(fn=_apply_query, inputs=query_inputs, outputs=page_outputs, **select_kw)
+
+        def _turn_page(state, delta):
+            state = state or initial_page
+            return _show_page(state["cache_file"], state["page"] + delta, state["page_size"], state.get("query"),
+                              state.get("view", "gallery"))
+
+        prev_btn.click(fn=lambda state: _turn_page(state, -1), inputs=[page_state], outputs=page_outputs, **select_kw)
+        next_btn.click(fn=lambda state: _turn_page(state, 1), inputs=[page_state], outputs=page_outputs, **select_kw)
+
+        def _change_page_size(state, page_size):
+            state = state or initial_page
+            # keep the first visible model on screen when the page size changes
+            first = state["page"] * state["page_size"]
+            return _show_page(state["cache_file"], first // max(1, int(page_size)), page_size, state.get("query"),
+                              state.get("view", "gallery"))
+
+        page_size_dd.change(fn=_change_page_size, inputs=[page_state, page_size_dd], outputs=page_outputs,
+                            **select_kw)
+
+        def _change_view(state, view):
+            state = {**(state or initial_page), "view": view}
+            if view != "cards":
+                cards = ""
+            elif state.get("preview"):
+                # a refresh in progress: render the partial results it has streamed
+                cards = render_markdown_for_models(_preview_results(state))
+            else:
+                cards = card_page(state)
+            return (_safe_update(visible=view != "cards"), _safe_update(visible=view == "cards", value=cards), state)
+
+        view_radio.change(fn=_change_view, inputs=[page_state, view_radio], outputs=[gallery, cards_html, page_state],
+                          **select_kw)
+
+        def _preview(results, job, cache_file, page_size, view="gallery"):
+            """Gallery items + page state for a refresh still in progress."""
+            keys, items = [], []
+            for idx, model in enumerate((results or [])[:max(1, int(page_size or DEFAULT_PAGE_SIZE))]):
+                card = tl_gallery.normalize_model(model, idx)
+                keys.append(str(card.get("id") or f"#{idx}"))
+                items.append((card["cover"] or _PLACEHOLDER_DATA_URI, card["title"]))
+            state = {
+                # paging/search during a refresh falls back to the current cache
+                "cache_file": cache_file,
+                "preview": list(job.key),
+                "query": None,
+                "page": 0,
+                "page_size": page_size,
+                "pages": 1,
+                "total": len(items),
+                "keys": keys,
+                "view": view,
+            }
+            return items, state
+
+        def _preview_results(state):
+            """Raw records behind a preview page state (the running refresh's latest results)."""
+            job = REFRESHES.get(*state["preview"])
+            results = next((e["results"] for e in reversed(job.events) if "results" in e), []) if job else []
+            return results[:len(state["keys"])]
+
+        def _progress_text(event):
+            stage = event.get("stage")
+            if stage == "listing":
+                return f"Fetching listing page {event['page']} ({event['models']} models so far)…"
+            if stage == "ranked":
+                return f"Ranked {len(event['results'])} models, downloading covers…"
+            if stage == "covers":
+                return f"Downloading covers {event['done']}/{event['total']}…"
+            if stage == "waiting":
+                return "Another worker is refreshing this task, waiting for it…"
+            return "Saving cache…"
+
+        def _refresh_and_update(task_value, per_task_enabled, token, page_size, state):
+            """Run the refresh in the background and stream progress into the gallery.
+
+            Clicks for a (task, per-task cache) that is already refreshing join
+            the running job instead of starting another crawl.
+            """
             if token:
                 os.environ["MODELSCOPE_API_TOKEN"] = token
-            try:
-                results = fetch_module.fetch_top_loras(
-                    force_refresh=True,
-                    task=task_value,
-                    per_task_cache=per_task_enabled,
-                    download_images=True,
-                    debug=False,
-                )
-            except Exception as exc:  # pragma: no cover - UI message only
-                return f"<div class='empty'>Refresh failed: {exc}</div>"
-            return render_markdown_for_models(results)
-
-        def _refresh_and_update(task_value, per_task_enabled, token):
-            _refresh_cache(task_value, per_task_enabled, token)
             sel = task_value or None
             cache_file = get_cache_path(sel, per_task_cache=per_task_enabled)
-            models = load_results_from_cache(cache_file)
-            norm, gallery_items = sanitize_models(models)
-            ui_items = [(item.get("cover"), item.get("title")) for item in gallery_items]
-            return _safe_update(value=ui_items), norm
+            job, started = REFRESHES.start(sel, per_task_enabled, download_images=True, debug=False)
+            # gallery/page state/label untouched, facets untouched
+            view = (state or {}).get("view", "gallery")
+            head = (_safe_update(), state, _safe_update(), _safe_update())
+            facets = [_safe_update() for _ in FACETS]
+            yield (*head, "Refresh started…" if started else "Joined the refresh already running…", *facets)
+
+            since, results = 0, None
+            while True:
+                events, done = job.wait_events(since, timeout=1.0)
+                since += len(events)
+                if events:
+                    for event in events:
+                        results = event.get("results", results)
+                    status = _progress_text(events[-1])
+                    if results:
+                        items, preview_state = _preview(results, job, cache_file, page_size, view)
+                        cards = (_safe_update(value=render_markdown_for_models(results[:len(items)]))
+                                 if view == "cards" else _safe_update())
+                        yield (_safe_update(value=items), preview_state, page_label(preview_state), cards, status,
+                               *facets)
+                    else:
+                        yield (*head, status, *facets)
+                if done:
+                    break
+
+            # the cache file changed, so the store and search index rebuild here;
+            # the active query is re-run against the fresh leaderboard
+            query = (state or {}).get("query") if (state or {}).get("cache_file") == cache_file else None
+            gallery_update, new_state, label, cards_update = _show_page(cache_file, 0, page_size, query, view)
+            if job.error:
+                status = f"Refresh failed: {job.error}"
+            else:
+                status = f"Refreshed {len(job.results or [])} models in {job.finished_at - job.started_at:.1f}s"
+            yield (gallery_update, new_state, label, cards_update, status, *_facet_updates(cache_file, reset=False))
 
         refresh_btn.click(
             fn=_refresh_and_update,
-            inputs=[task_dd, per_task_cb, token_state],
-            outputs=[gallery, models_state],
+            inputs=[task_dd, per_task_cb, token_state, page_size_dd, page_state],
+            outputs=[*page_outputs, refresh_status, *facet_dds],
+            concurrency_limit=limits["refresh"],
+            concurrency_id="refresh",
         )
 
         def _load_initial():
@@ -187,24 +389,54 @@ def build_ui() -> None:
         from top_loras.inference import submit_job
         from ui.callbacks import on_gallery_select, do_generate
 
-        # When a gallery item is selected, Gradio passes the selected
-        # item value, which we configured as [cover, title]. We only use
-        # the title here to look up the full model from models_state.
+        # Gallery indices are relative to the visible page, so resolve that
+        # page's full records by key from the server-side store.
+        def _on_select(state, evt: gr.SelectData):
+            state = state or initial_page
+            if state.get("preview"):
+                # partial results of a running refresh are not in the store yet
+                models = [tl_gallery.normalize_model(m, idx) for idx, m in enumerate(_preview_results(state))]
+            else:
+                models = resolve_models(state["cache_file"], state["keys"])
+            return on_gallery_select(evt, models)
+
         gallery.select(
-            fn=on_gallery_select,
-            inputs=[models_state],
+            fn=_on_select,
+            inputs=[page_state],
             outputs=[selected_md, selected_state, gen_model_info, selected_id_display],
-            queue=False,
+            **select_kw,
         )
 
         generate_btn.click(
             fn=do_generate,
             inputs=[selected_state, selected_id_display, prompt, neg_prompt, size_text, steps, guidance, seed, api_model_override, token_state],
             outputs=[out_image, job_status, last_job_file, results_gallery],
+            concurrency_limit=limits["generate"],
+            concurrency_id="generate",
         )
 
-        demo.launch()
+        demo.queue(default_concurrency_limit=limits["select"], max_size=serving.queue_size(queue_size))
+        demo.launch(**launch_kwargs)
+
+
+def main(argv=None) -> None:
+    import argparse
+
+    from ui import serving
+
+    parser = argparse.ArgumentParser(description="Serve the Top-LoRAs UI")
+    parser.add_argument("--host", default=serving.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=serving.DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes on consecutive ports")
+    for event in serving.EVENT_TYPES:
+        parser.add_argument(f"--{event}-concurrency", type=int, default=None,
+                            help=f"Concurrent {event} events per worker (default {serving.DEFAULT_CONCURRENCY[event]})")
+    parser.add_argument("--queue-size", type=int, default=None, help="Max queued events per worker")
+    args = parser.parse_args(argv)
+    concurrency = {event: getattr(args, f"{event}_concurrency") for event in serving.EVENT_TYPES}
+    serving.serve(workers=args.workers, host=args.host, port=args.port, concurrency=concurrency,
+                  max_queue=args.queue_size)
 
 
 if __name__ == "__main__":
-    build_ui()
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark the fetch pipeline stages on synthetic ModelScope payloads.
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # 1k, 10k, 100k items
+    python benchmarks/run_benchmarks.py --sizes 1000 --repeat 5
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/results/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/baseline.json --threshold 0.2
+
+Each stage is timed (best of --repeat runs) and then run once more under
+tracemalloc to record its peak allocation. With --baseline, stages whose
+throughput dropped or whose peak memory grew by more than --threshold are
+reported as regressions and the script exits with status 1.
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import generate_raw_models  # noqa: E402
+from top_loras import cache as tl_cache  # noqa: E402
+from top_loras import filter as tl_filter  # noqa: E402
+from top_loras import parser as tl_parser  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_LIMIT = 20
+
+
+def _stages(raw, tmp_dir):
+    """Return [(stage_name, callable)] closures sharing precomputed inputs."""
+    processed = tl_filter.process_models(raw)
+    cache_file = str(Path(tmp_dir) / 'bench_cache.json')
+    tl_cache.save_cache(cache_file, processed)
+
+    stages = [
+        ('process_models', lambda: tl_filter.process_models(raw)),
+        ('parse_model_entry', lambda: [tl_parser.parse_model_entry(i) for i in raw]),
+        ('deduplicate_models', lambda: tl_filter.deduplicate_models(processed, DEFAULT_LIMIT)),
+        ('save_cache', lambda: tl_cache.save_cache(cache_file, processed)),
+        ('load_cache', lambda: tl_cache.load_cache(cache_file, ttl=10 ** 9)),
+    ]
+    try:
+        from ui.loaders import sanitize_models
+    except Exception as e:  # pragma: no cover - UI package optional
+        print(f"  (skipping sanitize_models: {e})")
+    else:
+        stages.append(('sanitize_models', lambda: sanitize_models(processed)))
+    return stages
+
+
+def run(sizes, repeat=3, seed=0):
+    """Run every stage at every size; returns {size: {stage: stats}}."""
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            raw = generate_raw_models(size, seed=seed)
+            print(f"== {size} items")
+            per_stage = {}
+            for name, fn in _stages(raw, tmp_dir):
+                best = float('inf')
+                for _ in range(max(1, repeat)):
+                    started = time.perf_counter()
+                    fn()
+                    best = min(best, time.perf_counter() - started)
+                tracemalloc.start()
+                fn()
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                stats = {
+                    'seconds': best,
+                    'items_per_sec': size / best if best > 0 else float('inf'),
+                    'peak_bytes': peak,
+                }
+                per_stage[name] = stats
+                print(f"  {name:<20} {best * 1000:10.2f} ms  {stats['items_per_sec']:12.0f} items/s  "
+                      f"peak {peak / 1024 / 1024:8.2f} MiB")
+            report[str(size)] = per_stage
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Return a list of human-readable regressions against `baseline`."""
+    regressions = []
+    for size, stages in report.items():
+        base_stages = baseline.get(size) or {}
+        for name, stats in stages.items():
+            base = base_stages.get(name)
+            if not base:
+                continue
+            if base['items_per_sec'] and stats['items_per_sec'] < base['items_per_sec'] * (1 - threshold):
+                regressions.append(f"{name}@{size}: throughput {stats['items_per_sec']:.0f}/s "
+                                   f"vs baseline {base['items_per_sec']:.0f}/s")
+            if base['peak_bytes'] and stats['peak_bytes'] > base['peak_bytes'] * (1 + threshold):
+                regressions.append(f"{name}@{size}: peak memory {stats['peak_bytes']} B "
+                                   f"vs baseline {base['peak_bytes']} B")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Top-LoRAs pipeline stages')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None, help='Write the full report as JSON')
+    parser.add_argument('--save-baseline', type=str, default=None, help='Write this run as the new baseline')
+    parser.add_argument('--baseline', type=str, default=None, help='Compare against a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative regression (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, repeat=args.repeat, seed=args.seed)
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print('\nRegressions:')
+            for r in regressions:
+                print(f"  - {r}")
+            sys.exit(1)
+        print('\nNo regressions against baseline.')
+
+
+if __name__ == '__main__':
+    main()
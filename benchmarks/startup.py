@@ -0,0 +1,83 @@
+"""
+Startup-time benchmark for short-lived CLI / container invocations.
+
+Usage:
+    python benchmarks/startup.py [--runs 5]
+
+Each scenario runs in a fresh interpreter; the median wall time is reported
+together with the heavy third-party modules the scenario ended up importing
+(a cache-hit run should import none of them).
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ('modelscope', 'gradio', 'requests', 'dotenv', 'PIL', 'numpy', 'pyarrow')
+
+_REPORT = (
+    "import sys, json; "
+    "print('HEAVY=' + json.dumps(sorted(m for m in %r if m in sys.modules)))" % (HEAVY_MODULES,)
+)
+
+
+def _scenarios(cache_dir: Path):
+    cache_file = cache_dir / 'top_loras_text-to-image-synthesis.json'
+    return {
+        'import top_loras.cli': "import top_loras.cli",
+        'cli cache hit': (
+            "import contextlib, io; from top_loras import cli; "
+            "f = io.StringIO(); ctx = contextlib.redirect_stdout(f); ctx.__enter__(); "
+            f"cli.run_cli(['--task', 'text-to-image-synthesis', '--cache-file', {str(cache_file)!r}, '--ttl', '999999']); "
+            "ctx.__exit__(None, None, None)"
+        ),
+        'import app (UI module)': "import app",
+    }
+
+
+def _run(code: str) -> tuple:
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', f"{code}; {_REPORT}"], cwd=str(ROOT),
+                          capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip()[-500:])
+    heavy = []
+    for line in proc.stdout.splitlines():
+        if line.startswith('HEAVY='):
+            heavy = json.loads(line[len('HEAVY='):])
+    return elapsed, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure Top-LoRAs startup time')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+    from top_loras import cache as tl_cache
+
+    baseline, _ = _run('pass')
+    print(f"{'bare interpreter':<28} {baseline * 1000:8.1f} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        tl_cache.save_cache(str(tmp_dir / 'top_loras_text-to-image-synthesis.json'),
+                            [{'id': 'owner/model', 'title_en': 'model', 'downloads': 1}])
+        for name, code in _scenarios(tmp_dir).items():
+            try:
+                samples = [_run(code) for _ in range(max(1, args.runs))]
+            except RuntimeError as e:
+                print(f"{name:<28} failed: {e}")
+                continue
+            median = statistics.median(s[0] for s in samples)
+            heavy = samples[-1][1]
+            print(f"{name:<28} {median * 1000:8.1f} ms  heavy imports: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
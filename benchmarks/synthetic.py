@@ -0,0 +1,108 @@
+"""
+Synthetic ModelScope listing payloads for benchmarks.
+
+`generate_raw_models(n)` returns raw items shaped like the
+`/api/v1/dolphin/models` response (MuseInfo versions and cover images,
+OfficialTags, ModelInfos files, Organization, ...) with a realistic mix of
+LoRA and non-LoRA entries, Light/Distill variants and duplicate ids, so that
+every branch of `filter.process_models` and `parser.parse_model_entry` gets
+exercised. Output is deterministic for a given seed.
+"""
+import random
+from typing import Any, Dict, List
+
+_ORGS = ['DiffSynth-Studio', 'MAILAND', 'yiwanji', 'Qwen', 'AI-ModelScope', 'MusePublic', 'merjic', 'kook']
+_BASES = ['AI-ModelScope/FLUX.1-dev', 'Qwen/Qwen-Image', 'AI-ModelScope/stable-diffusion-v1-5',
+          'black-forest-labs/FLUX.1-Kontext-dev', 'Qwen/Qwen-Image-Edit']
+_FOUNDATIONS = ['FLUX_1', 'QWEN_IMAGE_20_B', 'SD_1_5', 'SD_XL', 'FLUX_1_KONTEXT']
+_TAGS = [('写实摄影', 'Photography'), ('人物加强', 'Character Enhancement'), ('女生', 'Woman'),
+         ('风格', 'Style'), ('动漫', 'Anime'), ('插画', 'Illustration'), ('建筑', 'Architecture'),
+         ('产品', 'Product'), ('国风', 'Chinese Style'), ('光影', 'Lighting')]
+_WORDS = ['portrait', 'anime', 'ink', 'cyber', 'film', 'retro', 'neon', 'clay', 'pixel', 'sketch',
+          'watercolor', 'tyndall', 'outpaint', 'highres', 'beauty', 'product', 'street', 'cinematic']
+_CN_WORDS = ['写实', '国风', '水墨', '胶片', '赛博', '光影', '少女', '建筑', '插画', '极致真实']
+
+
+def _name(rng: random.Random, idx: int) -> str:
+    parts = rng.sample(_WORDS, 2)
+    return f"{parts[0]}_{parts[1]}_{idx}"
+
+
+def _raw_item(rng: random.Random, idx: int, lora: bool, name: str) -> Dict[str, Any]:
+    org = rng.choice(_ORGS)
+    updated = 1_700_000_000 + rng.randint(0, 60_000_000)
+    foundation = rng.choice(_FOUNDATIONS)
+    tags = rng.sample(_TAGS, rng.randint(0, 4))
+    versions = []
+    for v in range(rng.randint(1, 3)):
+        versions.append({
+            'coverImages': [
+                {'url': f"https://www.modelscope.cn/models/{org}/{name}/resolve/master/_cover_images_/{idx}-{v}-{c}.png"}
+                for c in range(rng.randint(1, 4))
+            ],
+            'modelVersion': {'modelUrl': f"modelscope://{org}/{name}?revision=v{v + 1}.0"},
+            'version': f"v{v + 1}.0",
+        })
+    files = [{'name': 'README.md'}, {'name': 'configuration.json'}]
+    files.append({'name': f"{name}_lora.safetensors" if lora else f"{name}.safetensors"})
+    item: Dict[str, Any] = {
+        'Id': 100000 + idx,
+        'Name': name,
+        'ChineseName': f"{rng.choice(_CN_WORDS)}{rng.choice(_CN_WORDS)}_{idx}" if rng.random() < 0.7 else None,
+        'NickName': org,
+        'Path': org,
+        'CreatedBy': org,
+        'License': rng.choice(['Apache License 2.0', 'MIT', 'CreativeML OpenRAIL-M']),
+        'Downloads': int(rng.paretovariate(1.2) * 50),
+        'LikeCount': int(rng.paretovariate(1.5) * 3),
+        'LastUpdatedTime': updated,
+        'BaseModel': [rng.choice(_BASES)],
+        'TriggerWords': rng.sample(_CN_WORDS, rng.randint(0, 3)) or None,
+        'VisionFoundation': foundation,
+        'Avatar': f"https://img.example.com/avatar/{org}.png",
+        'Organization': {'Id': rng.randint(1, 500), 'FullName': org, 'Avatar': f"https://img.example.com/org/{org}.png"}
+        if rng.random() < 0.5 else {},
+        'OfficialTags': [{'ChineseName': cn, 'Name': en, 'Tag': en.lower()} for cn, en in tags],
+        'ModelInfos': {'checkpoint': {'files': files}},
+        'MuseInfo': {
+            'model': {
+                'modelName': f"{org}/{name}",
+                'showName': f"{name} show",
+                'modelType': 'LoRA' if lora else 'CHECKPOINT',
+                'operatorName': org,
+                'operatorEmpId': str(rng.randint(10000, 999999)),
+                'stableDiffusionVersion': foundation,
+                'gmtModified': updated * 1000,
+                'favoriteCount': rng.randint(0, 500),
+            },
+            'versions': versions,
+        },
+        'Description': ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(20, 80))),
+    }
+    if lora and rng.random() < 0.5:
+        item['AigcType'] = 'LoRA'
+    return item
+
+
+def generate_raw_models(n: int, seed: int = 0, lora_ratio: float = 0.6,
+                        duplicate_ratio: float = 0.05, light_ratio: float = 0.03) -> List[Dict[str, Any]]:
+    """Return `n` raw listing items.
+
+    About `lora_ratio` of them are LoRA candidates, `light_ratio` carry a
+    Light/Distill name (skipped by the filter) and `duplicate_ratio` repeat an
+    earlier model id with different download counts (collapsed by dedupe).
+    """
+    rng = random.Random(seed)
+    items: List[Dict[str, Any]] = []
+    for idx in range(n):
+        roll = rng.random()
+        if items and roll < duplicate_ratio:
+            dup = dict(rng.choice(items))
+            dup['Downloads'] = int(rng.paretovariate(1.2) * 50)
+            items.append(dup)
+            continue
+        name = _name(rng, idx)
+        if roll < duplicate_ratio + light_ratio:
+            name = f"{name}-{rng.choice(['Light', 'Distill'])}"
+        items.append(_raw_item(rng, idx, rng.random() < lora_ratio, name))
+    return items
@@ -0,0 +1,157 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from top_loras import api as tl_api
+from top_loras import archive as tl_archive
+from top_loras import cache as tl_cache
+from top_loras import fetcher as tl_fetcher
+from top_loras import snapshots
+
+
+def _raw(name, downloads, lora=True):
+    return {'Name': name, 'Path': 'owner', 'Downloads': downloads, 'AigcType': 'LoRA' if lora else None,
+            'MuseInfo': {'versions': [{'coverImages': [{'url': f'https://example.com/{name}.png'}]}]}}
+
+
+class _FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = 0
+
+    def put(self, url, json=None, headers=None, timeout=None):
+        self.calls += 1
+        items = self.pages.get(json['PageNumber'], [])
+        payload = {'Data': {'Model': {'Models': items}}}
+        return SimpleNamespace(status_code=200, content=b'{}', json=lambda: payload, raise_for_status=lambda: None)
+
+
+def _fake_api(pages):
+    return SimpleNamespace(endpoint='https://example.com', headers={}, session=_FakeSession(pages))
+
+
+def test_fetch_models_archives_every_page(tmp_path):
+    pages = {1: [_raw('a', 5), _raw('b', 3)], 2: [_raw('c', 9)]}
+    models = tl_api.fetch_models(limit=10, task='t2i', page_size=2, max_pages=3, api=_fake_api(pages),
+                                 archive_dir=str(tmp_path / 'raw'))
+    assert len(models) == 3
+
+    run = tl_archive.latest_run(str(tmp_path / 'raw'), task='t2i', tag='lora')
+    assert run['complete'] and run['pages'] == [1, 2, 3]   # the empty last page is kept too
+    assert Path(run['run_dir'], 'page-0001.json.gz').exists()
+    assert [m['Name'] for m in tl_archive.load_run_models(run['run_dir'])] == ['a', 'b', 'c']
+    assert tl_archive.archived_tasks(str(tmp_path / 'raw')) == ['t2i']
+
+
+def test_reprocess_rebuilds_caches_offline(tmp_path, monkeypatch):
+    archive_dir = str(tmp_path / 'raw')
+    cache_file = str(tmp_path / 'top_loras.json')
+    for task, pages in (('task-a', {1: [_raw('a1', 5), _raw('a2', 8), _raw('checkpoint', 99, lora=False)]}),
+                        ('task-b', {1: [_raw('b1', 1)]})):
+        tl_api.fetch_models(limit=10, task=task, page_size=5, max_pages=1, api=_fake_api(pages),
+                            archive_dir=archive_dir)
+
+    # an existing cover for a2 is carried over into the rebuilt cache
+    task_a_cache = tl_fetcher.task_cache_paths('task-a', cache_file)[0]
+    cover = tmp_path / 'a2.png'
+    cover.write_bytes(b'png')
+    tl_cache.save_cache(task_a_cache, [{'id': 'owner/a2', 'cover_url': 'https://example.com/a2.png',
+                                        'cover_local': str(cover)}])
+
+    def _no_network(*args, **kwargs):
+        raise AssertionError('reprocess must not hit the network')
+
+    monkeypatch.setattr(tl_api, 'create_api', _no_network)
+    outcomes = tl_fetcher.reprocess_tasks(archive_dir=archive_dir, cache_file=cache_file, max_workers=1)
+
+    assert sorted(outcomes) == ['task-a', 'task-b']
+    assert all(o['error'] is None for o in outcomes.values())
+    assert outcomes['task-a']['raw'] == 3 and outcomes['task-a']['count'] == 2
+    results = json.loads(Path(task_a_cache).read_text(encoding='utf-8'))['results']
+    assert [r['id'] for r in results] == ['owner/a2', 'owner/a1']
+    assert results[0]['cover_local'] == str(cover)
+    assert Path(task_a_cache).with_name('top_loras_task-a.gallery.json').exists()
+    # archived counts are stale, so the rebuild adds nothing to the snapshot history
+    history = snapshots.load(task_a_cache)
+    assert history['ids'] == ['owner/a2'] and len(history['ts']) == 1
+    assert not snapshots.store_dir(tl_fetcher.task_cache_paths('task-b', cache_file)[0]).exists()
+
+
+class _FlakySession(_FakeSession):
+    """Fails the listed page numbers with the given status (or exception) a number of times."""
+
+    def __init__(self, pages, failures):
+        super().__init__(pages)
+        self.failures = failures
+        self.requested = []
+
+    def put(self, url, json=None, headers=None, timeout=None):
+        page = json['PageNumber']
+        self.requested.append(page)
+        if self.failures.get(page):
+            self.failures[page] -= 1
+            return SimpleNamespace(status_code=503, content=b'', json=lambda: {},
+                                   raise_for_status=lambda: (_ for _ in ()).throw(RuntimeError('503')))
+        return super().put(url, json=json, headers=headers, timeout=timeout)
+
+
+def test_transient_page_failures_are_retried(monkeypatch):
+    monkeypatch.setattr(tl_api.time, 'sleep', lambda s: None)
+    pages = {1: [_raw('a', 5)], 2: [_raw('b', 3)]}
+    api = _fake_api(pages)
+    api.session = _FlakySession(pages, {2: 2})
+    models = tl_api.fetch_models(limit=10, page_size=1, max_pages=2, api=api, page_retries=2)
+    assert [m['Name'] for m in models] == ['a', 'b']
+    assert api.session.requested == [1, 2, 2, 2]
+
+
+def test_interrupted_crawl_resumes_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(tl_api.time, 'sleep', lambda s: None)
+    archive_dir = str(tmp_path / 'raw')
+    pages = {1: [_raw('a', 5)], 2: [_raw('b', 3)], 3: [_raw('c', 1)]}
+    api = _fake_api(pages)
+    api.session = _FlakySession(pages, {2: 5})
+    try:
+        tl_api.fetch_models(limit=10, page_size=1, max_pages=4, api=api, page_retries=1, archive_dir=archive_dir)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('page 2 should have failed')
+    run = tl_archive.latest_run(archive_dir, tag='lora')
+    assert not run['complete'] and run['pages'] == [1]
+
+    api.session = _FlakySession(pages, {})
+    models = tl_api.fetch_models(limit=10, page_size=1, max_pages=4, api=api, archive_dir=archive_dir)
+    assert [m['Name'] for m in models] == ['a', 'b', 'c']
+    assert api.session.requested == [2, 3, 4]          # page 1 came from the checkpoint
+    run = tl_archive.latest_run(archive_dir, tag='lora')
+    assert run['complete'] and run['pages'] == [1, 2, 3, 4]
+
+    # a finished crawl is not resumed, and resume_window=0 always restarts
+    api.session = _FlakySession(pages, {})
+    tl_api.fetch_models(limit=10, page_size=1, max_pages=1, api=api, archive_dir=archive_dir, resume_window=0)
+    assert api.session.requested == [1]
+
+
+def test_prune_keeps_recent_runs_and_the_newest_complete_one(tmp_path):
+    archive_dir = str(tmp_path / 'raw')
+    day = 86400.0
+    now = 1_760_000_000.0
+    runs = []
+    for age_days, complete in ((90, True), (80, False), (60, True), (40, False), (2, False), (1, False)):
+        archive = tl_archive.CrawlArchive(archive_dir, {'PageSize': 5, 'Tag': 'lora'}, tag='lora', task='t2i')
+        archive.save_page(1, {'Data': {}})
+        archive.meta.update(started_at=now - age_days * day)
+        archive.finish(complete)
+        archive.meta['updated_at'] = now - age_days * day
+        (archive.run_dir / tl_archive.META_FILE).write_text(json.dumps(archive.meta))
+        runs.append(archive.run_dir)
+
+    preview = tl_archive.prune(archive_dir, keep_runs=2, max_age_days=30, now=now, dry_run=True)
+    assert preview['runs'] == 6 and preview['pruned'] == 3 and all(r.exists() for r in runs)
+
+    stats = tl_archive.prune(archive_dir, keep_runs=2, max_age_days=30, now=now)
+    # the two newest stay, so does the newest complete run (60 days old); older runs go
+    assert stats['pruned'] == 3 and stats['freed_bytes'] > 0
+    assert [r.exists() for r in runs] == [False, False, True, False, True, True]
+    assert tl_archive.latest_run(archive_dir, task='t2i')['run_dir'] == str(runs[2])
@@ -0,0 +1,61 @@
+import json
+
+from top_loras import batch as tl_batch
+
+
+def test_build_grid_cartesian_product():
+    cells = tl_batch.build_grid(['a', 'b'], ['org/m1', 'org/m2', 'org/m3'], [1, 2])
+    assert len(cells) == 12
+    assert [c['index'] for c in cells] == list(range(12))
+    assert cells[0]['prompt'] == 'a' and cells[0]['model_id'] == 'org/m1' and cells[0]['seed'] == 1
+    assert cells[-1]['prompt'] == 'b' and cells[-1]['model_id'] == 'org/m3' and cells[-1]['seed'] == 2
+
+
+def test_run_batch_collects_manifest(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_submit(model_id, params, token=None, wait_downloads=True):
+        calls.append((model_id, params['prompt'], params['seed']))
+        if model_id == 'org/bad':
+            raise RuntimeError('boom')
+        return {
+            'meta': {'job_id': params['job_id']},
+            'status': 'succeeded',
+            'remote': True,
+            'result': {'images': [f"https://example.com/{params['seed']}.png"]},
+            'file_path': 'job.json',
+        }
+
+    monkeypatch.setattr('top_loras.batch.submit_job', fake_submit)
+
+    manifest_path = tmp_path / 'grid.json'
+    manifest = tl_batch.run_batch(['p1', 'p2'], ['org/good', 'org/bad'], [7],
+                                  params={'steps': 10, 'size': None}, max_workers=3,
+                                  rate_per_minute=0, manifest_path=str(manifest_path))
+
+    assert len(calls) == 4
+    assert manifest['shape'] == [2, 2, 1]
+    assert manifest['params'] == {'steps': 10}
+    assert manifest['summary'] == {'total': 4, 'succeeded': 2, 'failed': 2}
+    first = manifest['cells'][0]
+    assert first['images'] == ['https://example.com/7.png']
+    assert manifest['cells'][1]['status'] == 'failed'
+
+    on_disk = json.loads(manifest_path.read_text(encoding='utf-8'))
+    assert on_disk['batch_id'] == manifest['batch_id']
+    assert len(on_disk['cells']) == 4
+
+
+def test_batch_command_exit_code(tmp_path, monkeypatch):
+    from top_loras import cli
+
+    def fake_submit(model_id, params, token=None, wait_downloads=True):
+        if model_id == 'org/bad':
+            raise RuntimeError('boom')
+        return {'meta': {'job_id': params['job_id']}, 'status': 'succeeded', 'remote': True,
+                'result': {'images': []}, 'file_path': 'job.json'}
+
+    monkeypatch.setattr('top_loras.batch.submit_job', fake_submit)
+    base = ['batch', '--prompt', 'p', '--rate-per-minute', '0', '--manifest', str(tmp_path / 'grid.json')]
+    assert cli.run_cli(base + ['--model', 'org/good']) == 0
+    assert cli.run_cli(base + ['--model', 'org/good', '--model', 'org/bad']) == 1
@@ -0,0 +1,31 @@
+from benchmarks import run_benchmarks
+from benchmarks.synthetic import generate_raw_models
+from top_loras import filter as tl_filter
+
+
+def test_generate_raw_models_is_deterministic_and_realistic():
+    items = generate_raw_models(500, seed=1)
+    assert items == generate_raw_models(500, seed=1)
+    assert len(items) == 500
+
+    results = tl_filter.process_models(items)
+    # roughly lora_ratio of the items survive the filter, Light/Distill ones never do
+    assert 0.4 * 500 < len(results) < 0.8 * 500
+    assert not any('Light' in (r['title_en'] or '') or 'Distill' in (r['title_en'] or '') for r in results)
+    assert all(r['cover_url'] and r['id'] and '/' in r['id'] for r in results)
+
+    deduped = tl_filter.deduplicate_models(results, limit=len(results))
+    assert len(deduped) < len(results)
+
+
+def test_run_and_compare_against_baseline():
+    report = run_benchmarks.run([200], repeat=1)
+    stages = report['200']
+    assert {'process_models', 'parse_model_entry', 'deduplicate_models', 'save_cache', 'load_cache'} <= set(stages)
+    assert all(s['items_per_sec'] > 0 and s['peak_bytes'] > 0 for s in stages.values())
+
+    assert run_benchmarks.compare(report, report, threshold=0.2) == []
+    faster = {'200': {'process_models': dict(stages['process_models'],
+                                             items_per_sec=stages['process_models']['items_per_sec'] * 10)}}
+    regressions = run_benchmarks.compare(report, faster, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith('process_models@200')
@@ -1,5 +1,8 @@
 import tempfile
 from pathlib import Path
+
+import pytest
+
 from top_loras import cache as tl_cache
 
 
@@ -16,3 +19,17 @@ def test_save_and_load_cache_roundtrip(tmp_path):
     loaded = tl_cache.load_cache(str(cache_file), ttl=1000)
     assert isinstance(loaded, list)
     assert loaded[0]['id'] == 'owner/model-a'
+
+
+def test_failed_atomic_write_removes_temp_file(tmp_path, monkeypatch):
+    target = tmp_path / 'state.json'
+    target.write_text('old', encoding='utf-8')
+
+    def failing_replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(tl_cache.os, 'replace', failing_replace)
+    with pytest.raises(OSError):
+        tl_cache.write_atomic(target, 'new')
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
+    assert target.read_text(encoding='utf-8') == 'old'
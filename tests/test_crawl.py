@@ -0,0 +1,72 @@
+import random
+from types import SimpleNamespace
+
+from top_loras import api as tl_api
+from top_loras.crawl import CrawlPlanner
+
+
+def _item(i, downloads, lora):
+    return {'Name': f'm{i}', 'Path': 'owner', 'Downloads': downloads, 'AigcType': 'LoRA' if lora else 'CHECKPOINT'}
+
+
+class _ListingSession:
+    """Serves `items` by (PageNumber, PageSize) windows like the real listing endpoint."""
+
+    def __init__(self, items):
+        self.items = items
+        self.requests = []
+
+    def put(self, url, json=None, headers=None, timeout=None):
+        number, size = json['PageNumber'], json['PageSize']
+        self.requests.append((number, size))
+        window = self.items[(number - 1) * size:number * size]
+        payload = {'Data': {'Model': {'Models': window}}}
+        return SimpleNamespace(status_code=200, content=b'{}', json=lambda: payload, raise_for_status=lambda: None)
+
+
+def _crawl(items, limit, max_pages=50, page_size=None):
+    session = _ListingSession(items)
+    api = SimpleNamespace(endpoint='https://example.com', headers={}, session=session)
+    models = tl_api.fetch_models(limit=limit, page_size=page_size, max_pages=max_pages, api=api)
+    return models, session.requests
+
+
+def test_download_ordered_listing_stops_once_top_is_settled():
+    items = [_item(i, 10_000 - i, lora=True) for i in range(2_000)]
+    models, requests = _crawl(items, limit=20)
+    # one page of 40 already holds the top 20 and the listing is download-ordered
+    assert requests == [(1, 40)]
+    assert len(models) == 40
+
+
+def test_low_yield_keeps_fetching_with_contiguous_windows():
+    rng = random.Random(1)
+    # 5% LoRA and shuffled download counts: the old limit * 4 cap would stop at ~4 LoRAs
+    items = [_item(i, rng.randint(0, 10_000), lora=(i % 20 == 0)) for i in range(5_000)]
+    models, requests = _crawl(items, limit=20)
+
+    assert sum(1 for m in models if m['AigcType'] == 'LoRA') >= 20
+    # adaptive sizes never overlap or skip listing items
+    assert [m['Name'] for m in models] == [f'm{i}' for i in range(len(models))]
+    assert any(size != 40 for _number, size in requests)
+    # ...and do not over-fetch far beyond the yield-based target
+    assert len(models) <= 20 / 0.05 * 1.5 + 200
+
+
+def test_unordered_listing_keeps_the_fixed_cap_coverage():
+    rng = random.Random(2)
+    items = [_item(i, rng.randint(0, 10_000), lora=True) for i in range(2_000)]
+    planner = CrawlPlanner(limit=50)
+    while not planner.should_stop():
+        number, size = planner.next_request()
+        planner.observe(items[(number - 1) * size:number * size], size)
+    # all-LoRA but not download-ordered: later pages could still reach the top 50
+    assert planner.stop_reason == 'coverage'
+    assert planner.seen >= 50 * 4
+
+
+def test_fixed_page_size_is_respected():
+    items = [_item(i, i, lora=(i % 2 == 0)) for i in range(300)]
+    _models, requests = _crawl(items, limit=10, page_size=25)
+    assert {size for _n, size in requests} == {25}
+    assert [n for n, _s in requests] == list(range(1, len(requests) + 1))
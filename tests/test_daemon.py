@@ -0,0 +1,73 @@
+import time
+
+from top_loras import cache as tl_cache
+from top_loras import daemon as tl_daemon
+from top_loras import fetcher as tl_fetcher
+
+
+def _daemon(tmp_path, **kwargs):
+    return tl_daemon.RefreshDaemon(tasks=['task-a', 'task-b'], cache_file=str(tmp_path / 'top_loras.json'),
+                                   images_dir=str(tmp_path / 'images'), jitter=0, **kwargs)
+
+
+def test_daemon_schedules_from_existing_cache(tmp_path):
+    tl_cache.save_cache(str(tmp_path / 'top_loras_task-a.json'), [{'id': 'a'}])
+    d = _daemon(tmp_path, interval=100, ttl=1000)
+    cached_at = tl_cache.cache_timestamp(str(tmp_path / 'top_loras_task-a.json'))
+    # fresh cache: refreshed shortly before TTL expiry; missing cache: due now
+    assert d.state['task-a']['next_run'] == cached_at + 900
+    assert d.state['task-b']['next_run'] == 0.0
+
+
+def test_daemon_reuses_api_and_backs_off_per_task(tmp_path, monkeypatch):
+    apis = []
+    calls = []
+
+    def fake_create_api(token_env='MODELSCOPE_API_TOKEN', debug=False):
+        apis.append(object())
+        return apis[-1]
+
+    def fake_fetch(task=None, api=None, **kwargs):
+        calls.append((task, api))
+        if task == 'task-b':
+            raise RuntimeError('503')
+        return [{'id': 'x'}]
+
+    monkeypatch.setattr('top_loras.api.create_api', fake_create_api)
+    monkeypatch.setattr(tl_fetcher, 'fetch_top_loras', fake_fetch)
+
+    d = _daemon(tmp_path, interval=100, base_backoff=10, max_backoff=15)
+    assert d.run_once() == ['task-a', 'task-b']
+    assert calls[0][1] is apis[0]
+    a, b = d.state['task-a'], d.state['task-b']
+    assert a['failures'] == 0 and a['last_success'] is not None
+    assert b['failures'] == 1 and b['last_error'] == '503'
+    assert b['next_run'] < a['next_run']
+
+    before = time.time()
+    d.refresh_task('task-b')
+    assert d.state['task-b']['failures'] == 2
+    # backoff doubles (10s -> 20s) but is capped by max_backoff
+    assert d.state['task-b']['next_run'] - before <= 15 + 1
+    # session is rebuilt after a failure
+    d.refresh_task('task-a')
+    assert len(apis) == 3
+
+
+def test_serve_refresh_once_exit_code(tmp_path, monkeypatch):
+    from top_loras import cli
+
+    failing = set()
+
+    def fake_fetch(task=None, **kwargs):
+        if task in failing:
+            raise RuntimeError('503')
+        return [{'id': 'x'}]
+
+    monkeypatch.setattr('top_loras.api.create_api', lambda token_env='MODELSCOPE_API_TOKEN', debug=False: object())
+    monkeypatch.setattr(tl_fetcher, 'fetch_top_loras', fake_fetch)
+    argv = ['serve-refresh', '--once', '--task', 'task-a', '--task', 'task-b',
+            '--cache-file', str(tmp_path / 'top_loras.json'), '--images-dir', str(tmp_path / 'images')]
+    assert cli.run_cli(argv) == 0
+    failing.add('task-b')
+    assert cli.run_cli(argv) == 1
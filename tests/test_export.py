@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from top_loras import cache as tl_cache
+from top_loras import cli
+from top_loras import export as tl_export
+
+NOW = 1_760_000_000.0
+
+MODEL = {'id': 'owner/a-lora', 'title_en': 'A', 'downloads': 12, 'likes': None,
+         'tags_en': ['anime', None], 'base_models': 'FLUX.1, SDXL', 'trigger_words': None,
+         'cover_local': '/tmp/a.png'}
+
+
+def test_rows_are_typed_and_tasks_come_from_cache_names():
+    (row,) = tl_export.leaderboard_rows([MODEL, 'junk'], NOW)
+    assert [name for name, _kind in tl_export.LEADERBOARD_FIELDS] == list(row)
+    assert row['rank'] == 1 and row['snapshot_ts'] == NOW and row['downloads'] == 12 and row['likes'] is None
+    assert row['tags_en'] == ['anime'] and row['base_models'] == ['FLUX.1', 'SDXL'] and row['trigger_words'] == []
+    assert 'cover_local' not in row
+    assert tl_export.task_of('cache/top_loras_text-to-image-synthesis.json') == 'text-to-image-synthesis'
+    assert tl_export.task_of('cache/top_loras.json') == tl_export.DEFAULT_TASK_NAME
+
+
+def test_export_without_pyarrow_fails_cleanly(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(tl_export, '_pa', lambda: None)
+    with pytest.raises(RuntimeError, match='pyarrow'):
+        tl_export.export_leaderboards(str(tmp_path), str(tmp_path / 'out'))
+    assert cli.run_cli(['export', '--cache-dir', str(tmp_path), '--out-dir', str(tmp_path / 'out')]) == 1
+    assert 'analytics' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('fmt', tl_export.FORMATS)
+def test_incremental_partitioned_export(tmp_path, monkeypatch, fmt):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.dataset as ds
+
+    cache_dir = tmp_path / 'cache'
+    out_dir = tmp_path / 'export'
+    times = iter([NOW, NOW + 3600])
+    monkeypatch.setattr(tl_cache.time, 'time', lambda: next(times))
+    tl_cache.save_cache(str(cache_dir / 'top_loras_t2i.json'), [MODEL, dict(MODEL, id='owner/b-lora', downloads=3)])
+
+    first = tl_export.export_leaderboards(str(cache_dir), str(out_dir), history=True, fmt=fmt)
+    assert first['rows'] == 2 and first['snapshot_rows'] == 2 and len(first['written']) == 2
+    again = tl_export.export_leaderboards(str(cache_dir), str(out_dir), history=True, fmt=fmt)
+    assert again == {'written': [], 'skipped': 1, 'rows': 0, 'snapshot_rows': 0}
+
+    tl_cache.save_cache(str(cache_dir / 'top_loras_t2i.json'), [dict(MODEL, downloads=20)])
+    third = tl_export.export_leaderboards(str(cache_dir), str(out_dir), history=True, fmt=fmt)
+    assert third['rows'] == 1 and third['snapshot_rows'] == 1
+
+    file_format = 'parquet' if fmt == 'parquet' else 'ipc'
+    boards = ds.dataset(str(out_dir / 'leaderboards'), format=file_format, partitioning='hive').to_table()
+    assert boards.num_rows == 3
+    assert boards.schema.field('tags_en').type == pa.list_(pa.string())
+    assert set(boards.column('task').to_pylist()) == {'t2i'}
+    history = ds.dataset(str(out_dir / 'snapshots'), format=file_format, partitioning='hive').to_table()
+    assert sorted(zip(history.column('model_id').to_pylist(), history.column('downloads').to_pylist())) == \
+        [('owner/a-lora', 12), ('owner/a-lora', 20), ('owner/b-lora', 3)]
+    state = json.loads((out_dir / tl_export.STATE_FILE).read_text())
+    assert state['leaderboards'] == {'top_loras_t2i.json': NOW + 3600}
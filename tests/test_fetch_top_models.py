@@ -1,3 +1,4 @@
+import base64
 import json
 import os
 from pathlib import Path
@@ -9,6 +10,11 @@ from top_loras import api as tl_api
 from top_loras import download as tl_download
 from top_loras import cache as tl_cache
 
+# covers are decoded after download, so fakes must write a real image
+_PNG_1PX = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNgYGBgAAAABQABeqhXUAAAAABJRU5ErkJggg=='
+)
+
 
 def test_extract_cover_url_basic():
     item = {
@@ -108,7 +114,7 @@ def test_download_images_for_results_monkeypatch(tmp_path, monkeypatch):
     # Prepare a fake download_image that writes a file and returns True
     def fake_download(url, dest_path, session=None, retries=2):
         dest_path.parent.mkdir(parents=True, exist_ok=True)
-        dest_path.write_bytes(b"fakeimage")
+        dest_path.write_bytes(_PNG_1PX)
         return True
 
     # monkeypatch the download_image in our top_loras.download module
@@ -153,3 +159,78 @@ def test_download_image_live(tmp_path):
     ok = tl_download.download_image('https://example.com/nonexistent.jpg', dest, retries=1)
     # We don't assert success; ensure function returns bool
     assert isinstance(ok, bool)
+
+
+def test_shared_downloader_fetches_each_url_once(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_download(url, dest_path, session=None, retries=2):
+        calls.append(url)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        dest_path.write_bytes(_PNG_1PX)
+        return True
+
+    monkeypatch.setattr('top_loras.download.download_image', fake_download)
+
+    shared = {'id': 'owner/shared', 'title_en': 'shared', 'cover_url': 'https://example.com/shared.png'}
+    downloader = tl_download.SharedImageDownloader(max_workers=2)
+    try:
+        task_a = [dict(shared)]
+        task_b = [dict(shared), {'id': 'owner/other', 'title_en': 'other', 'cover_url': 'https://example.com/o.png'}]
+        tl_download.download_images_for_results(task_a, str(tmp_path / 'a'), downloader=downloader)
+        tl_download.download_images_for_results(task_b, str(tmp_path / 'b'), downloader=downloader)
+    finally:
+        downloader.close()
+
+    assert sorted(calls) == ['https://example.com/o.png', 'https://example.com/shared.png']
+    assert Path(task_a[0]['cover_local']).exists()
+    assert Path(task_b[0]['cover_local']).exists()
+    assert task_a[0]['cover_local'] != task_b[0]['cover_local']
+    assert downloader.stats['reused'] == 1
+
+
+def test_fetch_all_tasks_runs_every_task(tmp_path, monkeypatch):
+    from top_loras import fetcher as tl_fetcher
+
+    seen = []
+
+    def fake_fetch_models(limit=20, tag='lora', task=None, limiter=None, **kwargs):
+        assert limiter is not None
+        seen.append(task)
+        if task == 'broken':
+            raise RuntimeError('listing down')
+        return [{'Name': f'owner/{task}-lora', 'AigcType': 'lora', 'Downloads': 5}]
+
+    monkeypatch.setattr(tl_api, 'fetch_models', fake_fetch_models)
+
+    outcomes = tl_fetcher.fetch_all_tasks(['task-a', 'broken'], cache_file=str(tmp_path / 'top_loras.json'),
+                                          images_dir=str(tmp_path / 'images'), download_images=False,
+                                          force_refresh=True)
+
+    assert sorted(seen) == ['broken', 'task-a']
+    assert list(outcomes) == ['task-a', 'broken']
+    assert outcomes['task-a']['count'] == 1
+    assert Path(outcomes['task-a']['cache_file']).name == 'top_loras_task-a.json'
+    assert Path(outcomes['task-a']['cache_file']).exists()
+    assert Path(outcomes['task-a']['cache_file']).with_name('top_loras_task-a.gallery.json').exists()
+    assert outcomes['broken']['error'] == 'listing down'
+    assert outcomes['broken']['seconds'] >= 0
+
+
+def test_all_tasks_cli_exits_nonzero_when_a_task_fails(tmp_path, monkeypatch, capsys):
+    from top_loras import cli
+    from top_loras import fetcher as tl_fetcher
+
+    def fake_fetch_all_tasks(tasks, **kwargs):
+        outcomes = {t: {'error': None, 'count': 3, 'seconds': 0.1} for t in tasks}
+        outcomes[tasks[-1]] = {'error': 'listing down', 'count': 0, 'seconds': 0.1}
+        return outcomes
+
+    monkeypatch.setattr(tl_fetcher, 'fetch_all_tasks', fake_fetch_all_tasks)
+    argv = ['--all-tasks', '--cache-file', str(tmp_path / 'top_loras.json'), '--images-dir', str(tmp_path / 'img')]
+    assert cli.run_cli(argv) == 1
+    assert 'FAILED: listing down' in capsys.readouterr().out
+
+    monkeypatch.setattr(tl_fetcher, 'fetch_all_tasks',
+                        lambda tasks, **kwargs: {t: {'error': None, 'count': 3, 'seconds': 0.1} for t in tasks})
+    assert cli.run_cli(argv) == 0
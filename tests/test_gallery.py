@@ -0,0 +1,64 @@
+import os
+
+from top_loras import cache as tl_cache
+from top_loras import gallery
+from ui import loaders
+
+
+def _results(tmp_path):
+    cover = tmp_path / 'a.png'
+    cover.write_bytes(b'png')
+    return [
+        {'id': 'owner/a', 'title_cn': '甲', 'cover_local': str(cover), 'cover_url': 'https://example.com/a.png'},
+        {'id': 'owner/b', 'title_en': 'b', 'cover_local': str(tmp_path / 'missing.png')},
+        {'id': 'owner/c'},
+    ]
+
+
+def test_write_and_load_gallery(tmp_path):
+    cache_file = str(tmp_path / 'top_loras_task.json')
+    results = _results(tmp_path)
+    tl_cache.save_cache(cache_file, results)
+    path = gallery.write_gallery(cache_file, results)
+    assert path == tmp_path / 'top_loras_task.gallery.json'
+
+    models = gallery.load_gallery(cache_file)
+    assert [m['title'] for m in models] == ['甲', 'b', 'owner/c']
+    assert models[0]['cover'] == str(tmp_path / 'a.png')
+    # a missing local file keeps its raw value, like the UI's own resolution
+    assert models[1]['cover'] == str(tmp_path / 'missing.png')
+    assert models[2]['cover'] is None
+
+    # any change to the cache file invalidates the payload
+    st = os.stat(cache_file)
+    os.utime(cache_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert gallery.load_gallery(cache_file) is None
+
+
+def test_model_store_uses_gallery_without_stat_calls(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / 'top_loras_task.json')
+    results = _results(tmp_path)
+    tl_cache.save_cache(cache_file, results)
+    gallery.write_gallery(cache_file, results)
+
+    def _no_stat(_raw):
+        raise AssertionError('cover resolution should come from the gallery payload')
+
+    monkeypatch.setattr(gallery, 'resolve_cover', _no_stat)
+    items, state = loaders.gallery_page(cache_file, page_size=10)
+    assert items[0] == (str(tmp_path / 'a.png'), '甲')
+    assert items[2][0] == loaders._ensure_placeholder_image()
+    assert state['keys'] == ['owner/a', 'owner/b', 'owner/c']
+
+
+def test_model_store_falls_back_to_cache_when_gallery_is_stale(tmp_path):
+    cache_file = str(tmp_path / 'top_loras_task.json')
+    results = _results(tmp_path)
+    tl_cache.save_cache(cache_file, results)
+    gallery.write_gallery(cache_file, results)
+    tl_cache.save_cache(cache_file, results[:1])
+    st = os.stat(cache_file)
+    os.utime(cache_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    _items, state = loaders.gallery_page(cache_file, page_size=10)
+    assert state['keys'] == ['owner/a']
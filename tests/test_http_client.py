@@ -0,0 +1,53 @@
+from top_loras import api as tl_api
+from top_loras import http_client
+
+
+class _FakeResponse:
+    status_code = 200
+    content = b'{}'
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self._payload
+
+
+def test_listing_client_defaults(monkeypatch):
+    monkeypatch.delenv('MODELSCOPE_ENDPOINT', raising=False)
+    client = http_client.ListingClient(connect_timeout=2, read_timeout=9)
+    try:
+        assert client.endpoint == 'https://www.modelscope.cn'
+        assert client.timeout == (2.0, 9.0)
+        assert 'gzip' in client.session.headers['Accept-Encoding']
+        assert client.builder_headers({'X-A': '1'}) == {'X-A': '1', 'Content-Type': 'application/json'}
+    finally:
+        client.close()
+
+
+def test_fetch_models_uses_native_client(monkeypatch):
+    monkeypatch.setenv(tl_api.LISTING_CLIENT_ENV, 'native')
+    monkeypatch.setenv('MODELSCOPE_CSRF_TOKEN', 'csrf-1')
+    monkeypatch.delenv('MODELSCOPE_API_TOKEN', raising=False)
+    monkeypatch.setattr(tl_api, '_HUB_API_CLASS', None)
+
+    calls = []
+
+    def fake_put(self, url, json=None, headers=None, timeout=None):
+        calls.append((url, json, headers, timeout))
+        items = [{'Name': f'm{json["PageNumber"]}'}] if json['PageNumber'] == 1 else []
+        return _FakeResponse({'Data': {'Model': {'Models': items}}})
+
+    import requests
+    monkeypatch.setattr(requests.Session, 'put', fake_put)
+
+    models = tl_api.fetch_models(limit=1, page_size=10, max_pages=3)
+    assert models == [{'Name': 'm1'}]
+    url, body, headers, timeout = calls[0]
+    assert url == 'https://www.modelscope.cn/api/v1/dolphin/models'
+    assert headers['X-Csrf-Token'] == 'csrf-1'
+    assert timeout == http_client.request_timeout()
+    assert isinstance(tl_api._hub_api_class()(), http_client.ListingClient)
@@ -0,0 +1,67 @@
+import os
+import time
+
+from top_loras import cache as tl_cache
+from top_loras import image_cache
+
+
+def _image(path, size, age):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    ts = time.time() - age
+    os.utime(path, (ts, ts))
+    return path
+
+
+def test_lru_eviction_keeps_referenced_covers_and_recent_accesses(tmp_path):
+    covers = tmp_path / 'images' / 'task'
+    kept = _image(covers / 'kept.png', 400, age=10_000)
+    old = _image(covers / 'old.png', 400, age=500)
+    touched = _image(covers / 'touched.png', 400, age=900)
+    recent = _image(covers / 'recent.png', 400, age=60)
+    image_cache.touch(touched)
+    image_cache.flush_access()
+
+    stats = image_cache.gc_directory(covers, quota_bytes=1000, protected={os.path.abspath(kept)})
+
+    # over quota by 600 bytes: the referenced cover survives despite being oldest,
+    # the least recently used unprotected files go first, and a recorded access
+    # outranks a newer mtime
+    assert sorted(p.name for p in covers.iterdir() if p.name != image_cache.INDEX_FILE) == ['kept.png', 'touched.png']
+    assert not old.exists() and not recent.exists()
+    assert stats['evicted'] == 2 and stats['freed_bytes'] == 800 and stats['bytes'] == 800
+    assert stats['protected_bytes'] == 400
+
+
+def test_orphan_sweep_and_dry_run(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    covers = cache_dir / 'images' / 'task'
+    current = _image(covers / 'current.png', 10, age=10_000)
+    dropped = _image(covers / 'dropped.png', 10, age=10_000)
+    just_downloaded = _image(covers / 'new.png', 10, age=0)
+    partial = _image(tmp_path / 'outputs' / 'gen_1.part', 10, age=10_000)
+    tl_cache.save_cache(str(cache_dir / 'top_loras_task.json'), [{'id': 'a', 'cover_local': str(current)}])
+    assert image_cache.referenced_covers(str(cache_dir)) == {os.path.abspath(current)}
+
+    preview = image_cache.gc_images(str(cache_dir / 'images'), str(tmp_path / 'outputs'), str(cache_dir),
+                                    dry_run=True)
+    assert preview[str(covers)]['orphans'] == 1 and dropped.exists()
+
+    results = image_cache.gc_images(str(cache_dir / 'images'), str(tmp_path / 'outputs'), str(cache_dir))
+    assert results[str(covers)]['orphans'] == 1
+    assert current.exists() and just_downloaded.exists() and not dropped.exists()
+    # outputs are not swept as orphans, but stale partial downloads are
+    assert not partial.exists()
+
+
+def test_gc_images_command_prints_summary_and_exits_zero(tmp_path, capsys):
+    from top_loras import cli
+
+    covers = tmp_path / 'cache' / 'images' / 'task'
+    _image(covers / 'dropped.png', 10, age=10_000)
+    argv = ['gc-images', '--images-dir', str(tmp_path / 'cache' / 'images'), '--cache-dir', str(tmp_path / 'cache'),
+            '--outputs-dir', str(tmp_path / 'outputs')]
+    assert cli.run_cli(argv + ['--dry-run']) == 0
+    assert 'would free' in capsys.readouterr().out
+    assert cli.run_cli(argv) == 0
+    assert not (covers / 'dropped.png').exists()
@@ -0,0 +1,76 @@
+import base64
+import io
+
+import pytest
+
+from top_loras import download as tl_download
+from top_loras import imaging
+from ui import loaders
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def _jpeg(path, size=(640, 400)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', size, (200, 40, 90)).save(path, format='JPEG')
+    return path
+
+
+def test_inspect_image_reports_dimensions_and_tiny_lqip(tmp_path):
+    info = imaging.inspect_image(_jpeg(tmp_path / 'cover.jpg'))
+    assert (info['width'], info['height']) == (640, 400)
+    assert info['lqip'].startswith('data:image/jpeg;base64,')
+    raw = base64.b64decode(info['lqip'].split(',', 1)[1])
+    assert len(raw) < 1024
+    with Image.open(io.BytesIO(raw)) as thumb:
+        assert max(thumb.size) <= imaging.LQIP_MAX_SIDE
+
+    truncated = tmp_path / 'truncated.png'
+    truncated.write_bytes(b'<html>502 Bad Gateway</html>')
+    with pytest.raises(imaging.InvalidImageError):
+        imaging.inspect_image(truncated)
+
+
+def test_download_stage_records_dimensions_and_drops_corrupt_covers(tmp_path, monkeypatch):
+    def fake_download(url, dest_path, session=None, retries=2):
+        if 'broken' in url:
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            dest_path.write_bytes(b'\xff\xd8\xff\xe0 not really a jpeg')
+        else:
+            _jpeg(dest_path, size=(300, 600))
+        return True
+
+    monkeypatch.setattr('top_loras.download.download_image', fake_download)
+    results = [{'id': 'owner/ok', 'title_en': 'ok', 'cover_url': 'https://example.com/ok.jpg'},
+               {'id': 'owner/broken', 'title_en': 'broken', 'cover_url': 'https://example.com/broken.jpg'}]
+    tl_download.download_images_for_results(results, str(tmp_path / 'images'))
+
+    ok, broken = results
+    assert (ok['cover_width'], ok['cover_height']) == (300, 600) and ok['cover_lqip']
+    assert broken['cover_local'] is None and 'cover_width' not in broken
+    assert not (tmp_path / 'images' / 'broken.jpg').exists()
+
+    html = loaders.render_markdown_for_models([ok])
+    # 2:1 portrait is clamped to 150% so it cannot stretch its grid row
+    assert "padding-top:150.00%" in html and "width='300' height='600'" in html
+    assert "background-image:url(data:image/jpeg;base64," in html
+
+
+def test_cards_view_uses_browser_loadable_covers_with_local_metadata(tmp_path, monkeypatch):
+    from top_loras import cache as tl_cache
+    from top_loras import gallery as tl_gallery
+
+    monkeypatch.setattr('top_loras.download.download_image',
+                        lambda url, dest_path, session=None, retries=2: _jpeg(dest_path) and True)
+    results = [{'id': 'owner/ok', 'title_en': 'ok', 'cover_url': 'https://example.com/ok.jpg'}]
+    tl_download.download_images_for_results(results, str(tmp_path / 'images'))
+    cache_file = str(tmp_path / 'top_loras_task.json')
+    tl_cache.save_cache(cache_file, results)
+    tl_gallery.write_gallery(cache_file, results)
+
+    _items, state = loaders.gallery_page(cache_file)
+    html = loaders.card_page(state)
+    # the browser fetches the remote cover; the server-side copy only shapes the card
+    assert "src='https://example.com/ok.jpg'" in html and str(tmp_path) not in html
+    assert "width='640' height='400'" in html and "padding-top:62.50%" in html
+    assert "background-image:url(data:image/jpeg;base64," in html
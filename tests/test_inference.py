@@ -0,0 +1,98 @@
+import hashlib
+import json
+from pathlib import Path
+
+from top_loras import inference as tl_inference
+
+
+class _FakeResponse:
+    def __init__(self, body, content_type):
+        self._body = body
+        self.headers = {'Content-Type': content_type}
+        self.status_code = 200
+
+    def raise_for_status(self):
+        return None
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i:i + chunk_size]
+
+    def close(self):
+        return None
+
+
+def test_extension_for_content_type():
+    assert tl_inference._extension_for('image/png', 'https://x/a') == '.png'
+    assert tl_inference._extension_for('image/jpeg; charset=binary', 'https://x/a.png') == '.jpg'
+    assert tl_inference._extension_for(None, 'https://x/a.webp?sig=1') == '.webp'
+    assert tl_inference._extension_for(None, 'https://x/a') == '.jpg'
+    assert tl_inference._extension_for('application/octet-stream', 'https://x/a.png') == '.png'
+    assert tl_inference._extension_for('text/html', 'https://x/a') == '.jpg'
+
+
+def test_start_output_downloads_streams_all_images(tmp_path, monkeypatch):
+    bodies = {
+        'https://cdn.example.com/1': (b'\x89PNG' + b'a' * 100000, 'image/png'),
+        'https://cdn.example.com/2': (b'\xff\xd8' + b'b' * 10, 'image/jpeg'),
+    }
+
+    def fake_request(method, url, **kwargs):
+        assert kwargs.get('stream') is True
+        if url not in bodies:
+            raise RuntimeError('404')
+        return _FakeResponse(*bodies[url])
+
+    monkeypatch.setattr(tl_inference, '_requests_with_retries', fake_request)
+
+    urls = list(bodies) + ['https://cdn.example.com/missing', 'not-a-url']
+    fut = tl_inference._start_output_downloads(urls, dest_dir=tmp_path)
+    records = fut.result(timeout=10)
+
+    assert len(records) == 3
+    png, jpg, missing = records
+    assert png['path'].endswith('.png') and jpg['path'].endswith('.jpg')
+    assert png['sha256'] == hashlib.sha256(bodies['https://cdn.example.com/1'][0]).hexdigest()
+    assert Path(png['path']).read_bytes() == bodies['https://cdn.example.com/1'][0]
+    assert 'error' in missing
+    assert not list(tmp_path.glob('*.part'))
+
+
+
+def test_interrupted_output_download_removes_part_file(tmp_path, monkeypatch):
+    class _BrokenResponse(_FakeResponse):
+        def iter_content(self, chunk_size):
+            yield b'\x89PNG' + b'a' * 1000
+            raise ConnectionError('connection reset')
+
+    monkeypatch.setattr(tl_inference, '_requests_with_retries',
+                        lambda method, url, **kwargs: _BrokenResponse(b'', 'image/png'))
+    records = tl_inference._start_output_downloads(['https://cdn.example.com/1'], dest_dir=tmp_path).result(timeout=10)
+
+    assert 'connection reset' in records[0]['error']
+    assert not list(tmp_path.iterdir())
+
+
+
+def test_non_image_response_is_a_failed_download(tmp_path, monkeypatch):
+    monkeypatch.setattr(tl_inference, '_requests_with_retries',
+                        lambda method, url, **kwargs: _FakeResponse(b'<html>expired</html>', 'text/html; charset=utf-8'))
+    records = tl_inference._start_output_downloads(['https://cdn.example.com/1'], dest_dir=tmp_path).result(timeout=10)
+
+    assert 'not an image' in records[0]['error'] and 'path' not in records[0]
+    assert not list(tmp_path.iterdir())
+
+
+def test_collect_downloads_updates_job_file(tmp_path):
+    from concurrent.futures import Future
+
+    job_file = tmp_path / 'job.json'
+    fut = Future()
+    fut.set_result([{'url': 'u', 'path': 'p.png', 'sha256': 'abc', 'bytes': 3}])
+    job = {'meta': {'job_id': 'j'}, 'status': 'succeeded', 'result': {'images': ['u']},
+           'file_path': str(job_file), 'pending_downloads': fut}
+
+    assert tl_inference.collect_downloads(job) == ['p.png']
+    saved = json.loads(job_file.read_text(encoding='utf-8'))
+    assert saved['result']['images_meta'][0]['sha256'] == 'abc'
+    assert 'pending_downloads' not in job
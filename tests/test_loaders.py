@@ -0,0 +1,86 @@
+import os
+
+from top_loras import cache as tl_cache
+from ui import loaders
+
+
+def _write_cache(path, n):
+    results = [
+        {'id': f'owner/model-{i}', 'title_en': f'model-{i}', 'cover_url': f'https://example.com/{i}.png',
+         'downloads': 1000 - i}
+        for i in range(n)
+    ]
+    tl_cache.save_cache(str(path), results)
+
+
+def test_gallery_page_slices_and_clamps(tmp_path):
+    cache_file = tmp_path / 'top_loras_task.json'
+    _write_cache(cache_file, 30)
+
+    items, state = loaders.gallery_page(str(cache_file), page=1, page_size=12)
+    assert len(items) == 12
+    assert items[0] == ('https://example.com/12.png', 'model-12')
+    assert state['keys'][0] == 'owner/model-12'
+    assert (state['page'], state['pages'], state['total']) == (1, 3, 30)
+
+    items, state = loaders.gallery_page(str(cache_file), page=99, page_size=12)
+    assert state['page'] == 2 and len(items) == 6
+    assert loaders.page_label(state) == 'Page 3 / 3 · 30 models'
+
+    models = loaders.resolve_models(str(cache_file), state['keys'][:2])
+    assert [m['id'] for m in models] == ['owner/model-24', 'owner/model-25']
+    assert models[0]['title'] == 'model-24'
+
+
+def test_model_store_reloads_when_cache_changes(tmp_path):
+    cache_file = tmp_path / 'top_loras_task.json'
+    _write_cache(cache_file, 3)
+    first = loaders.load_model_store(str(cache_file))
+    assert loaders.load_model_store(str(cache_file)) is first
+
+    _write_cache(cache_file, 5)
+    st = os.stat(cache_file)
+    os.utime(cache_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    second = loaders.load_model_store(str(cache_file))
+    assert second is not first
+    assert len(second['order']) == 5
+
+
+def test_gallery_page_missing_cache(tmp_path):
+    items, state = loaders.gallery_page(str(tmp_path / 'missing.json'))
+    assert items == [] and state['total'] == 0
+    assert loaders.page_label(state) == 'No models'
+
+
+def test_render_cards_are_escaped_and_memoized(tmp_path, monkeypatch):
+    models = [
+        {'id': 'owner/a', 'title_en': '<b>A</b>', 'author': 'x&y', 'cover_url': 'https://e.com/a.png?x=1&y=2',
+         'updated_at': '2025-01-01', 'downloads': 5},
+        {'id': 'owner/b', 'title_en': 'B', 'cover_url': 'https://e.com/b.png', 'updated_at': '2025-01-01'},
+    ]
+    html_out = loaders.render_markdown_for_models(models)
+    assert '&lt;b&gt;A&lt;/b&gt;' in html_out and '<b>A</b>' not in html_out
+    assert 'x&amp;y' in html_out and 'a.png?x=1&amp;y=2' in html_out
+
+    rendered = []
+    real_render = loaders._render_card
+    monkeypatch.setattr(loaders, '_render_card', lambda m: rendered.append(m['id']) or real_render(m))
+    models[1] = {**models[1], 'downloads': 9}
+    assert 'Downloads: 9' in loaders.render_markdown_for_models(models)
+    assert rendered == ['owner/b']          # only the changed card is rebuilt
+
+
+def test_card_page_tracks_page_and_cache_version(tmp_path):
+    cache_file = tmp_path / 'top_loras_task.json'
+    _write_cache(cache_file, 3)
+    _items, state = loaders.gallery_page(str(cache_file), page=0, page_size=2)
+    first = loaders.card_page(state)
+    assert loaders.card_page(state) is first
+    assert 'model-1' in first and 'model-2' not in first
+    assert 'model-2' in loaders.card_page(loaders.gallery_page(str(cache_file), page=1, page_size=2)[1])
+
+    _write_cache(cache_file, 3)
+    st = os.stat(cache_file)
+    os.utime(cache_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert loaders.card_page(state) is not first
+    assert loaders.card_page(None) == loaders._EMPTY_HTML
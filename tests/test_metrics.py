@@ -0,0 +1,45 @@
+import json
+
+from top_loras import cache as tl_cache
+from top_loras import filter as tl_filter
+from top_loras import metrics as tl_metrics
+
+
+def test_registry_counters_timers_and_prometheus():
+    reg = tl_metrics.MetricsRegistry()
+    reg.inc('http_requests_total', endpoint='listing', status=200)
+    reg.inc('http_requests_total', 2, endpoint='listing', status=200)
+    reg.set_gauge('breaker_open', 1, host='cdn "a"')
+    reg.observe('stage_seconds', 0.5, stage='parse')
+    with reg.timer('stage_seconds', stage='parse'):
+        pass
+
+    snap = reg.snapshot()
+    assert snap['counters'] == [{'name': 'http_requests_total', 'labels': {'endpoint': 'listing', 'status': '200'}, 'value': 3}]
+    timer = snap['timers'][0]
+    assert timer['count'] == 2 and timer['max'] == 0.5
+
+    text = reg.to_prometheus()
+    assert '# TYPE top_loras_http_requests_total counter' in text
+    assert 'top_loras_http_requests_total{endpoint="listing",status="200"} 3' in text
+    assert 'top_loras_stage_seconds_count{stage="parse"} 2' in text
+    assert 'top_loras_breaker_open{host="cdn \\"a\\""} 1' in text
+
+
+def test_pipeline_records_stages_and_cache_lookups(tmp_path):
+    tl_metrics.REGISTRY.reset()
+    tl_filter.process_models([{'Name': 'a-lora', 'AigcType': 'lora'}, {'Name': 'plain'}])
+    tl_cache.load_cache(str(tmp_path / 'missing.json'))
+    tl_cache.save_cache(str(tmp_path / 'c.json'), [])
+    tl_cache.load_cache(str(tmp_path / 'c.json'), ttl=100)
+
+    snap = tl_metrics.snapshot()
+    stages = {t['labels'].get('stage') for t in snap['timers']}
+    assert {'filter', 'parse', 'cache_save', 'cache_load'} <= stages
+    lookups = {c['labels']['result']: c['value'] for c in snap['counters'] if c['name'] == 'cache_lookups_total'}
+    assert lookups == {'miss': 1, 'hit': 1}
+
+    out = tl_metrics.write_metrics(str(tmp_path / 'metrics.json'))
+    assert json.loads(open(out, encoding='utf-8').read())['counters']
+    prom = tl_metrics.write_metrics(str(tmp_path / 'metrics.prom'))
+    assert open(prom, encoding='utf-8').read().startswith('# TYPE')
@@ -0,0 +1,69 @@
+import pstats
+from pathlib import Path
+
+from top_loras import profiling
+from top_loras import filter as tl_filter
+
+
+def test_profile_run_writes_dumps_next_to_cache(tmp_path):
+    cache_file = tmp_path / 'top_loras_task.json'
+    items = [{'Name': f'owner/m{i}-lora', 'AigcType': 'lora', 'Downloads': i} for i in range(200)]
+
+    with profiling.profile_run(str(cache_file), top_n=5, sample_interval=0.001) as report:
+        for _ in range(3):
+            tl_filter.process_models(items)
+
+    for key in ('prof', 'collapsed', 'summary'):
+        assert Path(report[key]).parent == tmp_path
+        assert Path(report[key]).name.startswith('top_loras_task.json.profile-')
+    stats = pstats.Stats(report['prof'])
+    assert any(func[2] == 'process_models' for func in stats.stats)
+    summary = Path(report['summary']).read_text(encoding='utf-8')
+    assert 'by cumulative time' in summary and 'allocation sites' in summary
+    for line in Path(report['collapsed']).read_text(encoding='utf-8').splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0 and stack
+
+
+def test_maybe_profile_respects_env(tmp_path, monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    with profiling.maybe_profile(str(tmp_path / 'c.json')) as report:
+        pass
+    assert report == {}
+    assert not list(tmp_path.iterdir())
+
+    monkeypatch.setenv(profiling.PROFILE_ENV, '1')
+    with profiling.maybe_profile(str(tmp_path / 'c.json')) as report:
+        pass
+    assert Path(report['summary']).exists()
+
+
+def test_concurrent_maybe_profile_blocks_do_not_collide(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setenv(profiling.PROFILE_ENV, '1')
+    entered, release = threading.Event(), threading.Event()
+    reports = {}
+
+    def outer():
+        with profiling.maybe_profile(str(tmp_path / 'a.json')) as report:
+            entered.set()
+            release.wait(5)
+        reports['outer'] = report
+
+    t = threading.Thread(target=outer)
+    t.start()
+    assert entered.wait(5)
+    try:
+        with profiling.maybe_profile(str(tmp_path / 'b.json')) as report:
+            pass
+    finally:
+        release.set()
+        t.join(5)
+    assert report == {}
+    assert Path(reports['outer']['summary']).exists()
+    assert not list(tmp_path.glob('b.json.profile-*'))
+    # the lock is released afterwards
+    with profiling.maybe_profile(str(tmp_path / 'b.json')) as report:
+        pass
+    assert Path(report['summary']).exists()
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from top_loras import api as tl_api
+from top_loras import fetcher as tl_fetcher
+from top_loras import ranking
+
+DAY = 86400.0
+NOW = 1_760_000_000.0
+
+
+def _iso(days_ago):
+    import time
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(NOW - days_ago * DAY))
+
+
+MODELS = [
+    {'id': 'big-old', 'downloads': 10_000, 'likes': 5, 'updated_at': _iso(400)},
+    {'id': 'liked', 'downloads': 2_000, 'likes': 900, 'updated_at': _iso(75)},
+    {'id': 'fresh', 'downloads': 300, 'likes': 10, 'updated_at': _iso(0)},
+    {'id': 'undated', 'downloads': 50, 'likes': 1},
+]
+
+EXPECTED = {
+    'downloads': ['big-old', 'liked', 'fresh', 'undated'],
+    'likes': ['liked', 'fresh', 'big-old', 'undated'],
+    'popular': ['liked', 'big-old', 'fresh', 'undated'],
+    'trending': ['fresh', 'liked', 'big-old', 'undated'],
+    'fresh': ['fresh', 'liked', 'big-old', 'undated'],
+}
+
+
+@pytest.mark.parametrize('profile', sorted(ranking.PROFILES))
+def test_each_profile_orders_models(profile):
+    ranked = ranking.rank_models(MODELS, profile, now=NOW)
+    assert [m['id'] for m in ranked] == EXPECTED[profile]
+    assert [m['id'] for m in ranking.rank_models(MODELS, profile, limit=2, now=NOW)] == EXPECTED[profile][:2]
+
+
+@pytest.mark.parametrize('profile', sorted(ranking.PROFILES) + ['likes:1,age_days:2:decay'])
+def test_list_fallback_matches_numpy(profile, monkeypatch):
+    vectorized = ranking.Ranker(MODELS, now=NOW).scores(profile)
+    monkeypatch.setattr(ranking, '_np', lambda: None)
+    ranker = ranking.Ranker(MODELS, now=NOW)
+    assert ranker._np is None
+    assert ranker.scores(profile) == pytest.approx(vectorized)
+    assert [m['id'] for m in ranking.rank_models(MODELS, profile, now=NOW)] == \
+        [MODELS[p]['id'] for p in ranking.Ranker(MODELS, now=NOW).order(profile)]
+    if profile in EXPECTED:
+        assert [m['id'] for m in ranking.rank_models(MODELS, profile, now=NOW)] == EXPECTED[profile]
+
+
+def test_ties_keep_input_order_and_bad_specs_are_rejected():
+    tied = [{'id': c, 'downloads': 1} for c in 'abc']
+    assert [m['id'] for m in ranking.rank_models(tied, 'downloads')] == ['a', 'b', 'c']
+    assert ranking.resolve_profile('downloads:0.5:log,likes:2') == [('downloads', 0.5, 'log'), ('likes', 2.0, 'raw')]
+    for bad in ('stars:1', 'likes:1:cube', 'nonsense'):
+        with pytest.raises(ValueError):
+            ranking.resolve_profile(bad)
+
+
+def test_cache_stays_download_ranked_and_profiles_rank_the_pool(tmp_path, monkeypatch):
+    raw = [{'Name': f'owner/lora-{i}', 'AigcType': 'lora', 'Downloads': 100 - i, 'Likes': i} for i in range(10)]
+    planned = []
+    monkeypatch.setattr(tl_api, 'fetch_models', lambda limit, **kwargs: planned.append(limit) or raw)
+    cache_file = tmp_path / 'top_loras.json'
+    kwargs = dict(limit=3, cache_file=str(cache_file), images_dir=str(tmp_path / 'images'),
+                  download_images=False, archive_raw=False, per_task_cache=False)
+
+    liked = tl_fetcher.fetch_top_loras(rank_profile='likes', force_refresh=True, **kwargs)
+    # the crawl is planned for the candidate pool, not only the top 3
+    assert planned == [ranking.pool_size(3)]
+    assert [m['id'] for m in liked] == ['owner/lora-9', 'owner/lora-8', 'owner/lora-7']
+
+    payload = json.loads(cache_file.read_text(encoding='utf-8'))
+    assert [m['id'] for m in payload['results']] == ['owner/lora-0', 'owner/lora-1', 'owner/lora-2']
+    assert len(payload['candidates']) == 7
+    # a later default read is unaffected by the profile, and a cache hit re-ranks the whole pool
+    assert [m['id'] for m in tl_fetcher.fetch_top_loras(**kwargs)] == ['owner/lora-0', 'owner/lora-1', 'owner/lora-2']
+    assert [m['id'] for m in tl_fetcher.fetch_top_loras(rank_profile='likes', **kwargs)][0] == 'owner/lora-9'
@@ -0,0 +1,81 @@
+import threading
+
+from top_loras import api as tl_api
+from top_loras import fetcher as tl_fetcher
+from top_loras.refresh import RefreshManager
+
+
+def test_concurrent_refreshes_are_coalesced():
+    release = threading.Event()
+    calls = []
+
+    def fake_fetch(task=None, progress=None, **kwargs):
+        calls.append(task)
+        progress({'stage': 'listing', 'page': 1, 'page_models': 2, 'models': 2})
+        release.wait(5)
+        return [{'id': 'a'}]
+
+    manager = RefreshManager(fetch=fake_fetch)
+    job, started = manager.start('task-a', True, download_images=False)
+    again, started_again = manager.start('task-a', True, download_images=False)
+    other, _ = manager.start('task-a', False, download_images=False)
+    assert started and not started_again and again is job and other is not job
+
+    events, done = job.wait_events(0, timeout=5)
+    assert events[0]['stage'] == 'listing' and not done
+    release.set()
+    assert job.wait(5) and other.wait(5)
+    assert job.results == [{'id': 'a'}] and job.error is None
+    assert sorted(calls, key=str) == ['task-a', 'task-a']
+
+    # a finished job is not reused
+    rerun, started = manager.start('task-a', True, download_images=False)
+    assert started and rerun is not job
+    rerun.wait(5)
+
+
+def test_refresh_job_records_errors():
+    def failing_fetch(**kwargs):
+        raise RuntimeError('listing down')
+
+    job, _ = RefreshManager(fetch=failing_fetch).start('t', True, download_images=False)
+    assert job.wait(5)
+    assert job.status == 'error' and job.error == 'listing down'
+
+
+def test_fetch_top_loras_reports_progress(tmp_path, monkeypatch):
+    def fake_fetch_models(progress=None, **kwargs):
+        progress({'stage': 'listing', 'page': 1, 'page_models': 1, 'models': 1})
+        return [{'Name': 'owner/x-lora', 'AigcType': 'lora', 'Downloads': 5,
+                 'MuseInfo': {'versions': [{'coverImages': [{'url': 'https://example.com/x.png'}]}]}}]
+
+    monkeypatch.setattr(tl_api, 'fetch_models', fake_fetch_models)
+    monkeypatch.setattr('top_loras.download.download_image', lambda url, dest, session=None: True)
+    monkeypatch.setattr('top_loras.download._new_session', lambda: None)
+
+    events = []
+    tl_fetcher.fetch_top_loras(force_refresh=True, cache_file=str(tmp_path / 'c.json'),
+                               images_dir=str(tmp_path / 'img'), per_task_cache=False, progress=events.append)
+    assert [e['stage'] for e in events] == ['listing', 'ranked', 'covers', 'saved']
+    assert events[2]['done'] == events[2]['total'] == 1
+    assert events[-1]['results'][0]['cover_local'].endswith('.png')
+
+
+def test_waiting_for_a_held_lock_is_bounded_and_serves_the_stale_cache(tmp_path, monkeypatch):
+    from top_loras import cache as tl_cache
+    from top_loras import refresh
+
+    cache_file = str(tmp_path / 'top_loras_t.json')
+    tl_cache.save_cache(cache_file, [{'id': 'stale'}])
+    monkeypatch.setattr(tl_fetcher, 'task_cache_paths', lambda task: (cache_file, str(tmp_path / 'g.json')))
+    monkeypatch.setattr(refresh, 'LOCK_WAIT_TIMEOUT', 0.2)
+    monkeypatch.setattr(refresh, 'LOCK_POLL_INTERVAL', 0.05)
+    calls = []
+
+    # another process holding the lock is simulated by a second open file description
+    with tl_cache.cache_lock(cache_file):
+        job, _ = RefreshManager(fetch=lambda **kwargs: calls.append(kwargs)).start('t', True, download_images=False)
+        assert job.wait(5)
+    assert not calls
+    assert job.status == 'done' and job.results == [{'id': 'stale'}]
+    assert [e['stage'] for e in job.events] == ['waiting']
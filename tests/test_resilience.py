@@ -0,0 +1,106 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from top_loras import download as tl_download
+from top_loras import metrics
+from top_loras import resilience
+
+
+@pytest.fixture(autouse=True)
+def _fresh_hosts():
+    resilience.reset()
+    yield
+    resilience.reset()
+
+
+def _fail():
+    raise ConnectionError('reset by peer')
+
+
+def test_breaker_opens_fails_fast_and_recovers_through_a_probe():
+    url = 'https://cdn.example.com/a.png'
+    breaker = resilience.host_state(url).breaker
+    breaker.reset_timeout = 0.05
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            resilience.call(url, _fail, hedge=False)
+    assert breaker.state == resilience.OPEN and resilience.is_open(url)
+
+    calls = []
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.call(url, lambda: calls.append(1), hedge=False)
+    assert calls == []
+
+    time.sleep(0.06)
+    # one probe is let through; success closes the circuit
+    assert resilience.call(url, lambda: SimpleNamespace(status_code=200), hedge=False).status_code == 200
+    assert breaker.state == resilience.CLOSED
+    # 5xx responses count as failures, 4xx do not
+    for _ in range(breaker.failure_threshold - 1):
+        resilience.call(url, lambda: SimpleNamespace(status_code=503), hedge=False)
+    resilience.call(url, lambda: SimpleNamespace(status_code=404), hedge=False)
+    assert breaker.state == resilience.CLOSED
+    gauges = {(g['name'], g['labels'].get('host')): g['value'] for g in metrics.snapshot()['gauges']}
+    assert gauges[('circuit_breaker_state', 'cdn.example.com')] == 0
+
+
+
+def test_interrupted_probe_does_not_wedge_the_breaker_half_open():
+    url = 'https://cdn.example.com/a.png'
+    breaker = resilience.host_state(url).breaker
+    breaker.reset_timeout = 0.01
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            resilience.call(url, _fail, hedge=False)
+    time.sleep(0.02)
+
+    def _interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        resilience.call(url, _interrupted, hedge=False)
+    assert breaker.state == resilience.HALF_OPEN
+    # the next caller gets to probe instead of being rejected forever
+    assert resilience.call(url, lambda: SimpleNamespace(status_code=200), hedge=False).status_code == 200
+    assert breaker.state == resilience.CLOSED
+
+
+def test_slow_request_is_hedged_past_p95(monkeypatch):
+    monkeypatch.setattr(resilience, 'MIN_HEDGE_DELAY', 0.0)
+    url = 'https://www.example.com/api/v1/dolphin/models'
+    state = resilience.host_state(url)
+    for _ in range(resilience.DEFAULT_MIN_SAMPLES):
+        resilience.call(url, lambda: SimpleNamespace(status_code=200, name='warm'))
+    assert state.latency.p95 is not None
+
+    release = threading.Event()
+    attempts = []
+
+    def slow_then_fast():
+        attempts.append(1)
+        if len(attempts) == 1:
+            release.wait(5)     # the degraded node
+            return SimpleNamespace(status_code=200, name='primary', close=lambda: None)
+        return SimpleNamespace(status_code=200, name='backup')
+
+    started = time.perf_counter()
+    result = resilience.call(url, slow_then_fast)
+    assert result.name == 'backup' and time.perf_counter() - started < 1
+    release.set()
+    assert len(attempts) == 2 and state.hedges == 1
+    assert resilience.snapshot()['www.example.com']['hedges'] == 1
+
+
+def test_image_downloads_are_shed_while_the_host_is_open(tmp_path):
+    url = 'https://cdn.example.com/cover.png'
+    breaker = resilience.host_state(url).breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    session = SimpleNamespace(get=lambda *a, **kw: pytest.fail('an open host must not be contacted'))
+    started = time.perf_counter()
+    assert tl_download.download_image(url, tmp_path / 'cover.png', session=session) is False
+    assert time.perf_counter() - started < 0.5   # no retry sleeps either
@@ -0,0 +1,65 @@
+import os
+
+from top_loras import cache as tl_cache
+from top_loras.search import LeaderboardIndex, tokenize
+from ui import loaders
+
+MODELS = [
+    {'id': 'yiwanji/FLUX_xiao_hong_shu_V2', 'title_cn': '小红书极致真实', 'title_en': 'FLUX_xiao_hong_shu_V2',
+     'author': 'yiwanji', 'downloads': 500, 'likes': 10, 'updated_at': '2025-03-07T08:19:08Z',
+     'base_models': ['AI-ModelScope/FLUX.1-dev'], 'tags_en': ['Photography', 'Woman'], 'vision_foundation': 'FLUX_1'},
+    {'id': 'MAILAND/majicflus_ink', 'title_cn': '水墨国风', 'title_en': 'majicflus ink', 'author': 'MAILAND',
+     'downloads': 300, 'likes': 90, 'updated_at': '2025-06-01T00:00:00Z', 'trigger_words': ['inkstyle'],
+     'base_models': ['AI-ModelScope/FLUX.1-dev'], 'tags_en': ['Style'], 'vision_foundation': 'FLUX_1'},
+    {'id': 'Qwen/portrait_real', 'title_en': 'Portrait Realism', 'author': 'Qwen', 'downloads': 100, 'likes': 40,
+     'updated_at': None, 'base_models': ['Qwen/Qwen-Image'], 'tags_en': ['Photography'],
+     'vision_foundation': 'QWEN_IMAGE_20_B'},
+]
+
+
+def test_tokenize_splits_words_and_cjk_bigrams():
+    assert tokenize('FLUX_xiao-Hong') == ['flux', 'xiao', 'hong']
+    assert tokenize('水墨国') == ['水', '墨', '国', '水墨', '墨国']
+
+
+def test_search_text_prefix_and_cjk():
+    index = LeaderboardIndex(MODELS)
+    assert index.search('xiao hong') == [0]
+    assert index.search('port') == [2]          # prefix match on the last word
+    assert index.search('inkst') == [1]         # trigger words are indexed
+    assert index.search('国风') == [1]
+    assert index.search('真实 flux') == [0]
+    assert index.search('nothing-here') == []
+
+
+def test_search_sort_and_facets():
+    index = LeaderboardIndex(MODELS)
+    assert index.search() == [0, 1, 2]
+    assert index.search(sort='likes') == [1, 2, 0]
+    assert index.search(sort='updated_at') == [1, 0, 2]
+    assert index.search(sort='likes', descending=False) == [0, 2, 1]
+    assert index.search(filters={'tags_en': ['Photography']}) == [0, 2]
+    assert index.search(filters={'tags_en': ['Photography'], 'author': ['Qwen', 'MAILAND']}) == [2]
+    assert index.search('flux', filters={'vision_foundation': 'QWEN_IMAGE_20_B'}) == []
+    assert index.facet_values('base_models')[0] == ('AI-ModelScope/FLUX.1-dev', 2)
+
+
+def test_gallery_query_uses_cached_index(tmp_path):
+    cache_file = str(tmp_path / 'top_loras_task.json')
+    tl_cache.save_cache(cache_file, MODELS)
+
+    items, state = loaders.gallery_page(cache_file, page_size=1,
+                                        query={'text': '', 'sort': 'likes', 'filters': {'tags_en': ['Photography']}})
+    assert state['keys'] == ['Qwen/portrait_real'] and state['total'] == 2
+    index = loaders.search_index(cache_file)
+    assert loaders.search_index(cache_file) is index
+
+    _items, state = loaders.gallery_page(cache_file, page=1, page_size=1, query=state['query'])
+    assert state['keys'] == ['yiwanji/FLUX_xiao_hong_shu_V2']
+    assert loaders.search_keys(cache_file, {'text': '', 'sort': 'downloads', 'filters': {}}) is None
+
+    tl_cache.save_cache(cache_file, MODELS[:1])
+    st = os.stat(cache_file)
+    os.utime(cache_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert loaders.search_index(cache_file) is not index
+    assert loaders.facet_choices(cache_file, 'author') == ['yiwanji']
@@ -0,0 +1,35 @@
+import pytest
+
+from top_loras import cache as tl_cache
+from top_loras.refresh import RefreshManager
+from ui import serving
+
+
+def test_concurrency_limits_precedence(monkeypatch):
+    monkeypatch.setenv('TOP_LORAS_CONCURRENCY_GENERATE', '8')
+    limits = serving.concurrency_limits({'refresh': 2, 'select': None})
+    assert limits == {'select': serving.DEFAULT_CONCURRENCY['select'], 'generate': 8, 'refresh': 2}
+    monkeypatch.setenv('TOP_LORAS_QUEUE_SIZE', '10')
+    assert serving.queue_size() == 10 and serving.queue_size(3) == 3
+
+
+@pytest.mark.skipif(tl_cache.fcntl is None, reason='fcntl locks are POSIX-only')
+def test_refresh_waits_for_a_refresh_holding_the_cache_lock(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache_file = 'cache/top_loras.json'
+    calls = []
+    manager = RefreshManager(fetch=lambda **kw: calls.append(kw) or [])
+
+    with tl_cache.cache_lock(cache_file) as owner:
+        assert owner
+        with tl_cache.cache_lock(cache_file, blocking=False) as other:
+            assert other is False
+        job, _ = manager.start(None, True, download_images=False)
+        events, _done = job.wait_events(0, timeout=5)
+        assert events[0]['stage'] == 'waiting'
+        # the "other worker" finishes its refresh and releases the lock
+        tl_cache.save_cache(cache_file, [{'id': 'fresh'}])
+
+    assert job.wait(5)
+    assert job.results == [{'id': 'fresh'}]
+    assert calls == []
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from top_loras import api as tl_api
+from top_loras import fetcher as tl_fetcher
+from top_loras.singleflight import Group
+
+
+def _run_concurrently(n, target):
+    results = [None] * n
+    errors = [None] * n
+
+    def _one(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=_one, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    group = Group('test')
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {'value': 42}
+
+    threads, results, _errors = _run_concurrently(4, lambda: group.do('k', slow))
+    while not group.in_flight('k') or group._calls['k'].shared < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == [1]
+    assert all(r is results[0] for r in results) and results[0] == {'value': 42}
+    assert not group.in_flight('k')
+    # nothing is memoized once the flight lands
+    assert group.do('k', lambda: 'again') == 'again'
+
+
+def test_errors_reach_every_waiter():
+    group = Group('test')
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('listing down')
+
+    threads, _results, errors = _run_concurrently(3, lambda: group.do('k', failing))
+    while not group.in_flight('k') or group._calls['k'].shared < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert [str(e) for e in errors] == ['listing down'] * 3
+    with pytest.raises(ValueError):
+        group.do('k', lambda: (_ for _ in ()).throw(ValueError('next call runs afresh')))
+
+
+def test_identical_fetches_coalesce_into_one_crawl(tmp_path, monkeypatch):
+    release = threading.Event()
+    crawls = []
+
+    def fake_fetch_models(limit=20, tag='lora', task=None, **kwargs):
+        crawls.append(task)
+        release.wait(5)
+        return [{'Name': 'owner/a-lora', 'AigcType': 'lora', 'Downloads': 5}]
+
+    monkeypatch.setattr(tl_api, 'fetch_models', fake_fetch_models)
+    kwargs = dict(task='t2i', cache_file=str(tmp_path / 'top_loras.json'), images_dir=str(tmp_path / 'images'),
+                  download_images=False, force_refresh=True, archive_raw=False)
+    threads, results, errors = _run_concurrently(3, lambda: tl_fetcher.fetch_top_loras(**kwargs))
+    key = ('lora', 't2i', tl_fetcher.DEFAULT_LIMIT, None, 5, kwargs['cache_file'])
+    flights = tl_fetcher.singleflight.FETCHES
+    while not flights.in_flight(key) or flights._calls[key].shared < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert errors == [None] * 3
+    assert crawls == ['t2i']
+    assert [r[0]['id'] for r in results] == ['owner/a-lora'] * 3
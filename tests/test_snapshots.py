@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from top_loras import cache as tl_cache
+from top_loras import cli
+from top_loras import snapshots
+
+DAY = 86400.0
+NOW = 1_760_000_000.0
+
+
+def _series(cache_file):
+    # 'steady' gains 100/day for 10 days, 'rocket' appears 2 days ago and gains 1000/day
+    for day in range(10, -1, -1):
+        models = [{'id': 'steady', 'downloads': 5000 - day * 100, 'likes': 10}]
+        if day <= 2:
+            models.append({'id': 'rocket', 'downloads': 50 + (2 - day) * 1000, 'likes': 3 - day})
+        snapshots.record(cache_file, models, ts=NOW - day * DAY)
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_velocity_over_window(tmp_path, monkeypatch, vectorized):
+    cache_file = str(tmp_path / 'top_loras.json')
+    _series(cache_file)
+    if not vectorized:
+        monkeypatch.setattr(snapshots, '_np', lambda: None)
+
+    rows = snapshots.velocity(cache_file, days=7, now=NOW)
+    assert [r['id'] for r in rows] == ['rocket', 'steady']
+    rocket, steady = rows
+    assert rocket['delta_downloads'] == 2000 and rocket['downloads_per_day'] == pytest.approx(1000)
+    assert rocket['delta_likes'] == 2 and rocket['downloads'] == 2050
+    # the baseline is the snapshot at the window start, so the whole week is rated
+    assert steady['delta_downloads'] == 700 and steady['days'] == pytest.approx(7)
+    assert snapshots.velocity(cache_file, days=7, now=NOW, limit=1)[0]['id'] == 'rocket'
+
+
+def test_uncommitted_tail_is_ignored_and_overwritten(tmp_path):
+    cache_file = str(tmp_path / 'top_loras.json')
+    snapshots.record(cache_file, [{'id': 'a', 'downloads': 1}], ts=NOW)
+    d = snapshots.store_dir(cache_file)
+    # an append that crashed before committing its row count
+    with open(d / '0.ts.bin', 'ab') as f:
+        f.write(b'\xff' * 12)
+    assert list(snapshots.load(cache_file)['ts']) == [NOW]
+
+    snapshots.record(cache_file, [{'id': 'a', 'downloads': 5}, {'id': 'b', 'downloads': 2}, {'id': 'a'}], ts=NOW + 60)
+    data = snapshots.load(cache_file)
+    assert list(data['ts']) == [NOW, NOW + 60, NOW + 60]
+    assert [data['ids'][m] for m in data['model']] == ['a', 'a', 'b']
+    assert list(data['downloads']) == [1, 5, 2]
+    assert (d / '0.ts.bin').stat().st_size == 3 * 8
+
+
+def test_compaction_downsamples_old_snapshots_and_drops_expired(tmp_path):
+    cache_file = str(tmp_path / 'top_loras.json')
+    hours = [NOW - h * 3600.0 for h in range(24 * 40, -1, -6)]
+    for ts in hours:
+        snapshots.record(cache_file, [{'id': 'old' if ts < NOW - 30 * DAY else 'new', 'downloads': int(ts)}], ts=ts)
+
+    # record() already compacted once a day with the defaults (14 days at full resolution)
+    assert len(snapshots.timestamps(cache_file)) < len(hours)
+
+    stats = snapshots.compact(cache_file, now=NOW, full_days=2, bucket_seconds=DAY, max_age_days=30)
+    kept = snapshots.timestamps(cache_file)
+    assert stats['rows_before'] > stats['rows'] == len(kept)
+    assert min(kept) >= NOW - 30 * DAY
+    # full resolution inside the last two days, one snapshot per day before that
+    assert [t for t in kept if t >= NOW - 2 * DAY] == [t for t in hours if t >= NOW - 2 * DAY]
+    old_days = [int(t // DAY) for t in kept if t < NOW - 2 * DAY]
+    assert len(old_days) == len(set(old_days))
+
+    d = snapshots.store_dir(cache_file)
+    meta = json.loads((d / snapshots.META_FILE).read_text())
+    gen = meta['generation']
+    assert meta['ids'] == ['new']
+    assert sorted(p.name for p in d.glob('*.bin')) == [f'{gen}.{c}.bin' for c in ('downloads', 'likes', 'model', 'ts')]
+    snapshots.record(cache_file, [{'id': 'new', 'downloads': 1}], ts=NOW + 1)
+    assert snapshots.timestamps(cache_file)[-1] == NOW + 1
+
+
+def test_save_cache_appends_a_snapshot_and_trending_command(tmp_path, capsys):
+    cache_file = str(tmp_path / 'top_loras.json')
+    assert cli.run_cli(['trending', '--cache-file', cache_file]) == 1
+
+    tl_cache.save_cache(cache_file, [{'id': 'a', 'downloads': 10}], candidates=[{'id': 'b', 'downloads': 3}])
+    data = snapshots.load(cache_file)
+    assert sorted(data['ids']) == ['a', 'b'] and len(data['ts']) == 2
+
+    assert cli.run_cli(['trending', '--cache-file', cache_file, '--limit', '1']) == 0
+    assert 'Top 1 by downloads/day' in capsys.readouterr().out
+
+
+def test_writers_take_the_inter_process_store_lock(tmp_path):
+    import threading
+
+    cache_file = str(tmp_path / 'top_loras.json')
+    snapshots.record(cache_file, [{'id': 'a', 'downloads': 1}], ts=NOW)
+    done = threading.Event()
+
+    # another process appending is simulated by holding the lock file on a separate descriptor
+    with tl_cache.cache_lock(str(snapshots.store_dir(cache_file) / 'store')):
+        t = threading.Thread(target=lambda: (snapshots.record(cache_file, [{'id': 'a', 'downloads': 2}], ts=NOW + 1),
+                                             done.set()))
+        t.start()
+        assert not done.wait(0.2)
+        assert len(snapshots.timestamps(cache_file)) == 1
+    t.join(5)
+    assert done.is_set() and snapshots.timestamps(cache_file) == [NOW, NOW + 1]
@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from top_loras import cache as tl_cache
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ('modelscope', 'gradio', 'requests', 'dotenv')
+
+
+def _loaded_heavy_modules(code):
+    probe = f"{code}\nimport sys, json\nprint(json.dumps(sorted(m for m in {HEAVY!r} if m in sys.modules)))"
+    proc = subprocess.run([sys.executable, '-c', probe], cwd=str(ROOT), capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_package_import_is_lazy():
+    assert _loaded_heavy_modules('import top_loras.cli, top_loras.fetcher, top_loras.inference') == []
+
+
+def test_cache_hit_cli_run_skips_heavy_imports(tmp_path):
+    cache_file = tmp_path / 'top_loras.json'
+    tl_cache.save_cache(str(cache_file), [{'id': 'owner/model', 'title_en': 'model', 'downloads': 3}])
+    code = (
+        "from top_loras import cli\n"
+        f"cli.run_cli(['--task', 'text-to-image-synthesis', '--cache-file', {str(cache_file)!r}, '--ttl', '999999'])"
+    )
+    assert _loaded_heavy_modules(code) == []
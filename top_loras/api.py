@@ -1,26 +1,73 @@
 import os
 import time
 import json
+import logging
 from typing import Optional
 
+from . import metrics
+from . import resilience
+from .crawl import CrawlPlanner
+
+logger = logging.getLogger(__name__)
+
 DEFAULT_TIMEOUT = 20
 MODELSCOPE_ENDPOINT = '/api/v1/dolphin/models'
+# Listing pages are retried on connection errors, timeouts and these statuses
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_PAGE_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 1.0
+# An interrupted archived crawl younger than this is resumed instead of restarted
+DEFAULT_RESUME_WINDOW = 3600
+# 'auto' uses modelscope's HubApi when installed and the built-in client otherwise
+LISTING_CLIENT_ENV = 'TOP_LORAS_LISTING_CLIENT'
+
+_HUB_API_CLASS = None
+_ENV_LOADED = False
+
+
+def _hub_api_class():
+    """Pick the listing client class on first use.
+
+    modelscope's HubApi is a very heavy import, so it is only loaded here;
+    without it (or with TOP_LORAS_LISTING_CLIENT=native) the built-in
+    `http_client.ListingClient` is used.
+    """
+    global _HUB_API_CLASS
+    if _HUB_API_CLASS is None:
+        choice = os.environ.get(LISTING_CLIENT_ENV, 'auto').strip().lower()
+        HubApi = None
+        if choice != 'native':
+            try:
+                from modelscope.hub.api import HubApi
+            except Exception:
+                HubApi = None
+        if HubApi is None:
+            from .http_client import ListingClient as HubApi
+        _HUB_API_CLASS = HubApi
+    return _HUB_API_CLASS
+
+
+def request_timeout(api):
+    """(connect, read) timeout for listing requests made through `api`."""
+    timeout = getattr(api, 'timeout', None)
+    if isinstance(timeout, tuple):
+        return timeout
+    from .http_client import request_timeout as _default_timeout
+    return _default_timeout()
+
+
+def load_env():
+    """Load .env from the working directory once (for MODELSCOPE_API_TOKEN)."""
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    _ENV_LOADED = True
+    try:
+        from dotenv import load_dotenv
+    except Exception:
+        return
+    load_dotenv()
 
-try:
-    from modelscope.hub.api import HubApi
-except Exception:
-    class HubApi:
-        def __init__(self):
-            self.endpoint = 'https://www.modelscope.cn'
-            self.headers = {}
-            class _S:
-                def put(self, *a, **k):
-                    raise RuntimeError('HubApi.put not available in stub')
-            self.session = _S()
-        def builder_headers(self, headers):
-            return {}
-        def login(self, token):
-            return None
 
 def build_search_body(limit, tag='lora', task: Optional[str] = None, page_number: int = 1):
     body = {
@@ -45,15 +92,54 @@ def build_headers(api, csrf_token=None):
     return headers
 
 
-def fetch_models(limit=20, tag='lora', task: Optional[str] = None,
-                 debug: bool = False, token_env: str = 'MODELSCOPE_API_TOKEN',
-                 page_size: Optional[int] = None, max_pages: int = 5):
-    """
-    Return a list of raw model dicts either by reading an offline JSON or by paginated
-    requests to the ModelScope frontend API.
+def extract_models_page(page_json):
+    """Pull the list of raw model dicts out of one listing response (shape varies by endpoint version)."""
+    if not isinstance(page_json, dict):
+        return []
+    data_page = page_json.get('Data') or page_json
+
+    # extract models list heuristically
+    models_page = []
+    for key in ('Models', 'models', 'Items', 'Model', 'List', 'Hits'):
+        v = data_page.get(key) if isinstance(data_page, dict) else None
+        if isinstance(v, list):
+            models_page = v
+            break
+        # if v is a dict, try to find a list inside it (e.g. Model -> Items)
+        if isinstance(v, dict):
+            for sub in ('Models', 'models', 'Items', 'List', 'Hits'):
+                vv = v.get(sub)
+                if isinstance(vv, list):
+                    models_page = vv
+                    break
+            if models_page:
+                break
+    if not models_page and isinstance(data_page, dict):
+        for v in data_page.values():
+            # if value is a list, use it
+            if isinstance(v, list):
+                models_page = v
+                break
+            # if value is a dict, try to find list inside
+            if isinstance(v, dict):
+                for vv in v.values():
+                    if isinstance(vv, list):
+                        models_page = vv
+                        break
+                if models_page:
+                    break
+
+    return models_page
+
+
+def create_api(token_env: str = 'MODELSCOPE_API_TOKEN', debug: bool = False):
+    """Build a HubApi and log in with the token from `token_env` if present.
+
+    Long-running callers can keep the returned object and pass it to
+    `fetch_models(api=...)` to reuse its HTTP session and login.
     """
-    # Online path
-    api = HubApi()
+    load_env()
+    api = _hub_api_class()()
     token = os.environ.get(token_env)
     if token:
         try:
@@ -66,29 +152,130 @@ def fetch_models(limit=20, tag='lora', task: Optional[str] = None,
     else:
         if debug:
             print('No token provided: using anonymous session (may be limited)')
+    return api
+
+
+def _put_page(api, url, body, headers, timeout, limiter):
+    with metrics.stage('http_page'):
+        if limiter is not None:
+            with limiter:
+                return api.session.put(url, json=body, headers=headers, timeout=timeout)
+        return api.session.put(url, json=body, headers=headers, timeout=timeout)
+
+
+def request_page(api, url, body, headers, timeout, limiter=None, retries: int = DEFAULT_PAGE_RETRIES,
+                 backoff: float = DEFAULT_RETRY_BACKOFF, debug: bool = False):
+    """PUT one listing page and return its decoded JSON.
+
+    Connection errors, timeouts and TRANSIENT_STATUSES are retried up to
+    `retries` times with exponential backoff; 401 and other HTTP errors raise
+    immediately, as does `resilience.CircuitOpenError` while the listing host
+    is unhealthy.
+    """
+    base = api.endpoint.rstrip('/')
+    for attempt in range(retries + 1):
+        try:
+            # the listing query is idempotent, so a slow page may be hedged
+            response = resilience.call(url, lambda: _put_page(api, url, body, headers, timeout, limiter))
+        except resilience.CircuitOpenError:
+            metrics.inc('http_requests_total', endpoint='listing', status='shed')
+            raise
+        except Exception as e:
+            metrics.inc('http_requests_total', endpoint='listing', status='error')
+            if attempt >= retries:
+                raise RuntimeError(f"Failed to perform API request: {e}\nCheck network access to {base}.")
+            reason = str(e)
+        else:
+            status = getattr(response, 'status_code', None)
+            if status == 401:
+                raise RuntimeError('Unauthorized: API requires login. Export MODELSCOPE_API_TOKEN or login first.')
+            metrics.inc('http_requests_total', endpoint='listing', status=status)
+            if status not in TRANSIENT_STATUSES or attempt >= retries:
+                response.raise_for_status()
+                content = getattr(response, 'content', None)
+                if isinstance(content, (bytes, bytearray)):
+                    metrics.inc('http_response_bytes_total', len(content), endpoint='listing')
+                with metrics.stage('json_decode'):
+                    return response.json()
+            reason = f"HTTP {status}"
+        delay = backoff * (2 ** attempt)
+        metrics.inc('http_retries_total', endpoint='listing')
+        if debug:
+            print(f"[debug] page={body.get('PageNumber')} attempt {attempt + 1} failed ({reason}); retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def fetch_models(limit=20, tag='lora', task: Optional[str] = None,
+                 debug: bool = False, token_env: str = 'MODELSCOPE_API_TOKEN',
+                 page_size: Optional[int] = None, max_pages: int = 5, limiter=None, api=None,
+                 progress=None, archive_dir: Optional[str] = None,
+                 page_retries: int = DEFAULT_PAGE_RETRIES, resume_window: float = DEFAULT_RESUME_WINDOW):
+    """
+    Return a list of raw model dicts either by reading an offline JSON or by paginated
+    requests to the ModelScope frontend API.
+
+    `limiter` is an optional context manager (e.g. a shared BoundedSemaphore)
+    held around each HTTP request to cap concurrency across callers. `api` is
+    an already logged-in client from `create_api`; a new one is built per call
+    otherwise. `progress`, if given, is called with a
+    `{'stage': 'listing', 'page', 'page_models', 'models'}` dict after each page.
+    Each page is retried `page_retries` times on transient failures.
+
+    With `archive_dir`, every raw page is also stored gzip-compressed (see
+    `archive.CrawlArchive`) as it arrives. That archive doubles as a crawl
+    checkpoint: if an identical crawl was interrupted less than
+    `resume_window` seconds ago, its saved pages are reused and fetching
+    continues after the last one (0 disables resuming).
+    """
+    # Online path
+    if api is None:
+        api = create_api(token_env, debug=debug)
 
     base = api.endpoint.rstrip('/')
     url = base + MODELSCOPE_ENDPOINT
     csrf_token = os.environ.get('MODELSCOPE_CSRF_TOKEN')
     headers = build_headers(api, csrf_token)
+    timeout = request_timeout(api)
 
     collected_models = []
-    # allow caller to control paging for tuning/diagnostics
-    page_size = page_size if page_size is not None else min(max(limit * 4, 50), 200)
+    # Page size and stopping adapt to the observed LoRA yield (see crawl.CrawlPlanner);
+    # an explicit page_size pins the size and only the stop rule adapts.
+    planner = CrawlPlanner(limit, page_size=page_size)
 
-    for page in range(1, max_pages + 1):
-        body = build_search_body(page_size, tag, task, page_number=page)
-        if debug:
-            print(f"[debug] sending request to: {url} page={page} page_size={page_size}")
-        try:
-            response = api.session.put(url, json=body, headers=headers, timeout=DEFAULT_TIMEOUT)
-        except Exception as e:
-            raise RuntimeError(f"Failed to perform API request: {e}\nIf you are running offline, provide --offline-file <path> or install the 'modelscope' package.")
-        if getattr(response, 'status_code', None) == 401:
-            raise RuntimeError('Unauthorized: API requires login. Export MODELSCOPE_API_TOKEN or login first.')
+    archive = None
+    first_page = 1
+    if archive_dir:
+        from . import archive as tl_archive
+        query = build_search_body(planner.page_size, tag, task)
+        resumable = tl_archive.find_resumable(archive_dir, query, resume_window) if resume_window else None
+        if resumable is not None:
+            archive = tl_archive.CrawlArchive(archive_dir, query, run_dir=resumable)
+            for page_json, saved_size in archive.checkpoint_pages():
+                models_page = extract_models_page(page_json)
+                planner.observe(models_page, saved_size)
+                collected_models.extend(models_page)
+                first_page += 1
+            metrics.inc('crawl_resumes_total')
+            logger.info(f"Resuming crawl from {archive.run_dir} at page {first_page} "
+                        f"({len(collected_models)} models checkpointed)")
+        else:
+            archive = tl_archive.CrawlArchive(archive_dir, query, tag=tag, task=task)
 
-        response.raise_for_status()
-        page_json = response.json()
+    for page in range(first_page, max_pages + 1):
+        if planner.should_stop():
+            break
+        page_number, request_size = planner.next_request()
+        body = build_search_body(request_size, tag, task, page_number=page_number)
+        if debug:
+            print(f"[debug] sending request to: {url} page={page_number} page_size={request_size}")
+        # failures after the retries propagate; pages saved so far stay checkpointed
+        page_json = request_page(api, url, body, headers, timeout, limiter=limiter, retries=page_retries,
+                                 debug=debug)
+        if archive is not None:
+            try:
+                archive.save_page(page, page_json, page_size=request_size)
+            except Exception as e:
+                logger.warning(f"Failed to archive listing page {page}: {e}")
 
         # Debug: print status and top-level keys to diagnose empty responses
         if debug:
@@ -96,7 +283,7 @@ def fetch_models(limit=20, tag='lora', task: Optional[str] = None,
                 top_keys = list(page_json.keys()) if isinstance(page_json, dict) else type(page_json)
             except Exception:
                 top_keys = None
-            print(f"[debug] page={page} status={getattr(response, 'status_code', None)} top_keys={top_keys}")
+            print(f"[debug] page={page} top_keys={top_keys}")
             # Summarize Data field if present
             dp = page_json.get('Data') if isinstance(page_json, dict) else None
             if dp is None:
@@ -112,47 +299,26 @@ def fetch_models(limit=20, tag='lora', task: Optional[str] = None,
                 except Exception as e:
                     print(f"[debug] page={page} failed to summarize Data: {e}")
 
-        data_page = page_json.get('Data') or page_json
-
-        # extract models list heuristically
-        models_page = []
-        for key in ('Models', 'models', 'Items', 'Model', 'List', 'Hits'):
-            v = data_page.get(key) if isinstance(data_page, dict) else None
-            if isinstance(v, list):
-                models_page = v
-                break
-            # if v is a dict, try to find a list inside it (e.g. Model -> Items)
-            if isinstance(v, dict):
-                for sub in ('Models', 'models', 'Items', 'List', 'Hits'):
-                    vv = v.get(sub)
-                    if isinstance(vv, list):
-                        models_page = vv
-                        break
-                if models_page:
-                    break
-        if not models_page and isinstance(data_page, dict):
-            for v in data_page.values():
-                # if value is a list, use it
-                if isinstance(v, list):
-                    models_page = v
-                    break
-                # if value is a dict, try to find list inside
-                if isinstance(v, dict):
-                    for vv in v.values():
-                        if isinstance(vv, list):
-                            models_page = vv
-                            break
-                    if models_page:
-                        break
+        models_page = extract_models_page(page_json)
+        planner.observe(models_page, request_size)
 
         if debug:
-            print(f"[debug] page {page} extracted {len(models_page)} models")
+            print(f"[debug] page {page} extracted {len(models_page)} models "
+                  f"(acceptance {planner.acceptance_rate:.2f}, weakest kept {planner.weakest_kept})")
 
         if not models_page:
             break
 
         collected_models.extend(models_page)
-        if len(collected_models) >= limit * 4:
-            break
+        if progress is not None:
+            progress({'stage': 'listing', 'page': page, 'page_models': len(models_page),
+                      'models': len(collected_models)})
 
+    if planner.stop_reason == 'ranked':
+        metrics.inc('crawl_early_stops_total', reason=planner.stop_reason)
+    if debug:
+        print(f"[debug] crawl stopped after {planner.pages} pages, {planner.seen} raw models "
+              f"(reason={planner.stop_reason or 'max_pages'})")
+    if archive is not None:
+        archive.finish(complete=True)
     return collected_models
@@ -0,0 +1,229 @@
+"""
+Compressed archive of raw listing pages.
+
+With `api.fetch_models(archive_dir=...)` every listing page is stored as it
+arrives:
+
+  <archive_dir>/<crawl_key>/<run_id>/page-0001.json.gz   raw page JSON (gzip)
+  <archive_dir>/<crawl_key>/<run_id>/meta.json           request body, tag, task,
+                                                         pages written, complete flag
+
+`crawl_key` hashes the request body without its PageNumber, so runs of the
+same query (tag, task, page size) group together; `run_id` is the UTC start
+time. `fetcher.reprocess_tasks` rebuilds caches from the latest archived run
+without touching the network, and an interrupted run doubles as a crawl
+checkpoint that `api.fetch_models` resumes (see `find_resumable`).
+
+Retention: `prune` keeps the newest `keep_runs` runs of each crawl key and
+removes older runs past `max_age_days`, but never the newest complete run
+of a key (what `reprocess` rebuilds from). It runs after every archived
+refresh and from `top-loras gc-images`. Defaults come from
+TOP_LORAS_ARCHIVE_KEEP_RUNS (5) and TOP_LORAS_ARCHIVE_MAX_AGE_DAYS (30).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .cache import write_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_SUBDIR = 'raw'
+META_FILE = 'meta.json'
+DEFAULT_KEEP_RUNS = int(os.environ.get('TOP_LORAS_ARCHIVE_KEEP_RUNS', '5'))
+DEFAULT_MAX_AGE_DAYS = float(os.environ.get('TOP_LORAS_ARCHIVE_MAX_AGE_DAYS', '30'))
+
+
+def archive_dir_for(cache_file: str) -> str:
+    """Default archive location for a cache file: `<cache dir>/raw`."""
+    return str(Path(cache_file).parent / DEFAULT_ARCHIVE_SUBDIR)
+
+
+def crawl_key(body: Dict[str, Any]) -> str:
+    query = {k: v for k, v in body.items() if k != 'PageNumber'}
+    canonical = json.dumps(query, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def _page_name(page: int) -> str:
+    return f"page-{page:04d}.json.gz"
+
+
+class CrawlArchive:
+    """One archived crawl run; pages are written atomically as they arrive."""
+
+    def __init__(self, archive_dir: str, body: Dict[str, Any], tag: Optional[str] = None,
+                 task: Optional[str] = None, run_dir: Optional[Path] = None):
+        self.key = crawl_key(body)
+        if run_dir is None:
+            run_id = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()) + '-' + uuid.uuid4().hex[:6]
+            run_dir = Path(archive_dir) / self.key / run_id
+            self.meta = {
+                'crawl_key': self.key,
+                'body': {k: v for k, v in body.items() if k != 'PageNumber'},
+                'tag': tag,
+                'task': task,
+                'started_at': time.time(),
+                'updated_at': time.time(),
+                'pages': [],
+                'complete': False,
+            }
+        else:
+            self.meta = read_meta(run_dir)
+        self.run_dir = Path(run_dir)
+
+    def _write_meta(self):
+        self.meta['updated_at'] = time.time()
+        write_atomic(self.run_dir / META_FILE, json.dumps(self.meta, ensure_ascii=False, indent=2))
+
+    def save_page(self, page: int, page_json: Any, page_size: Optional[int] = None):
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        path = self.run_dir / _page_name(page)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with gzip.open(tmp, 'wt', encoding='utf-8') as fh:
+            json.dump(page_json, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+        if page not in self.meta['pages']:
+            self.meta['pages'].append(page)
+            self.meta['pages'].sort()
+        if page_size:
+            # adaptive crawls change PageSize between pages; resume needs each one
+            self.meta.setdefault('page_sizes', {})[str(page)] = page_size
+        self._write_meta()
+
+    def checkpoint_pages(self) -> Iterator[Tuple[Any, int]]:
+        """(page_json, page_size) for saved pages 1, 2, ... in order, stopping at the first gap or unreadable page."""
+        saved = set(self.meta.get('pages') or [])
+        sizes = self.meta.get('page_sizes') or {}
+        default_size = (self.meta.get('body') or {}).get('PageSize')
+        page = 1
+        while page in saved:
+            try:
+                yield load_page(self.run_dir, page), sizes.get(str(page), default_size)
+            except Exception as e:
+                logger.warning(f"Checkpoint page {page} in {self.run_dir} unreadable, refetching from there: {e}")
+                break
+            page += 1
+        # pages past a gap are refetched and overwritten
+        self.meta['pages'] = [p for p in self.meta.get('pages') or [] if p < page]
+
+    def finish(self, complete: bool = True):
+        self.meta['complete'] = complete
+        if self.meta['pages']:
+            self._write_meta()
+
+
+def read_meta(run_dir) -> Dict[str, Any]:
+    return json.loads((Path(run_dir) / META_FILE).read_text(encoding='utf-8'))
+
+
+def load_page(run_dir, page: int) -> Any:
+    with gzip.open(Path(run_dir) / _page_name(page), 'rt', encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def iter_runs(archive_dir: str) -> Iterator[Dict[str, Any]]:
+    """Yield the meta of every archived run (with its `run_dir`), unordered."""
+    root = Path(archive_dir)
+    if not root.is_dir():
+        return
+    for meta_path in root.glob(f"*/*/{META_FILE}"):
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except Exception as e:
+            logger.warning(f"Skipping unreadable archive run {meta_path.parent}: {e}")
+            continue
+        meta['run_dir'] = str(meta_path.parent)
+        yield meta
+
+
+def latest_run(archive_dir: str, task: Optional[str] = None, tag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Most recent run for (task, tag) with at least one page; complete runs win over partial ones."""
+    candidates = [m for m in iter_runs(archive_dir)
+                  if m.get('task') == task and (tag is None or m.get('tag') == tag) and m.get('pages')]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda m: (bool(m.get('complete')), m.get('started_at') or 0))
+
+
+def find_resumable(archive_dir: str, body: Dict[str, Any], max_age: float) -> Optional[Path]:
+    """Run dir of the newest incomplete crawl of `body` updated within `max_age` seconds, if any."""
+    root = Path(archive_dir) / crawl_key(body)
+    if not root.is_dir():
+        return None
+    cutoff = time.time() - max_age
+    best = None
+    for meta_path in root.glob(f"*/{META_FILE}"):
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except Exception:
+            continue
+        if meta.get('complete') or not meta.get('pages') or (meta.get('updated_at') or 0) < cutoff:
+            continue
+        if best is None or meta['updated_at'] > best[0]:
+            best = (meta['updated_at'], meta_path.parent)
+    return best[1] if best else None
+
+
+def archived_tasks(archive_dir: str, tag: Optional[str] = None) -> List[Optional[str]]:
+    seen = []
+    for m in iter_runs(archive_dir):
+        if (tag is None or m.get('tag') == tag) and m.get('pages') and m.get('task') not in seen:
+            seen.append(m.get('task'))
+    return seen
+
+
+def load_run_models(run_dir) -> List[Dict[str, Any]]:
+    """Raw model dicts from every archived page of a run, in page order."""
+    from .api import extract_models_page
+
+    models: List[Dict[str, Any]] = []
+    for page in read_meta(run_dir).get('pages') or []:
+        models.extend(extract_models_page(load_page(run_dir, page)))
+    return models
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+
+def prune(archive_dir: str, keep_runs: int = DEFAULT_KEEP_RUNS, max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+          now: Optional[float] = None, dry_run: bool = False) -> Dict[str, int]:
+    """Remove old runs: per crawl key, runs beyond the newest `keep_runs` that are older than `max_age_days`.
+
+    The newest complete run of every key is always kept. A non-positive
+    `max_age_days` removes every run beyond `keep_runs`. Returns
+    `{'runs', 'pruned', 'freed_bytes'}`.
+    """
+    now = time.time() if now is None else now
+    cutoff = now - max_age_days * 86400.0 if max_age_days > 0 else float('inf')
+    by_key: Dict[str, List[Dict[str, Any]]] = {}
+    for meta in iter_runs(archive_dir):
+        by_key.setdefault(str(Path(meta['run_dir']).parent), []).append(meta)
+
+    stats = {'runs': 0, 'pruned': 0, 'freed_bytes': 0}
+    for runs in by_key.values():
+        runs.sort(key=lambda m: m.get('started_at') or 0, reverse=True)
+        stats['runs'] += len(runs)
+        newest_complete = next((m for m in runs if m.get('complete')), None)
+        for meta in runs[max(0, keep_runs):]:
+            if meta is newest_complete or (meta.get('updated_at') or meta.get('started_at') or 0) >= cutoff:
+                continue
+            run_dir = Path(meta['run_dir'])
+            try:
+                freed = _dir_bytes(run_dir)
+                if not dry_run:
+                    shutil.rmtree(run_dir)
+            except OSError as e:
+                logger.warning(f"Failed to prune archive run {run_dir}: {e}")
+                continue
+            stats['pruned'] += 1
+            stats['freed_bytes'] += freed
+    return stats
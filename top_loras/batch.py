@@ -0,0 +1,171 @@
+"""
+Batch generation: fan a prompt × model × seed grid out to `submit_job`.
+
+Each grid cell is submitted as an ordinary job (so job files still land in
+cache/outputs/<task>/) with bounded concurrency and a submission rate cap,
+and the per-cell outcomes are collected into a single grid manifest.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .inference import submit_job, collect_downloads, _now_iso
+
+DEFAULT_MAX_WORKERS = 4
+# ModelScope API-Inference throttles per account; keep submissions spaced out
+DEFAULT_RATE_PER_MINUTE = float(os.environ.get("MODELSCOPE_BATCH_RATE_PER_MINUTE", "20"))
+DEFAULT_BATCH_DIR = Path("cache") / "outputs" / "batches"
+DEFAULT_TASK = "text-to-image-synthesis"
+
+
+class RateLimiter:
+    """Space out calls so that at most `rate_per_minute` start per minute.
+
+    A non-positive rate disables limiting.
+    """
+
+    def __init__(self, rate_per_minute: Optional[float]):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute and rate_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.interval
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+def build_grid(prompts: Iterable[str], models: Iterable[str], seeds: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """Return the cartesian product of prompts × models × seeds as cell dicts."""
+    prompts = list(prompts)
+    models = list(models)
+    seeds = list(seeds) if seeds else [0]
+    cells = []
+    for (pi, prompt), (mi, model_id), (si, seed) in itertools.product(enumerate(prompts), enumerate(models), enumerate(seeds)):
+        cells.append({
+            "index": len(cells),
+            "prompt_idx": pi,
+            "model_idx": mi,
+            "seed_idx": si,
+            "prompt": prompt,
+            "model_id": model_id,
+            "seed": int(seed),
+        })
+    return cells
+
+
+def _run_cell(cell: Dict[str, Any], batch_id: str, base_params: Dict[str, Any], token: Optional[str],
+              limiter: RateLimiter) -> Dict[str, Any]:
+    params = dict(base_params)
+    params.setdefault("task", DEFAULT_TASK)
+    params["prompt"] = cell["prompt"]
+    params["seed"] = cell["seed"]
+    params["job_id"] = f"{batch_id}-{cell['index']:04d}"
+
+    limiter.acquire()
+    started = time.time()
+    entry = dict(cell)
+    try:
+        # Don't wait for output downloads here: they overlap with the next cells' polling
+        job = submit_job(cell["model_id"], params, token=token, wait_downloads=False)
+    except Exception as e:
+        entry.update({"job_id": params["job_id"], "status": "failed", "error": str(e),
+                      "elapsed": round(time.time() - started, 3)})
+        return entry
+
+    result = job.get("result") or {}
+    images = result.get("images") if isinstance(result, dict) else None
+    if not images and isinstance(result, dict) and result.get("image"):
+        images = [result.get("image")]
+    entry.update({
+        "job_id": job.get("meta", {}).get("job_id", params["job_id"]),
+        "status": job.get("status"),
+        "remote": job.get("remote"),
+        "mock": bool(job.get("mock")),
+        "error": job.get("error"),
+        "images": images or [],
+        "images_local": (result.get("images_local") if isinstance(result, dict) else None) or [],
+        "file_path": job.get("file_path"),
+        "elapsed": round(time.time() - started, 3),
+        "_job": job,
+    })
+    return entry
+
+
+def run_batch(prompts: Iterable[str], models: Iterable[str], seeds: Optional[Iterable[int]] = None,
+              params: Optional[Dict[str, Any]] = None, token: Optional[str] = None,
+              max_workers: int = DEFAULT_MAX_WORKERS, rate_per_minute: Optional[float] = DEFAULT_RATE_PER_MINUTE,
+              manifest_path: Optional[str] = None,
+              progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Submit every prompt × model × seed combination and write a grid manifest.
+
+    `params` holds the shared generation parameters (task, size, steps,
+    guidance, negative_prompt). Cells run on at most `max_workers` threads
+    and submissions are spaced by `rate_per_minute`. `progress`, if given, is
+    called with each finished cell entry.
+
+    Returns the manifest dict; it is also written to `manifest_path`
+    (default cache/outputs/batches/<batch_id>.json).
+    """
+    prompts = list(prompts)
+    models = list(models)
+    seeds = list(seeds) if seeds else [0]
+    base_params = {k: v for k, v in (params or {}).items() if v is not None}
+    batch_id = uuid.uuid4().hex[:12]
+    cells = build_grid(prompts, models, seeds)
+    limiter = RateLimiter(rate_per_minute)
+
+    manifest: Dict[str, Any] = {
+        "batch_id": batch_id,
+        "created_at": _now_iso(),
+        "prompts": prompts,
+        "models": models,
+        "seeds": seeds,
+        "params": base_params,
+        "shape": [len(prompts), len(models), len(seeds)],
+        "cells": [],
+    }
+
+    entries: List[Optional[Dict[str, Any]]] = [None] * len(cells)
+    workers = max(1, min(int(max_workers or 1), len(cells) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_cell, c, batch_id, base_params, token, limiter): c["index"] for c in cells}
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            entries[idx] = fut.result()
+            if progress is not None:
+                try:
+                    progress(entries[idx])
+                except Exception:
+                    pass
+
+    for entry in entries:
+        job = entry.pop("_job", None) if entry else None
+        if job is not None and job.get("pending_downloads") is not None:
+            entry["images_local"] = collect_downloads(job)
+
+    manifest["cells"] = entries
+    manifest["finished_at"] = _now_iso()
+    manifest["summary"] = {
+        "total": len(entries),
+        "succeeded": sum(1 for e in entries if e and e.get("status") == "succeeded" and not e.get("error")),
+        "failed": sum(1 for e in entries if e and (e.get("status") != "succeeded" or e.get("error"))),
+    }
+
+    out = Path(manifest_path) if manifest_path else DEFAULT_BATCH_DIR / f"{batch_id}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    manifest["manifest_path"] = str(out)
+    return manifest
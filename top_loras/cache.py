@@ -1,9 +1,19 @@
+import contextlib
 import json
+import os
 import time
+import uuid
 from pathlib import Path
 import logging
 from typing import Optional
 
+from . import metrics
+
+try:
+    import fcntl
+except Exception:  # pragma: no cover - Windows
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,24 +24,105 @@ def load_cache(cache_file: str, ttl: int = 300) -> Optional[dict]:
     """
     p = Path(cache_file)
     if not p.exists():
+        metrics.inc('cache_lookups_total', result='miss')
         return None
     try:
-        data = json.loads(p.read_text(encoding='utf-8'))
+        with metrics.stage('cache_load'):
+            data = json.loads(p.read_text(encoding='utf-8'))
         ts = data.get('_cached_at')
         if not ts:
+            metrics.inc('cache_lookups_total', result='miss')
             return None
         if time.time() - float(ts) > ttl:
+            metrics.inc('cache_lookups_total', result='expired')
             return None
+        metrics.inc('cache_lookups_total', result='hit')
         return data.get('results')
     except Exception as e:
+        metrics.inc('cache_lookups_total', result='error')
         logger.warning(f"Failed to load cache {cache_file}: {e}")
         return None
 
 
-def save_cache(cache_file: str, results: list):
-    """Save results to cache file with timestamp."""
-    p = Path(cache_file)
+def cache_timestamp(cache_file: str) -> Optional[float]:
+    """Return the `_cached_at` timestamp of a cache file, or None."""
+    try:
+        ts = json.loads(Path(cache_file).read_text(encoding='utf-8')).get('_cached_at')
+        return float(ts) if ts else None
+    except Exception:
+        return None
+
+
+def write_atomic(path, text: str):
+    """Write text to path via a temp file + rename so readers never see a partial file."""
+    p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(f".{p.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, p)
+    except BaseException:
+        # a failed write (disk full, interrupted) must not leave the temp file behind
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def load_candidates(cache_file: str) -> list:
+    """The candidate pool saved next to `results` (models just below the cut), or []."""
+    try:
+        candidates = json.loads(Path(cache_file).read_text(encoding='utf-8')).get('candidates')
+    except Exception:
+        return []
+    return candidates if isinstance(candidates, list) else []
+
+
+def save_cache(cache_file: str, results: list, candidates: Optional[list] = None, snapshot: bool = True):
+    """Save results to cache file with timestamp (atomically replaced).
+
+    `candidates` are the next-best models by downloads, stored apart from
+    `results` so readers of the leaderboard are unaffected; ranking profiles
+    re-rank `results + candidates` at read time. With `snapshot` (default)
+    the saved counts are also appended to the snapshot store; pass False when
+    the counts are not current (e.g. a cache rebuilt from an archived crawl).
+    """
     # Save results as-is (sensitive fields should be removed upstream if needed).
     payload = {'_cached_at': time.time(), 'results': results}
-    p.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+    if candidates:
+        payload['candidates'] = candidates
+    with metrics.stage('cache_save'):
+        write_atomic(cache_file, json.dumps(payload, ensure_ascii=False, indent=2))
+    if not snapshot:
+        return
+    # every fresh save is also a point of the download/like time series (see top_loras.snapshots)
+    from . import snapshots
+    try:
+        with metrics.stage('snapshot_append'):
+            snapshots.record(cache_file, list(results) + list(candidates or []), ts=payload['_cached_at'])
+    except Exception as e:
+        logger.warning(f"Failed to append snapshot for {cache_file}: {e}")
+
+
+@contextlib.contextmanager
+def cache_lock(cache_file: str, blocking: bool = True):
+    """Inter-process lock guarding refreshes of `cache_file` (via `<cache>.lock`).
+
+    Yields True once the lock is held. With `blocking=False` it yields False
+    instead of waiting when another process (or thread) holds it. Readers never
+    need it: cache files are replaced atomically. Without fcntl (Windows) the
+    lock is a no-op that always yields True.
+    """
+    if fcntl is None:
+        yield True
+        return
+    lock_path = Path(f"{cache_file}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+') as fh:
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
@@ -1,10 +1,33 @@
 import argparse
+import os
+import sys
+import time
 from pathlib import Path
-from .download import sanitize_filename
+from . import api as tl_api
 from . import fetcher as fetch_module
+from . import metrics
+from . import profiling
+from . import ranking
 
 
 def run_cli(argv=None):
+    fetch_module.configure_logging()
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Subcommands (e.g. `top-loras batch ...`); anything else is the classic fetch CLI
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+    return _run_fetch(argv)
+
+
+def _rank_profile(value):
+    try:
+        ranking.resolve_profile(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def _run_fetch(argv):
     parser = argparse.ArgumentParser(description='Fetch Top LoRA models from ModelScope')
     parser.add_argument('--limit', type=int, default=20)
     parser.add_argument('--tag', type=str, default='lora')
@@ -19,10 +42,50 @@ def run_cli(argv=None):
     parser.add_argument('--max-pages', type=int, default=5, help='Maximum pages to fetch when aggregating results')
     parser.add_argument('--ttl', type=int, default=300, help='Cache TTL in seconds')
     parser.add_argument('--force-refresh', action='store_true')
+    parser.add_argument('--no-archive', action='store_false', dest='archive_raw',
+                        help='Do not archive raw listing pages (used by `top-loras reprocess` and crawl resume)')
+    parser.add_argument('--page-retries', type=int, default=tl_api.DEFAULT_PAGE_RETRIES,
+                        help='Retries per listing page on timeouts, connection errors and 429/5xx')
+    parser.add_argument('--resume-window', type=float, default=tl_api.DEFAULT_RESUME_WINDOW,
+                        help='Resume an interrupted crawl younger than this many seconds (0 = always restart)')
+    parser.add_argument('--rank-profile', type=_rank_profile, default=None,
+                        help=f"Rank by a composite profile ({', '.join(ranking.PROFILES)}) or a "
+                             "feature:weight[:transform],... spec (re-ranks the cached pool; the cache stays download-ranked)")
     # images are downloaded by default and are required for cover_local to be populated
     parser.add_argument('--debug', action='store_true')
+    # multi-task (--all-tasks) refresh tuning
+    parser.add_argument('--workers', type=int, default=None, help='Tasks refreshed concurrently (default: all)')
+    parser.add_argument('--http-concurrency', type=int, default=fetch_module.DEFAULT_HTTP_CONCURRENCY,
+                        help='Global cap on in-flight listing requests across tasks')
+    parser.add_argument('--image-workers', type=int, default=fetch_module.DEFAULT_IMAGE_WORKERS,
+                        help='Cover download workers shared by all tasks')
+    parser.add_argument('--metrics-file', type=str, default=None,
+                        help='Write pipeline metrics after the run (.prom/.txt = Prometheus text, else JSON)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the run (cProfile, tracemalloc, sampled stacks); dumps are written next to the '
+                             'cache file. cProfile only sees the calling thread: with --all-tasks the per-task '
+                             'workers appear in the sampled stacks (.collapsed) only')
+    parser.add_argument('--profile-top', type=int, default=profiling.DEFAULT_TOP_N,
+                        help='Number of hotspots listed in the profile summary')
     args = parser.parse_args(argv)
+    try:
+        if args.profile:
+            with profiling.profile_run(_profile_target(args), label='top-loras fetch', top_n=args.profile_top):
+                return _fetch_command(args)
+        return _fetch_command(args)
+    finally:
+        if args.metrics_file:
+            metrics.write_metrics(args.metrics_file)
+
+
+def _profile_target(args):
+    # Mirror fetch_top_loras' per-task cache defaulting so dumps land next to the real cache
+    if args.task and not args.all_tasks and args.per_task_cache and args.cache_file == fetch_module.DEFAULT_CACHE_FILE:
+        return fetch_module.task_cache_paths(args.task)[0]
+    return args.cache_file
+
 
+def _fetch_command(args):
     # Default behavior: if neither --task nor --all-tasks is provided,
     # run for all preset tasks so that caches and images are written
     # per task (e.g., cache/top_loras_text-to-image-synthesis.json and
@@ -31,27 +94,35 @@ def run_cli(argv=None):
         args.all_tasks = True
 
     if args.all_tasks:
-        for key, task_val in fetch_module.TASK_PRESETS.items():
-            # Use the actual task name (task_val) for cache/images naming so
-            # files reflect the real ModelScope task (e.g. text-to-image-synthesis)
-            safe = sanitize_filename(task_val)
-            cache_file = Path(args.cache_file).with_name(f"top_loras_{safe}.json")
-            images_dir = Path(args.images_dir) / safe
+        tasks = list(fetch_module.TASK_PRESETS.values())
+        for task_val in tasks:
+            cache_file, images_dir = fetch_module.task_cache_paths(task_val, args.cache_file, args.images_dir)
             print(f"Fetching task={task_val} -> cache={cache_file} images={images_dir}")
-            fetch_module.fetch_top_loras(limit=args.limit, tag=args.tag, debug=args.debug,
-                                         cache_file=str(cache_file), images_dir=str(images_dir),
-                                         ttl=args.ttl, force_refresh=args.force_refresh,
-                                         download_images=True, task=task_val,
-                                         page_size=args.page_size, max_pages=args.max_pages,
-                                         per_task_cache=args.per_task_cache)
-        return
+        started = time.perf_counter()
+        outcomes = fetch_module.fetch_all_tasks(tasks, max_workers=args.workers,
+                                                http_concurrency=args.http_concurrency,
+                                                image_workers=args.image_workers,
+                                                cache_file=args.cache_file, images_dir=args.images_dir,
+                                                limit=args.limit, tag=args.tag, debug=args.debug,
+                                                ttl=args.ttl, force_refresh=args.force_refresh,
+                                                download_images=True, page_size=args.page_size,
+                                                max_pages=args.max_pages, per_task_cache=args.per_task_cache,
+                                                archive_raw=args.archive_raw, page_retries=args.page_retries,
+                                                resume_window=args.resume_window, rank_profile=args.rank_profile)
+        print(f"\nRefreshed {len(outcomes)} task(s) in {time.perf_counter() - started:.2f}s")
+        for task_val, outcome in outcomes.items():
+            state = f"FAILED: {outcome['error']}" if outcome['error'] else f"{outcome['count']:3d} models"
+            print(f"  {task_val:<28} {outcome['seconds']:7.2f}s  {state}")
+        return 1 if any(outcome['error'] for outcome in outcomes.values()) else 0
 
     top_loras = fetch_module.fetch_top_loras(limit=args.limit, tag=args.tag, debug=args.debug,
                                              cache_file=args.cache_file, images_dir=args.images_dir,
                                              ttl=args.ttl, force_refresh=args.force_refresh,
                                              download_images=True, task=args.task,
                                              page_size=args.page_size, max_pages=args.max_pages,
-                                             per_task_cache=args.per_task_cache)
+                                             per_task_cache=args.per_task_cache, archive_raw=args.archive_raw,
+                                             page_retries=args.page_retries, resume_window=args.resume_window,
+                                             rank_profile=args.rank_profile)
 
     if not top_loras:
         print('No LoRA models found (0 results). If you expected results, try increasing PageSize or check your token/permissions.')
@@ -80,5 +151,242 @@ def run_cli(argv=None):
         print()
 
 
+def _run_batch(argv):
+    from . import batch as batch_module
+
+    parser = argparse.ArgumentParser(prog='top-loras batch',
+                                     description='Generate a prompt × model × seed grid in one call')
+    parser.add_argument('--prompt', action='append', default=[], help='Prompt (repeatable)')
+    parser.add_argument('--prompts-file', type=str, default=None, help='Text file with one prompt per line')
+    parser.add_argument('--model', action='append', default=[], required=True, help='Model id, e.g. org/name (repeatable)')
+    parser.add_argument('--seed', action='append', type=int, default=[], help='Seed (repeatable, default 0)')
+    parser.add_argument('--task', type=str, default=batch_module.DEFAULT_TASK)
+    parser.add_argument('--negative-prompt', type=str, default=None)
+    parser.add_argument('--size', type=str, default=None, help='e.g. 1024x1024')
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--guidance', type=float, default=7.5)
+    parser.add_argument('--max-workers', type=int, default=batch_module.DEFAULT_MAX_WORKERS)
+    parser.add_argument('--rate-per-minute', type=float, default=batch_module.DEFAULT_RATE_PER_MINUTE,
+                        help='Maximum job submissions per minute (0 disables limiting)')
+    parser.add_argument('--manifest', type=str, default=None, help='Where to write the grid manifest JSON')
+    args = parser.parse_args(argv)
+
+    prompts = list(args.prompt)
+    if args.prompts_file:
+        lines = Path(args.prompts_file).read_text(encoding='utf-8').splitlines()
+        prompts.extend(line.strip() for line in lines if line.strip())
+    if not prompts:
+        parser.error('at least one --prompt or --prompts-file is required')
+
+    params = {
+        'task': args.task,
+        'negative_prompt': args.negative_prompt,
+        'size': args.size,
+        'steps': args.steps,
+        'guidance': args.guidance,
+    }
+
+    def _progress(entry):
+        state = 'error' if entry.get('error') else entry.get('status')
+        print(f"[{entry['index'] + 1}] {entry['model_id']} seed={entry['seed']} -> {state}")
+
+    manifest = batch_module.run_batch(prompts, args.model, args.seed or None, params=params,
+                                      token=os.environ.get('MODELSCOPE_API_TOKEN'),
+                                      max_workers=args.max_workers, rate_per_minute=args.rate_per_minute,
+                                      manifest_path=args.manifest, progress=_progress)
+    summary = manifest['summary']
+    print(f"Batch {manifest['batch_id']}: {summary['succeeded']}/{summary['total']} succeeded, "
+          f"manifest={manifest['manifest_path']}")
+    return 0 if summary['failed'] == 0 else 1
+
+
+def _run_serve_refresh(argv):
+    import signal
+    from . import daemon as daemon_module
+
+    parser = argparse.ArgumentParser(prog='top-loras serve-refresh',
+                                     description='Keep task caches fresh from a long-running process')
+    parser.add_argument('--task', action='append', default=[], help='Task to refresh (repeatable, default: all presets)')
+    parser.add_argument('--interval', type=float, default=daemon_module.DEFAULT_INTERVAL,
+                        help='Target seconds between refreshes of a task')
+    parser.add_argument('--ttl', type=float, default=None, help='Cache TTL readers use (default: --interval)')
+    parser.add_argument('--jitter', type=float, default=daemon_module.DEFAULT_JITTER,
+                        help='Relative jitter applied to schedules and backoff (0.1 = ±10%%)')
+    parser.add_argument('--max-backoff', type=float, default=daemon_module.DEFAULT_MAX_BACKOFF)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--tag', type=str, default='lora')
+    parser.add_argument('--page-size', type=int, default=None)
+    parser.add_argument('--max-pages', type=int, default=5)
+    parser.add_argument('--cache-file', type=str, default=fetch_module.DEFAULT_CACHE_FILE)
+    parser.add_argument('--images-dir', type=str, default=fetch_module.DEFAULT_IMAGES_DIR)
+    parser.add_argument('--no-images', action='store_false', dest='download_images')
+    parser.add_argument('--once', action='store_true', help='Refresh due tasks once and exit')
+    parser.add_argument('--metrics-file', type=str, default=None,
+                        help='Rewrite pipeline metrics after every cycle (.prom/.txt = Prometheus text, else JSON)')
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args(argv)
+
+    daemon = daemon_module.RefreshDaemon(tasks=args.task or None, interval=args.interval, ttl=args.ttl,
+                                         jitter=args.jitter, max_backoff=args.max_backoff,
+                                         cache_file=args.cache_file, images_dir=args.images_dir,
+                                         debug=args.debug, limit=args.limit, tag=args.tag,
+                                         page_size=args.page_size, max_pages=args.max_pages,
+                                         download_images=args.download_images)
+    if args.metrics_file:
+        daemon.on_cycle = lambda: metrics.write_metrics(args.metrics_file)
+    if args.once:
+        due = daemon.run_once()
+        if args.metrics_file:
+            metrics.write_metrics(args.metrics_file)
+        return 1 if any(daemon.state[t]['last_error'] for t in due) else 0
+
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+
+def _run_reprocess(argv):
+    from . import archive as tl_archive
+
+    parser = argparse.ArgumentParser(prog='top-loras reprocess',
+                                     description='Rebuild caches from archived listing pages (no network)')
+    parser.add_argument('--task', action='append', default=None,
+                        help='Task to rebuild (repeatable; default: every task in the archive)')
+    parser.add_argument('--limit', type=int, default=fetch_module.DEFAULT_LIMIT)
+    parser.add_argument('--tag', type=str, default=fetch_module.DEFAULT_TAG)
+    parser.add_argument('--cache-file', type=str, default=fetch_module.DEFAULT_CACHE_FILE)
+    parser.add_argument('--archive-dir', type=str, default=None,
+                        help=f"Archive root (default: <cache dir>/{tl_archive.DEFAULT_ARCHIVE_SUBDIR})")
+    parser.add_argument('--workers', type=int, default=None, help='Processes used across tasks')
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    outcomes = fetch_module.reprocess_tasks(args.task, archive_dir=args.archive_dir, cache_file=args.cache_file,
+                                            limit=args.limit, tag=args.tag, max_workers=args.workers,
+                                            debug=args.debug)
+    if not outcomes:
+        print('No archived crawls found. Run a fetch first (pages are archived unless --no-archive).')
+        return 1
+    print(f"Reprocessed {len(outcomes)} task(s) in {time.perf_counter() - started:.2f}s")
+    for task_val, outcome in outcomes.items():
+        state = (f"FAILED: {outcome['error']}" if outcome['error']
+                 else f"{outcome['raw']:5d} raw -> {outcome['count']:3d} models -> {outcome['cache_file']}")
+        print(f"  {str(task_val):<28} {outcome['seconds']:7.2f}s  {state}")
+    return 1 if any(o['error'] for o in outcomes.values()) else 0
+
+
+def _run_gc_images(argv):
+    from . import archive as tl_archive
+    from . import image_cache
+
+    mb = 1024 * 1024
+    parser = argparse.ArgumentParser(prog='top-loras gc-images',
+                                     description='Sweep orphaned covers, enforce image directory quotas '
+                                                 'and prune old archived crawls')
+    parser.add_argument('--images-dir', type=str, default=fetch_module.DEFAULT_IMAGES_DIR,
+                        help='Cover root; it and each task subdirectory get their own quota')
+    parser.add_argument('--outputs-dir', type=str, default='cache/outputs/images',
+                        help='Generated images directory (quota only)')
+    parser.add_argument('--cache-dir', type=str, default=str(Path(fetch_module.DEFAULT_CACHE_FILE).parent),
+                        help='Directory of cache files whose covers are kept')
+    parser.add_argument('--quota-mb', type=float, default=image_cache.DEFAULT_COVER_QUOTA / mb,
+                        help='Byte quota per cover directory, in MiB')
+    parser.add_argument('--outputs-quota-mb', type=float, default=image_cache.DEFAULT_OUTPUT_QUOTA / mb)
+    parser.add_argument('--min-age', type=float, default=image_cache.DEFAULT_MIN_AGE,
+                        help='Never sweep orphans used within this many seconds')
+    parser.add_argument('--no-sweep', action='store_false', dest='sweep', help='Only enforce quotas')
+    parser.add_argument('--archive-dir', type=str, default=None,
+                        help=f"Crawl archive to prune (default: <cache dir>/{tl_archive.DEFAULT_ARCHIVE_SUBDIR})")
+    parser.add_argument('--keep-runs', type=int, default=tl_archive.DEFAULT_KEEP_RUNS,
+                        help='Archived runs always kept per crawl')
+    parser.add_argument('--archive-max-age-days', type=float, default=tl_archive.DEFAULT_MAX_AGE_DAYS,
+                        help='Older archived runs beyond --keep-runs are removed')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be removed')
+    args = parser.parse_args(argv)
+
+    results = image_cache.gc_images(args.images_dir, args.outputs_dir, args.cache_dir,
+                                    quota_bytes=int(args.quota_mb * mb),
+                                    output_quota_bytes=int(args.outputs_quota_mb * mb),
+                                    sweep=args.sweep, min_age=args.min_age, dry_run=args.dry_run)
+    verb = 'would free' if args.dry_run else 'freed'
+    for directory, st in results.items():
+        print(f"  {directory:<48} {st['files']:5d} files {st['bytes'] / mb:8.1f} MiB  "
+              f"{st['orphans']} orphans, {st['evicted']} evicted, {verb} {st['freed_bytes'] / mb:.1f} MiB")
+    total = sum(st['freed_bytes'] for st in results.values())
+    print(f"{len(results)} directories, {verb} {total / mb:.1f} MiB")
+    archive_dir = args.archive_dir or str(Path(args.cache_dir) / tl_archive.DEFAULT_ARCHIVE_SUBDIR)
+    pruned = tl_archive.prune(archive_dir, keep_runs=args.keep_runs, max_age_days=args.archive_max_age_days,
+                              dry_run=args.dry_run)
+    print(f"Crawl archive {archive_dir}: {pruned['pruned']}/{pruned['runs']} runs pruned, "
+          f"{verb} {pruned['freed_bytes'] / mb:.1f} MiB")
+    return 0
+
+
+def _run_trending(argv):
+    from . import snapshots
+
+    parser = argparse.ArgumentParser(prog='top-loras trending',
+                                     description='Fastest-growing LoRAs by downloads gained per day (from cache snapshots)')
+    parser.add_argument('--task', type=str, default=None, help='Task whose cache snapshots are read')
+    parser.add_argument('--cache-file', type=str, default=fetch_module.DEFAULT_CACHE_FILE)
+    parser.add_argument('--days', type=float, default=snapshots.DEFAULT_WINDOW_DAYS, help='Window length in days')
+    parser.add_argument('--limit', type=int, default=fetch_module.DEFAULT_LIMIT)
+    parser.add_argument('--compact', action='store_true', help='Apply snapshot retention/downsampling first')
+    args = parser.parse_args(argv)
+
+    cache_file = fetch_module.task_cache_paths(args.task, args.cache_file)[0] if args.task else args.cache_file
+    if args.compact:
+        stats = snapshots.compact(cache_file)
+        print(f"Compacted snapshots: {stats['rows_before']} -> {stats['rows']} rows ({stats['snapshots']} snapshots)")
+    rows = snapshots.velocity(cache_file, days=args.days, limit=args.limit)
+    if not rows:
+        print(f"No snapshots for {cache_file} in the last {args.days:g} days. Run a fetch first.")
+        return 1
+    print(f"Top {len(rows)} by downloads/day over {args.days:g} days ({cache_file}):")
+    for i, r in enumerate(rows, 1):
+        print(f"{i:3d}. {r['id']:<48} {r['downloads_per_day']:10.1f}/day  "
+              f"+{r['delta_downloads']} over {r['days']:.1f}d  ({r['downloads']} total)")
+    return 0
+
+
+def _run_export(argv):
+    from . import export as tl_export
+
+    parser = argparse.ArgumentParser(prog='top-loras export',
+                                     description='Append leaderboard caches to partitioned Parquet/Arrow files')
+    parser.add_argument('--cache-dir', type=str, default=str(Path(fetch_module.DEFAULT_CACHE_FILE).parent))
+    parser.add_argument('--out-dir', type=str, default=tl_export.DEFAULT_OUT_DIR)
+    parser.add_argument('--format', choices=tl_export.FORMATS, default='parquet', dest='fmt')
+    parser.add_argument('--history', action='store_true', help='Also export snapshot history (top-loras trending data)')
+    parser.add_argument('--force', action='store_true', help='Re-export caches already in the export state')
+    args = parser.parse_args(argv)
+
+    try:
+        summary = tl_export.export_leaderboards(args.cache_dir, args.out_dir, history=args.history,
+                                                fmt=args.fmt, force=args.force)
+    except RuntimeError as e:
+        print(f"Export failed: {e}")
+        return 1
+    print(f"Exported {summary['rows']} leaderboard rows and {summary['snapshot_rows']} snapshot rows "
+          f"to {args.out_dir} ({len(summary['written'])} files, {summary['skipped']} caches unchanged)")
+    for path in summary['written']:
+        print(f"  {path}")
+    return 0
+
+
+COMMANDS = {
+    'batch': _run_batch,
+    'serve-refresh': _run_serve_refresh,
+    'reprocess': _run_reprocess,
+    'gc-images': _run_gc_images,
+    'trending': _run_trending,
+    'export': _run_export,
+}
+
+
 def main():
     run_cli()
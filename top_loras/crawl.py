@@ -0,0 +1,147 @@
+"""
+Adaptive listing crawl: page sizing and early stop driven by LoRA yield.
+
+`CrawlPlanner` watches each listing page as it arrives: how many raw items
+`filter.is_accepted` keeps (the acceptance rate), the download counts of the
+best `limit` accepted models so far, and whether the listing has been in
+non-increasing download order. It then decides
+
+  - when to stop: early only when the listing is download-ordered and its
+    last item ranks below the weakest kept model, so later pages cannot enter
+    the top `limit`. The ModelScope listing (SortBy 'Default') is usually not
+    download-ordered; then the crawl stops once `limit` models are kept and
+    the raw items seen cover both the old fixed cap of `limit * 4` and
+    `limit / acceptance_rate * safety`, so low yield extends the crawl and
+    high yield never shrinks it below the old coverage.
+  - how big the next page is: just enough raw items for the models still
+    needed at the current yield, clamped to [min_page_size, max_page_size]
+    and rounded down to a size that divides the current offset, so that
+    `PageNumber * PageSize` windows never overlap or skip items.
+
+With a fixed `page_size` only the stop rule adapts.
+"""
+import heapq
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import filter as tl_filter
+from .parser import extract_downloads
+
+DEFAULT_MIN_PAGE_SIZE = 20
+DEFAULT_MAX_PAGE_SIZE = 200
+DEFAULT_SAFETY = 1.5
+# raw items covered by an unordered listing, in multiples of `limit` (the old fixed cap)
+COVERAGE_FACTOR = 4
+
+
+def initial_page_size(limit: int, min_page_size: int = DEFAULT_MIN_PAGE_SIZE,
+                      max_page_size: int = DEFAULT_MAX_PAGE_SIZE) -> int:
+    """First page before any yield is known: enough for `limit` models at ~75% yield.
+
+    Later pages grow when yield turns out lower. Deterministic per `limit`,
+    which keeps archive crawl keys (and resume) stable across runs.
+    """
+    return min(max(limit * 2, min_page_size), max_page_size)
+
+
+def _item_key(item: Dict[str, Any]) -> Tuple[Any, Any]:
+    return item.get('Path'), item.get('Name') or item.get('name')
+
+
+class CrawlPlanner:
+    def __init__(self, limit: int, page_size: Optional[int] = None,
+                 min_page_size: int = DEFAULT_MIN_PAGE_SIZE, max_page_size: int = DEFAULT_MAX_PAGE_SIZE,
+                 safety: float = DEFAULT_SAFETY):
+        self.limit = max(1, int(limit))
+        self.fixed = page_size is not None
+        self.min_page_size = max(1, min_page_size)
+        self.max_page_size = max(self.min_page_size, max_page_size)
+        self.page_size = (int(page_size) if self.fixed
+                          else initial_page_size(self.limit, self.min_page_size, self.max_page_size))
+        self.safety = safety
+        self.offset = 0
+        self.seen = 0
+        self.accepted = 0
+        self.pages = 0
+        self.monotonic = True
+        self.exhausted = False
+        self.stop_reason: Optional[str] = None
+        self._last_downloads: Optional[int] = None
+        self._best: Dict[Tuple[Any, Any], int] = {}
+
+    @property
+    def acceptance_rate(self) -> float:
+        # Laplace-smoothed so one unlucky page does not read as zero yield
+        return (self.accepted + 1) / (self.seen + 2)
+
+    def top_downloads(self) -> List[int]:
+        return heapq.nlargest(self.limit, self._best.values())
+
+    @property
+    def weakest_kept(self) -> Optional[int]:
+        """Downloads of the `limit`-th best accepted model, or None while fewer are kept."""
+        top = self.top_downloads()
+        return top[-1] if len(top) >= self.limit else None
+
+    def target_raw(self) -> int:
+        """Raw items to cover before an unordered listing stops."""
+        return max(self.limit * COVERAGE_FACTOR, math.ceil(self.limit / self.acceptance_rate * self.safety))
+
+    def next_request(self) -> Tuple[int, int]:
+        """(PageNumber, PageSize) for the next listing request."""
+        if not self.fixed and self.pages:
+            self.page_size = self._aligned_size(self._desired_size())
+        return self.offset // self.page_size + 1, self.page_size
+
+    def _desired_size(self) -> int:
+        missing = max(self.limit - len(self._best), 0)
+        if missing:
+            want = missing / self.acceptance_rate * self.safety
+        else:
+            want = self.target_raw() - self.seen
+        return int(min(max(math.ceil(want), self.min_page_size), self.max_page_size))
+
+    def _aligned_size(self, desired: int) -> int:
+        # the current size always divides the offset, so it is the fallback
+        for size in range(desired, self.min_page_size - 1, -1):
+            if self.offset % size == 0:
+                return size
+        return self.page_size
+
+    def observe(self, models_page: List[Any], page_size: Optional[int] = None):
+        """Account for one listing page fetched with `page_size` (defaults to the planned size)."""
+        self.pages += 1
+        self.offset += page_size or self.page_size
+        if page_size:
+            self.page_size = page_size
+        if not models_page:
+            self.exhausted = True
+            return
+        for item in models_page:
+            if not isinstance(item, dict):
+                continue
+            self.seen += 1
+            downloads = extract_downloads(item)
+            if self._last_downloads is not None and downloads > self._last_downloads:
+                self.monotonic = False
+            self._last_downloads = downloads
+            if tl_filter.is_accepted(item):
+                self.accepted += 1
+                key = _item_key(item)
+                if downloads > self._best.get(key, -1):
+                    self._best[key] = downloads
+
+    def should_stop(self) -> bool:
+        if self.exhausted:
+            self.stop_reason = 'exhausted'
+            return True
+        if len(self._best) < self.limit:
+            return False
+        weakest = self.weakest_kept
+        if self.monotonic and self._last_downloads is not None and self._last_downloads < weakest:
+            self.stop_reason = 'ranked'
+            return True
+        if self.seen >= self.target_raw():
+            self.stop_reason = 'coverage'
+            return True
+        return False
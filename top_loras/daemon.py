@@ -0,0 +1,154 @@
+"""
+Long-running refresh daemon (`top-loras serve-refresh`).
+
+Keeps one logged-in ModelScope client for its whole lifetime and refreshes
+each task on its own schedule: shortly before the task's cache would expire,
+with jitter so tasks don't line up, and with exponential backoff per task
+after failures. Caches are written atomically by `save_cache`, so the UI can
+read them at any time without blocking on the network.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from . import api as tl_api
+from . import fetcher as fetch_module
+from .cache import cache_lock, cache_timestamp
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 3600
+DEFAULT_JITTER = 0.1
+# Refresh when this fraction of the TTL is left, so readers never see an expired cache
+DEFAULT_REFRESH_LEAD = 0.1
+DEFAULT_BASE_BACKOFF = 30
+DEFAULT_MAX_BACKOFF = 3600
+
+
+class RefreshDaemon:
+    """Per-task refresh scheduler sharing one warm HTTP session.
+
+    `interval` is the target time between refreshes; `ttl` is the cache TTL
+    readers use (defaults to `interval`). Extra keyword arguments (limit, tag,
+    page_size, max_pages, download_images, ...) go to `fetch_top_loras`.
+    """
+
+    def __init__(self, tasks: Optional[Iterable[str]] = None, interval: float = DEFAULT_INTERVAL,
+                 ttl: Optional[float] = None, jitter: float = DEFAULT_JITTER,
+                 refresh_lead: float = DEFAULT_REFRESH_LEAD, base_backoff: float = DEFAULT_BASE_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF, cache_file: str = fetch_module.DEFAULT_CACHE_FILE,
+                 images_dir: str = fetch_module.DEFAULT_IMAGES_DIR, token_env: str = 'MODELSCOPE_API_TOKEN',
+                 debug: bool = False, **fetch_kwargs):
+        self.tasks = list(tasks) if tasks else list(fetch_module.TASK_PRESETS.values())
+        self.interval = float(interval)
+        self.ttl = float(ttl) if ttl else self.interval
+        self.jitter = max(0.0, float(jitter))
+        self.refresh_lead = min(max(float(refresh_lead), 0.0), 0.9)
+        self.base_backoff = float(base_backoff)
+        self.max_backoff = float(max_backoff)
+        self.cache_file = cache_file
+        self.images_dir = images_dir
+        self.token_env = token_env
+        self.debug = debug
+        self.fetch_kwargs = fetch_kwargs
+        self._api = None
+        self._stop = threading.Event()
+        # optional hook called after every scheduling cycle (e.g. to export metrics)
+        self.on_cycle = None
+        self.state: Dict[str, dict] = {}
+        for task in self.tasks:
+            task_cache, task_images = fetch_module.task_cache_paths(task, cache_file, images_dir)
+            self.state[task] = {
+                'cache_file': task_cache,
+                'images_dir': task_images,
+                'next_run': self._initial_due(task_cache),
+                'failures': 0,
+                'last_success': None,
+                'last_error': None,
+            }
+
+    def _jittered(self, seconds: float) -> float:
+        if not self.jitter:
+            return seconds
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _refresh_deadline(self, cached_at: float) -> float:
+        return cached_at + self.ttl * (1 - self.refresh_lead)
+
+    def _initial_due(self, cache_file: str) -> float:
+        # A warm cache from a previous run is only refreshed when it nears expiry
+        cached_at = cache_timestamp(cache_file)
+        if cached_at is None:
+            return 0.0
+        return self._refresh_deadline(cached_at)
+
+    def _get_api(self):
+        if self._api is None:
+            self._api = tl_api.create_api(self.token_env, debug=self.debug)
+        return self._api
+
+    def refresh_task(self, task: str) -> bool:
+        """Refresh one task immediately and reschedule it. Returns True on success."""
+        st = self.state[task]
+        started = time.time()
+        try:
+            # serialized with UI workers refreshing the same cache
+            with cache_lock(st['cache_file']):
+                results = fetch_module.fetch_top_loras(task=task, cache_file=st['cache_file'],
+                                                       images_dir=st['images_dir'], force_refresh=True,
+                                                       api=self._get_api(), debug=self.debug,
+                                                       token_env=self.token_env, **self.fetch_kwargs)
+        except Exception as e:
+            st['failures'] += 1
+            st['last_error'] = str(e)
+            metrics.inc('refresh_failures_total', task=task)
+            delay = min(self.max_backoff, self.base_backoff * (2 ** (st['failures'] - 1)))
+            st['next_run'] = time.time() + self._jittered(delay)
+            # A failing session may be stale (expired login, dead keep-alive); rebuild next time
+            self._api = None
+            logger.warning(f"Refresh failed for task={task} (attempt {st['failures']}): {e}; "
+                           f"retrying in {st['next_run'] - time.time():.0f}s")
+            return False
+
+        finished = time.time()
+        metrics.set_gauge('last_refresh_timestamp', finished, task=task)
+        st['failures'] = 0
+        st['last_error'] = None
+        st['last_success'] = finished
+        st['next_run'] = min(finished + self._jittered(self.interval), self._refresh_deadline(finished))
+        logger.info(f"Refreshed task={task}: {len(results or [])} models in {finished - started:.1f}s; "
+                    f"next in {st['next_run'] - finished:.0f}s")
+        return True
+
+    def run_once(self, now: Optional[float] = None) -> List[str]:
+        """Refresh every task that is due; returns the tasks that were attempted."""
+        now = time.time() if now is None else now
+        due = [t for t in self.tasks if self.state[t]['next_run'] <= now]
+        for task in due:
+            if self._stop.is_set():
+                break
+            self.refresh_task(task)
+        return due
+
+    def seconds_until_next(self) -> float:
+        if not self.state:
+            return self.interval
+        return max(0.0, min(st['next_run'] for st in self.state.values()) - time.time())
+
+    def run_forever(self):
+        logger.info(f"serve-refresh started for tasks={self.tasks} interval={self.interval:.0f}s ttl={self.ttl:.0f}s")
+        while not self._stop.is_set():
+            self.run_once()
+            if self.on_cycle is not None:
+                try:
+                    self.on_cycle()
+                except Exception as e:
+                    logger.warning(f"on_cycle hook failed: {e}")
+            self._stop.wait(self.seconds_until_next())
+        logger.info('serve-refresh stopped')
+
+    def stop(self):
+        self._stop.set()
@@ -1,13 +1,28 @@
 import re
 import time
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-import requests
+from typing import TYPE_CHECKING, Dict, Optional
 import logging
 
+from . import imaging
+from . import metrics
+from . import resilience
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
 logger = logging.getLogger(__name__)
 
 
+def _new_session() -> 'requests.Session':
+    # requests is imported lazily so cache-only runs never load it
+    import requests
+    return requests.Session()
+
+
 def sanitize_filename(name: str) -> str:
     """Make a filesystem-safe filename from name."""
     name = name or 'model'
@@ -18,45 +33,177 @@ def sanitize_filename(name: str) -> str:
     return name[:200]
 
 
-def download_image(url: str, dest_path: Path, session: Optional[requests.Session] = None, retries: int = 2) -> bool:
+def download_image(url: str, dest_path: Path, session: Optional['requests.Session'] = None, retries: int = 2) -> bool:
     """Download image to dest_path. Returns True on success."""
     if dest_path.exists():
         return True
-    sess = session or requests.Session()
+    sess = session or _new_session()
     for attempt in range(1, retries + 1):
         try:
-            r = sess.get(url, timeout=15, stream=True)
+            r = resilience.call(url, lambda: sess.get(url, timeout=15, stream=True))
             r.raise_for_status()
             dest_path.parent.mkdir(parents=True, exist_ok=True)
+            size = 0
             with open(dest_path, 'wb') as f:
                 for chunk in r.iter_content(8192):
                     if chunk:
                         f.write(chunk)
+                        size += len(chunk)
+            metrics.inc('image_bytes_total', size, kind='cover')
+            metrics.inc('images_downloaded_total', kind='cover', result='ok')
             return True
+        except resilience.CircuitOpenError:
+            # shed covers from an unhealthy host instead of queueing retries on it
+            metrics.inc('images_downloaded_total', kind='cover', result='shed')
+            return False
         except Exception as e:
             logger.debug(f"Download attempt {attempt} failed for {url}: {e}")
             time.sleep(1 * attempt)
+    metrics.inc('images_downloaded_total', kind='cover', result='failed')
     return False
 
 
-def download_images_for_results(results: list, images_dir: str, session: Optional[requests.Session] = None):
+class SharedImageDownloader:
+    """Thread-safe cover downloader shared by concurrent task refreshes.
+
+    Each URL is fetched at most once per downloader; later requests for the
+    same URL (e.g. a model listed under several tasks) reuse the first file,
+    copied to the requested destination.
+    """
+
+    def __init__(self, max_workers: int = 8, session: Optional['requests.Session'] = None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tl-cover-dl')
+        self._session = session or _new_session()
+        self._lock = threading.Lock()
+        self._by_url: Dict[str, Future] = {}
+        self.stats = {'downloaded': 0, 'reused': 0, 'failed': 0}
+
+    def _fetch(self, url: str, dest: Path) -> Optional[Path]:
+        ok = download_image(url, dest, session=self._session)
+        with self._lock:
+            self.stats['downloaded' if ok else 'failed'] += 1
+        return dest if ok else None
+
+    def submit(self, url: str, dest: Path) -> Future:
+        """Schedule `url` -> `dest`; the returned future resolves to True on success."""
+        with self._lock:
+            source = self._by_url.get(url)
+            if source is None:
+                source = self._pool.submit(self._fetch, url, dest)
+                self._by_url[url] = source
+                first = True
+            else:
+                self.stats['reused'] += 1
+                first = False
+
+        done: Future = Future()
+
+        def _resolve(fut):
+            try:
+                src = fut.result()
+                if src is None:
+                    done.set_result(False)
+                    return
+                if not first and src != dest and not dest.exists():
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(src, dest)
+                done.set_result(True)
+            except Exception as e:
+                logger.debug(f"Shared download failed for {url}: {e}")
+                done.set_result(False)
+
+        source.add_done_callback(_resolve)
+        return done
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def _cover_dest(base: Path, r: dict) -> Path:
+    url = r.get('cover_url') or ''
+    # Use English title or ID for filename to avoid issues with special characters
+    title = r.get('title_en') or r.get('id') or 'model'
+    # derive extension
+    ext = Path(url).suffix.split('?')[0] or '.jpg'
+    return base / (sanitize_filename(title) + ext)
+
+
+def _settle_cover(r: dict, dest: Path, ok: bool):
+    """Set `cover_local` and, when Pillow can decode the file, its dimensions and LQIP.
+
+    Undecodable downloads are deleted so the UI falls back to the cover URL
+    and the next refresh downloads them again.
+    """
+    for field in ('cover_width', 'cover_height', 'cover_lqip'):
+        r.pop(field, None)
+    if not ok:
+        r['cover_local'] = None
+        return
+    try:
+        with metrics.stage('image_inspect'):
+            info = imaging.inspect_image(dest)
+    except imaging.InvalidImageError as e:
+        logger.warning(f"Discarding corrupt cover for {r.get('id')}: {e}")
+        metrics.inc('images_downloaded_total', kind='cover', result='corrupt')
+        dest.unlink(missing_ok=True)
+        r['cover_local'] = None
+        return
+    except OSError:
+        info = None
+    r['cover_local'] = str(dest)
+    if info:
+        r['cover_width'] = info['width']
+        r['cover_height'] = info['height']
+        r['cover_lqip'] = info['lqip']
+
+
+def download_images_for_results(results: list, images_dir: str, session: Optional['requests.Session'] = None,
+                                downloader: Optional[SharedImageDownloader] = None, progress=None):
     """Download cover images for each result and update `cover_local` field.
 
     Images are saved as <images_dir>/<sanitized_title>.<ext>
+
+    When a `downloader` is given, covers are fetched concurrently through it
+    (deduplicated by URL across every caller sharing that downloader).
+    `progress`, if given, is called with a
+    `{'stage': 'covers', 'done', 'total', 'result'}` dict as each cover settles.
+
+    Each downloaded cover is verified (see `imaging.inspect_image`); records
+    gain `cover_width`, `cover_height` and `cover_lqip`, and corrupt files are
+    dropped with `cover_local` set to None.
     """
     base = Path(images_dir)
     base.mkdir(parents=True, exist_ok=True)
-    sess = session or requests.Session()
+    total = len(results)
+    done = 0
+
+    def _settled(r):
+        nonlocal done
+        done += 1
+        if progress is not None:
+            progress({'stage': 'covers', 'done': done, 'total': total, 'result': r})
+
+    if downloader is not None:
+        pending = []
+        for r in results:
+            if not r.get('cover_url'):
+                r['cover_local'] = None
+                _settled(r)
+                continue
+            dest = _cover_dest(base, r)
+            pending.append((r, dest, downloader.submit(r['cover_url'], dest)))
+        for r, dest, fut in pending:
+            _settle_cover(r, dest, fut.result())
+            _settled(r)
+        return
+
+    sess = session or _new_session()
     for r in results:
         url = r.get('cover_url')
-        # Use English title or ID for filename to avoid issues with special characters
-        title = r.get('title_en') or r.get('id') or 'model'
         if not url:
             r['cover_local'] = None
+            _settled(r)
             continue
-        # derive extension
-        ext = Path(url).suffix.split('?')[0] or '.jpg'
-        filename = sanitize_filename(title) + ext
-        dest = base / filename
-        ok = download_image(url, dest, session=sess)
-        r['cover_local'] = str(dest) if ok else None
+        dest = _cover_dest(base, r)
+        _settle_cover(r, dest, download_image(url, dest, session=sess))
+        _settled(r)
@@ -0,0 +1,252 @@
+"""
+Columnar export of leaderboard caches (and snapshot history) for analytics.
+
+`export_leaderboards(cache_dir, out_dir)` turns every `top_loras*.json` cache
+into Parquet (or Arrow IPC) files in a hive-partitioned layout, so notebooks
+can scan them with `pyarrow.dataset` / pandas / DuckDB instead of re-parsing
+nested JSON:
+
+  <out_dir>/leaderboards/task=<task>/snapshot_date=<YYYY-MM-DD>/part-<cached_at>.parquet
+  <out_dir>/snapshots/task=<task>/snapshot_date=<YYYY-MM-DD>/part-<first ts>-<last ts>.parquet
+  <out_dir>/_export_state.json
+
+Leaderboard files hold one row per ranked model (`LEADERBOARD_FIELDS`), with
+`tags_cn`, `tags_en`, `base_models` and `trigger_words` typed as
+`list<string>`. Partition keys (`task`, `snapshot_date`) live in the path
+only. With `history=True` the rows of `top_loras.snapshots` are exported
+too, straight from the store's column buffers with model ids
+dictionary-encoded.
+
+Exports are append-only and incremental: `_export_state.json` records the
+last exported `_cached_at` per cache and the last snapshot timestamp, so a
+rerun writes only caches refreshed since and snapshot rows appended since.
+Exported snapshot rows are never rewritten, so they keep the full resolution
+that the snapshot store later downsamples away.
+
+pyarrow is optional (`pip install 'modelscope-top-loras[analytics]'`); it is
+imported on first use and `export_leaderboards` raises RuntimeError without
+it. Row normalization (`leaderboard_rows`) does not need it.
+"""
+import bisect
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .cache import write_atomic
+
+STATE_FILE = '_export_state.json'
+FORMATS = ('parquet', 'arrow')
+DEFAULT_OUT_DIR = str(Path('cache') / 'export')
+# cache stems are `top_loras_<task>`; the plain `top_loras.json` holds the untasked listing
+DEFAULT_TASK_NAME = 'all'
+
+# (column, type) with types 'string', 'int32', 'int64', 'timestamp' (UTC, s) and 'list<string>'
+LEADERBOARD_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('snapshot_ts', 'timestamp'),
+    ('rank', 'int32'),
+    ('id', 'string'),
+    ('title_cn', 'string'),
+    ('title_en', 'string'),
+    ('author', 'string'),
+    ('downloads', 'int64'),
+    ('likes', 'int64'),
+    ('license', 'string'),
+    ('tags_cn', 'list<string>'),
+    ('tags_en', 'list<string>'),
+    ('base_models', 'list<string>'),
+    ('trigger_words', 'list<string>'),
+    ('stable_diffusion_version', 'string'),
+    ('vision_foundation', 'string'),
+    ('updated_at', 'string'),
+    ('cover_url', 'string'),
+    ('modelscope_url', 'string'),
+)
+
+
+def _pa():
+    # pyarrow is optional and heavy; only export needs it
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except Exception:
+        return None
+    return pyarrow
+
+
+def _require_pa():
+    pa = _pa()
+    if pa is None:
+        raise RuntimeError("pyarrow is required for export (pip install 'modelscope-top-loras[analytics]')")
+    return pa
+
+
+def cache_files(cache_dir: str) -> List[Path]:
+    """Leaderboard cache files under `cache_dir` (gallery payloads excluded)."""
+    root = Path(cache_dir)
+    if not root.is_dir():
+        return []
+    return sorted(p for p in root.glob('top_loras*.json') if not p.name.endswith('.gallery.json'))
+
+
+def task_of(cache_file) -> str:
+    """Partition value for a cache file: its task, or `DEFAULT_TASK_NAME`."""
+    stem = Path(cache_file).stem
+    return stem[len('top_loras_'):] if stem.startswith('top_loras_') else DEFAULT_TASK_NAME
+
+
+def _strings(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [s.strip() for s in value.split(',') if s.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value if v is not None]
+    return [str(value)]
+
+
+def _scalar(value, kind: str):
+    if kind in ('int32', 'int64'):
+        return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if value is None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def leaderboard_rows(results: Iterable[Dict[str, Any]], cached_at: float) -> List[Dict[str, Any]]:
+    """Normalize cache records to `LEADERBOARD_FIELDS` (typed scalars, list columns as lists)."""
+    rows = []
+    for rank, r in enumerate(results, 1):
+        if not isinstance(r, dict):
+            continue
+        row: Dict[str, Any] = {}
+        for name, kind in LEADERBOARD_FIELDS:
+            if name == 'snapshot_ts':
+                row[name] = float(cached_at)
+            elif name == 'rank':
+                row[name] = rank
+            elif kind == 'list<string>':
+                row[name] = _strings(r.get(name))
+            else:
+                row[name] = _scalar(r.get(name), kind)
+        rows.append(row)
+    return rows
+
+
+def _arrow_type(pa, kind: str):
+    return {
+        'string': pa.string(),
+        'int32': pa.int32(),
+        'int64': pa.int64(),
+        'timestamp': pa.timestamp('s', tz='UTC'),
+        'list<string>': pa.list_(pa.string()),
+    }[kind]
+
+
+def leaderboard_table(rows: List[Dict[str, Any]]):
+    """pyarrow Table of normalized rows with the `LEADERBOARD_FIELDS` schema."""
+    pa = _require_pa()
+    arrays = []
+    for name, kind in LEADERBOARD_FIELDS:
+        values = [row[name] for row in rows]
+        if kind == 'timestamp':
+            values = [int(v) for v in values]
+        arrays.append(pa.array(values, type=_arrow_type(pa, kind)))
+    return pa.Table.from_arrays(arrays, schema=pa.schema([(n, _arrow_type(pa, k)) for n, k in LEADERBOARD_FIELDS]))
+
+
+def snapshot_table(data: Dict[str, Any], start: int = 0):
+    """pyarrow Table of snapshot rows `[start:]` built on the store's `array` buffers (no row objects)."""
+    pa = _require_pa()
+    n = len(data['ts']) - start
+
+    def _column(name, arrow_type):
+        col = data[name]
+        view = memoryview(col)[start:]
+        return pa.Array.from_buffers(arrow_type, n, [None, pa.py_buffer(view)])
+
+    seconds = _column('ts', pa.float64()).cast(pa.int64(), safe=False)
+    return pa.Table.from_arrays(
+        [seconds.cast(pa.timestamp('s', tz='UTC')),
+         pa.DictionaryArray.from_arrays(_column('model', pa.uint32()), pa.array(data['ids'], type=pa.string())),
+         _column('downloads', pa.int64()),
+         _column('likes', pa.int64())],
+        names=['snapshot_ts', 'model_id', 'downloads', 'likes'])
+
+
+def _date(ts: float) -> str:
+    return time.strftime('%Y-%m-%d', time.gmtime(ts))
+
+
+def _write_table(pa, table, path: Path, fmt: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    if fmt == 'parquet':
+        pa.parquet.write_table(table, str(tmp), compression='zstd')
+    else:
+        from pyarrow import feather
+        feather.write_feather(table, str(tmp), compression='zstd')
+    os.replace(tmp, path)
+
+
+def read_state(out_dir: str) -> Dict[str, Any]:
+    try:
+        state = json.loads((Path(out_dir) / STATE_FILE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault('leaderboards', {})
+    state.setdefault('snapshots', {})
+    return state
+
+
+def export_leaderboards(cache_dir: str = 'cache', out_dir: str = DEFAULT_OUT_DIR, history: bool = False,
+                        fmt: str = 'parquet', force: bool = False) -> Dict[str, Any]:
+    """Append new leaderboards (and snapshot rows with `history`) under `out_dir`.
+
+    `force` re-exports caches already recorded in the state file. Returns
+    `{'written': [paths], 'skipped': n, 'rows': n, 'snapshot_rows': n}`.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {FORMATS}")
+    pa = _require_pa()
+
+    out = Path(out_dir)
+    state = read_state(out_dir)
+    summary: Dict[str, Any] = {'written': [], 'skipped': 0, 'rows': 0, 'snapshot_rows': 0}
+    for cache_file in cache_files(cache_dir):
+        key = cache_file.name
+        task = task_of(cache_file)
+        try:
+            data = json.loads(cache_file.read_text(encoding='utf-8'))
+            cached_at = float(data['_cached_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        if force or state['leaderboards'].get(key) != cached_at:
+            rows = leaderboard_rows(data.get('results') or [], cached_at)
+            path = (out / 'leaderboards' / f"task={task}" / f"snapshot_date={_date(cached_at)}"
+                    / f"part-{int(cached_at)}.{fmt}")
+            _write_table(pa, leaderboard_table(rows), path, fmt)
+            state['leaderboards'][key] = cached_at
+            summary['written'].append(str(path))
+            summary['rows'] += len(rows)
+        else:
+            summary['skipped'] += 1
+
+        if history:
+            from . import snapshots
+            series = snapshots.load(str(cache_file))
+            ts = series['ts']
+            last = state['snapshots'].get(key)
+            start = 0 if force or last is None else bisect.bisect_right(ts, last)
+            if start < len(ts):
+                path = (out / 'snapshots' / f"task={task}" / f"snapshot_date={_date(ts[start])}"
+                        / f"part-{int(ts[start])}-{int(ts[-1])}.{fmt}")
+                _write_table(pa, snapshot_table(series, start), path, fmt)
+                state['snapshots'][key] = ts[-1]
+                summary['written'].append(str(path))
+                summary['snapshot_rows'] += len(ts) - start
+        # state is saved per cache so an interrupted export resumes where it stopped
+        write_atomic(out / STATE_FILE, json.dumps(state, ensure_ascii=False, indent=2))
+    return summary
@@ -6,39 +6,27 @@ Exports fetch_top_loras and fetch_top20_loras for compatibility.
 import traceback
 import json
 import logging
-from typing import Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
 from pathlib import Path
 
-from .download import sanitize_filename, download_images_for_results
-from .cache import load_cache, save_cache
+from .download import sanitize_filename, download_images_for_results, SharedImageDownloader
+from .cache import load_cache, load_candidates, save_cache
 from . import api as tl_api
+from . import archive as tl_archive
+from . import gallery as tl_gallery
+from . import image_cache
 from . import filter as tl_filter
 from . import parser as tl_parser
+from . import ranking
+from . import metrics
+from . import singleflight
 
-import requests
-try:
-    from dotenv import load_dotenv
-except Exception:
-    def load_dotenv():
-        return None
-try:
-    from modelscope.hub.api import HubApi
-except Exception:
-    class HubApi:
-        def __init__(self):
-            self.endpoint = 'https://www.modelscope.cn'
-            self.headers = {}
-            class _S:
-                def put(self, *a, **k):
-                    raise RuntimeError('HubApi.put not available in stub')
-            self.session = _S()
-        def builder_headers(self, headers):
-            return {}
-        def login(self, token):
-            return None
-
-# Load .env from repository root for MODELSCOPE_API_TOKEN
-load_dotenv()
+# Heavy dependencies (modelscope, requests, dotenv) are imported on first use:
+# a cache hit never touches them. `.env` is loaded by `api.create_api`.
 
 # Constants (re-exported for backward compatibility)
 DEFAULT_LIMIT = 20
@@ -53,19 +41,48 @@ TASK_PRESETS = {
     'image-to-video': 'image-to-video',
 }
 
-# Logging
-logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+# Multi-task refresh: global cap on concurrent listing requests and cover download workers
+DEFAULT_HTTP_CONCURRENCY = 4
+DEFAULT_IMAGE_WORKERS = 8
+
 logger = logging.getLogger(__name__)
 
 
+def configure_logging(level=logging.INFO):
+    """Install the CLI/app log format (no-op if logging is already configured)."""
+    logging.basicConfig(level=level, format='[%(levelname)s] %(message)s')
+
+
 def fetch_top_loras(limit=DEFAULT_LIMIT, tag=DEFAULT_TAG, token_env='MODELSCOPE_API_TOKEN', debug=False,
                     cache_file: str = DEFAULT_CACHE_FILE, images_dir: str = DEFAULT_IMAGES_DIR,
                     ttl: int = 300, force_refresh: bool = False, download_images: bool = True,
                     task: Optional[str] = None, page_size: Optional[int] = None, max_pages: int = 5,
-                    per_task_cache: bool = True):
+                    per_task_cache: bool = True, http_limiter=None,
+                    downloader: Optional[SharedImageDownloader] = None, api=None, progress=None,
+                    archive_raw: bool = True, page_retries: int = tl_api.DEFAULT_PAGE_RETRIES,
+                    resume_window: float = tl_api.DEFAULT_RESUME_WINDOW, rank_profile: Optional[str] = None):
     """Fetch top LoRA models from ModelScope (package version).
 
     Logic preserved from top-level script, but using package-relative imports.
+    `http_limiter` and `downloader` let concurrent callers share one HTTP
+    concurrency cap and one (URL-deduplicating) cover downloader; `api` reuses
+    a logged-in client (see `api.create_api`).
+
+    `progress`, if given, is called with event dicts as the refresh advances:
+    'listing' per page (see `api.fetch_models`), 'ranked' with the final
+    `results` before covers are fetched, 'covers' per settled cover (see
+    `download.download_images_for_results`) and 'saved' once the cache is written.
+
+    With `archive_raw` (default) the raw listing pages are archived under
+    `<cache dir>/raw` so `reprocess_tasks` can rebuild the cache offline; the
+    archive also checkpoints the crawl, so a rerun within `resume_window`
+    seconds of a failed one resumes after its last saved page.
+
+    `rank_profile` (a `ranking.PROFILES` name or spec) returns the top `limit`
+    by a composite score instead of downloads. The cache itself always holds
+    the download ranking plus a wider candidate pool (see `save_cache`); the
+    profile is applied to that pool on every read, so profiles share one
+    cache and one crawl.
     """
     # per-task cache defaulting
     if per_task_cache and cache_file == DEFAULT_CACHE_FILE and task:
@@ -79,11 +96,35 @@ def fetch_top_loras(limit=DEFAULT_LIMIT, tag=DEFAULT_TAG, token_env='MODELSCOPE_
         if cached:
             if debug:
                 print(f"[debug] Using cached results from {cache_file}")
-            return cached
+            return _apply_profile(cached, cache_file, rank_profile, limit)
+
+    # Concurrent callers asking for the same crawl share one in-flight refresh
+    # (only the leader's `progress` receives events).
+    key = (tag, task, limit, page_size, max_pages, cache_file)
+    results = singleflight.FETCHES.do(
+        key, _refresh_cache, limit=limit, tag=tag, token_env=token_env, debug=debug, cache_file=cache_file,
+        images_dir=images_dir, download_images=download_images, task=task, page_size=page_size,
+        max_pages=max_pages, http_limiter=http_limiter, downloader=downloader, api=api, progress=progress,
+        archive_raw=archive_raw, page_retries=page_retries, resume_window=resume_window)
+    return _apply_profile(results, cache_file, rank_profile, limit)
+
+
+def _apply_profile(results, cache_file, rank_profile, limit):
+    """Re-rank the cached leaderboard plus its candidate pool under `rank_profile` (read-time only)."""
+    if ranking.is_default(rank_profile):
+        return results
+    return ranking.rank_models(list(results) + load_candidates(cache_file), rank_profile, limit=limit)
+
 
-    # Fetch raw models via API helper
-    models = tl_api.fetch_models(limit=limit, tag=tag, task=task, debug=debug, token_env=token_env,
-                                 page_size=page_size, max_pages=max_pages)
+def _refresh_cache(limit, tag, token_env, debug, cache_file, images_dir, download_images, task, page_size,
+                   max_pages, http_limiter, downloader, api, progress, archive_raw, page_retries, resume_window):
+    """Crawl, rank, download covers and write the cache (the uncached half of `fetch_top_loras`)."""
+    # the crawl is planned for the whole candidate pool, not just the leaderboard
+    models = tl_api.fetch_models(limit=ranking.pool_size(limit), tag=tag, task=task, debug=debug, token_env=token_env,
+                                 page_size=page_size, max_pages=max_pages, limiter=http_limiter,
+                                 api=api, progress=progress,
+                                 archive_dir=tl_archive.archive_dir_for(cache_file) if archive_raw else None,
+                                 page_retries=page_retries, resume_window=resume_window)
 
     if debug:
         print(f"[debug] Extracted {len(models)} models")
@@ -94,34 +135,173 @@ def fetch_top_loras(limit=DEFAULT_LIMIT, tag=DEFAULT_TAG, token_env='MODELSCOPE_
     if debug:
         print(f"[debug] Found {len(results)} LoRA candidates after filtering")
 
-    final_results = tl_filter.deduplicate_models(results, limit)
+    # models just past the cut are kept as the pool that ranking profiles re-rank
+    pool = tl_filter.deduplicate_models(results, ranking.pool_size(limit))
+    final_results, candidates = pool[:limit], pool[limit:]
 
     if debug:
         print(f"[debug] Returning top {len(final_results)} models")
 
+    if progress is not None:
+        progress({'stage': 'ranked', 'results': final_results})
+
     if download_images:
         try:
-            download_images_for_results(final_results, images_dir)
+            with metrics.stage('image_download'):
+                download_images_for_results(final_results, images_dir, downloader=downloader, progress=progress)
             if debug:
                 print(f"[debug] Downloaded images to {images_dir}")
         except Exception as e:
             logger.warning(f"Failed to download images: {e}")
 
     try:
-        save_cache(cache_file, final_results)
+        save_cache(cache_file, final_results, candidates=candidates)
         if debug:
             print(f"[debug] Saved cache to {cache_file}")
     except Exception as e:
         logger.warning(f"Failed to save cache: {e}")
+    else:
+        # UI-ready payload (resolved covers, titles) keyed to the cache just written
+        try:
+            tl_gallery.write_gallery(cache_file, final_results)
+        except Exception as e:
+            logger.warning(f"Failed to write gallery payload: {e}")
+        if progress is not None:
+            progress({'stage': 'saved', 'cache_file': cache_file, 'results': final_results})
+        if download_images:
+            # covers of models that dropped off the leaderboard are swept (throttled)
+            image_cache.maybe_gc(images_dir, image_cache.DEFAULT_COVER_QUOTA, cache_dir=str(Path(cache_file).parent))
+        if archive_raw:
+            # archived crawl runs are bounded by the archive's retention policy
+            try:
+                tl_archive.prune(tl_archive.archive_dir_for(cache_file))
+            except Exception as e:
+                logger.warning(f"Failed to prune crawl archive: {e}")
 
     return final_results
 
 
+def task_cache_paths(task: str, cache_file: str = DEFAULT_CACHE_FILE, images_dir: str = DEFAULT_IMAGES_DIR):
+    """Return (cache_file, images_dir) used for `task` in multi-task runs.
+
+    Uses the actual task name for naming so files reflect the real ModelScope
+    task (e.g. cache/top_loras_text-to-image-synthesis.json and
+    cache/images/text-to-image-synthesis/).
+    """
+    safe = sanitize_filename(task)
+    return str(Path(cache_file).with_name(f"top_loras_{safe}.json")), str(Path(images_dir) / safe)
+
+
+def fetch_all_tasks(tasks: Optional[Iterable[str]] = None, max_workers: Optional[int] = None,
+                    http_concurrency: int = DEFAULT_HTTP_CONCURRENCY, image_workers: int = DEFAULT_IMAGE_WORKERS,
+                    cache_file: str = DEFAULT_CACHE_FILE, images_dir: str = DEFAULT_IMAGES_DIR, **kwargs):
+    """Refresh several tasks concurrently.
+
+    All tasks share one semaphore capping in-flight listing requests and one
+    cover downloader, so a model returned by several tasks has its cover
+    downloaded once. Remaining keyword arguments go to `fetch_top_loras`.
+
+    Returns {task: {'results', 'count', 'seconds', 'cache_file', 'images_dir', 'error'}}
+    in input order.
+    """
+    tasks = list(tasks) if tasks is not None else list(TASK_PRESETS.values())
+    if not tasks:
+        return {}
+    limiter = threading.BoundedSemaphore(max(1, http_concurrency))
+    downloader = SharedImageDownloader(max_workers=max(1, image_workers))
+
+    def _one(task):
+        task_cache, task_images = task_cache_paths(task, cache_file, images_dir)
+        started = time.perf_counter()
+        outcome = {'task': task, 'cache_file': task_cache, 'images_dir': task_images,
+                   'results': [], 'count': 0, 'error': None}
+        try:
+            results = fetch_top_loras(task=task, cache_file=task_cache, images_dir=task_images,
+                                      http_limiter=limiter, downloader=downloader, **kwargs)
+            outcome['results'] = results or []
+            outcome['count'] = len(outcome['results'])
+        except Exception as e:
+            logger.warning(f"Refresh failed for task={task}: {e}")
+            outcome['error'] = str(e)
+        outcome['seconds'] = time.perf_counter() - started
+        return outcome
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or len(tasks), thread_name_prefix='tl-task') as pool:
+            outcomes = list(pool.map(_one, tasks))
+    finally:
+        downloader.close()
+    if kwargs.get('debug'):
+        print(f"[debug] Cover downloads: {downloader.stats}")
+    return {o['task']: o for o in outcomes}
+
+
+def _reprocess_one(task: Optional[str], archive_dir: str, cache_file: str,
+                   limit: int = DEFAULT_LIMIT, tag: Optional[str] = DEFAULT_TAG, debug: bool = False):
+    """Rebuild one task's cache from its latest archived crawl (no network)."""
+    started = time.perf_counter()
+    outcome = {'task': task, 'cache_file': cache_file, 'run_dir': None, 'raw': 0, 'count': 0, 'error': None}
+    try:
+        run = tl_archive.latest_run(archive_dir, task=task, tag=tag)
+        if run is None:
+            raise RuntimeError(f"no archived crawl for task={task} in {archive_dir}")
+        outcome['run_dir'] = run['run_dir']
+        models = tl_archive.load_run_models(run['run_dir'])
+        outcome['raw'] = len(models)
+        pool = tl_filter.deduplicate_models(tl_filter.process_models(models, debug=debug), ranking.pool_size(limit))
+        results, candidates = pool[:limit], pool[limit:]
+
+        # reuse covers downloaded by the crawl that produced the current cache
+        previous = {r.get('id'): r for r in (load_cache(cache_file, ttl=10 ** 9) or []) if isinstance(r, dict)}
+        for r in results:
+            old = previous.get(r.get('id'))
+            if old and old.get('cover_local') and old.get('cover_url') == r.get('cover_url') \
+                    and Path(old['cover_local']).exists():
+                r['cover_local'] = old['cover_local']
+        # the archived counts are as old as the crawl; appending them to the
+        # snapshot store now would distort velocity rankings
+        save_cache(cache_file, results, candidates=candidates, snapshot=False)
+        tl_gallery.write_gallery(cache_file, results)
+        outcome['count'] = len(results)
+    except Exception as e:
+        logger.warning(f"Reprocess failed for task={task}: {e}")
+        outcome['error'] = str(e)
+    outcome['seconds'] = time.perf_counter() - started
+    return outcome
+
+
+def reprocess_tasks(tasks: Optional[Iterable[Optional[str]]] = None, archive_dir: Optional[str] = None,
+                    cache_file: str = DEFAULT_CACHE_FILE, limit: int = DEFAULT_LIMIT,
+                    tag: Optional[str] = DEFAULT_TAG, max_workers: Optional[int] = None, debug: bool = False):
+    """Re-run filter -> parse -> dedupe -> save from archived listing pages.
+
+    Runs offline, one process per task (filtering is CPU-bound). `tasks`
+    defaults to every task found in the archive; None stands for the global
+    (task-less) crawl. Returns {task: {'cache_file', 'run_dir', 'raw', 'count',
+    'seconds', 'error'}} in input order.
+    """
+    archive_dir = archive_dir or tl_archive.archive_dir_for(cache_file)
+    tasks = list(tasks) if tasks is not None else tl_archive.archived_tasks(archive_dir, tag=tag)
+    jobs = []
+    for task in tasks:
+        task_cache = task_cache_paths(task, cache_file)[0] if task else cache_file
+        jobs.append((task, archive_dir, task_cache, limit, tag, debug))
+    if len(jobs) <= 1:
+        outcomes = [_reprocess_one(*job) for job in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=max_workers or min(len(jobs), os.cpu_count() or 1)) as pool:
+            outcomes = list(pool.map(_reprocess_one, *zip(*jobs)))
+    return {o['task']: o for o in outcomes}
+
+
 def fetch_top20_loras(limit=20, tag='lora', token_env='MODELSCOPE_API_TOKEN', debug=False):
     return fetch_top_loras(limit=limit, tag=tag, token_env=token_env, debug=debug)
 
 
 def main():
+    configure_logging()
     try:
         from . import cli
         cli.main()
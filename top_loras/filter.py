@@ -1,6 +1,8 @@
 import re
+import time
 import traceback
 from .parser import parse_model_entry
+from . import metrics
 
 
 def contains_lora(obj):
@@ -52,32 +54,59 @@ def is_lora_candidate(item):
         return False
 
 
+def is_skipped_variant(item):
+    """Light/Distill variants are excluded from the leaderboard."""
+    name_field = (item.get('Name') or item.get('name') or '')
+    return isinstance(name_field, str) and bool(re.search(r'(light|distill)', name_field, flags=re.IGNORECASE))
+
+
+def is_accepted(item):
+    """Whether `process_models` would keep a raw item (without parsing it)."""
+    return isinstance(item, dict) and not is_skipped_variant(item) and is_lora_candidate(item)
+
+
 def process_models(models, debug=False):
     results = []
+    filter_seconds = 0.0
+    parse_seconds = 0.0
     for idx, item in enumerate(models):
         try:
             if not isinstance(item, dict):
                 continue
-            name_field = (item.get('Name') or item.get('name') or '')
-            if isinstance(name_field, str) and re.search(r'(light|distill)', name_field, flags=re.IGNORECASE):
+            t0 = time.perf_counter()
+            if is_skipped_variant(item):
                 if debug:
-                    print(f"[debug] Skipping model due to name filter (Light/Distill): {name_field}")
+                    print(f"[debug] Skipping model due to name filter (Light/Distill): {item.get('Name') or item.get('name')}")
+                filter_seconds += time.perf_counter() - t0
                 continue
 
-            if not is_lora_candidate(item):
+            candidate = is_lora_candidate(item)
+            t1 = time.perf_counter()
+            filter_seconds += t1 - t0
+            if not candidate:
                 continue
 
             model_info = parse_model_entry(item)
+            parse_seconds += time.perf_counter() - t1
             results.append(model_info)
         except Exception as e:
             if debug:
                 print(f"[error] Exception processing model index={idx}: {e}")
                 traceback.print_exc()
             continue
+    metrics.observe('stage_seconds', filter_seconds, stage='filter')
+    metrics.observe('stage_seconds', parse_seconds, stage='parse')
+    metrics.inc('models_seen_total', len(models))
+    metrics.inc('models_accepted_total', len(results))
     return results
 
 
 def deduplicate_models(results, limit):
+    with metrics.stage('dedupe'):
+        return _deduplicate(results, limit)
+
+
+def _deduplicate(results, limit):
     unique = {}
     for idx, r in enumerate(results):
         rid = r.get('id') or r.get('title_en') or r.get('title_cn')
@@ -0,0 +1,108 @@
+"""
+Precomputed, UI-ready gallery payloads.
+
+After a refresh saves a cache file, `write_gallery(cache_file, results)` writes
+`<cache stem>.gallery.json` next to it: every model normalized for the UI
+(display title, resolved cover path) together with the (mtime_ns, size) of the
+cache file it was built from. `load_gallery(cache_file)` returns those records
+only while that version still matches the cache on disk, so a UI load is one
+JSON read with no per-model filesystem checks. A missing, stale or unreadable
+gallery file returns None and callers normalize the cache themselves.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+from .cache import write_atomic
+
+logger = logging.getLogger(__name__)
+
+GALLERY_SUFFIX = '.gallery.json'
+GALLERY_FORMAT = 1
+
+
+def gallery_path(cache_file: str) -> Path:
+    p = Path(cache_file)
+    return p.with_name(p.stem + GALLERY_SUFFIX)
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def resolve_cover(raw_cover: Optional[str]) -> Optional[str]:
+    """Existing local path as a normalized string, otherwise the raw value (URL)."""
+    if not raw_cover:
+        return None
+    candidate = Path(raw_cover)
+    if candidate.exists():
+        return str(candidate)
+    return raw_cover
+
+
+def normalize_model(model: Dict[str, Any], idx: int) -> Dict[str, Any]:
+    """Model record with the UI's display `title` and resolved `cover` (None if no image)."""
+    cover = (
+        resolve_cover(model.get('cover_local'))
+        or resolve_cover(model.get('cover'))
+        or resolve_cover(model.get('cover_url'))
+    )
+    title = (
+        model.get('title_cn')
+        or model.get('title_en')
+        or model.get('title')
+        or model.get('id')
+        or f"Model {idx + 1}"
+    )
+    return {**model, 'title': title, 'cover': cover}
+
+
+def write_gallery(cache_file: str, results: List[Dict[str, Any]]) -> Optional[Path]:
+    """Write the gallery payload for an already-saved cache file."""
+    version = file_version(cache_file)
+    if version is None:
+        return None
+    with metrics.stage('gallery_build'):
+        models = [normalize_model(m, idx) for idx, m in enumerate(results or []) if isinstance(m, dict)]
+        payload = {
+            'format': GALLERY_FORMAT,
+            'cache_version': list(version),
+            'generated_at': time.time(),
+            'models': models,
+        }
+        path = gallery_path(cache_file)
+        write_atomic(path, json.dumps(payload, ensure_ascii=False))
+    return path
+
+
+def load_gallery(cache_file: str, version: Optional[Tuple[int, int]] = None) -> Optional[List[Dict[str, Any]]]:
+    """Normalized models from the gallery payload, or None if it is missing or stale.
+
+    `version` is the cache file's current (mtime_ns, size); it is stat'ed when
+    not given.
+    """
+    version = version if version is not None else file_version(cache_file)
+    path = gallery_path(cache_file)
+    if version is None or not path.exists():
+        metrics.inc('gallery_lookups_total', result='miss')
+        return None
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except Exception as e:
+        metrics.inc('gallery_lookups_total', result='error')
+        logger.warning(f"Failed to load gallery payload {path}: {e}")
+        return None
+    if data.get('format') != GALLERY_FORMAT or tuple(data.get('cache_version') or ()) != tuple(version):
+        metrics.inc('gallery_lookups_total', result='stale')
+        return None
+    metrics.inc('gallery_lookups_total', result='hit')
+    return data.get('models') or []
@@ -0,0 +1,77 @@
+"""
+Minimal ModelScope client for the listing endpoint.
+
+`ListingClient` exposes the small part of `modelscope.hub.api.HubApi` that
+`api.fetch_models` uses (`endpoint`, `headers`, `session`, `builder_headers`,
+`login`) on top of a plain keep-alive `requests.Session`, so listing works
+without the modelscope SDK installed. Compressed responses (gzip/deflate, and
+br when a brotli module is available) are decoded by urllib3.
+"""
+import os
+from typing import Optional, Tuple
+
+DEFAULT_ENDPOINT = 'https://www.modelscope.cn'
+LOGIN_PATH = '/api/v1/login'
+USER_AGENT = 'top-loras/0.1 (+https://github.com/neverbiasu/ModelScope-Top-LoRAs)'
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get('MODELSCOPE_CONNECT_TIMEOUT', '5'))
+DEFAULT_READ_TIMEOUT = float(os.environ.get('MODELSCOPE_READ_TIMEOUT', '20'))
+DEFAULT_POOL_SIZE = 8
+
+
+def accept_encoding() -> str:
+    """Content codings we can decode; br only when urllib3 can use a brotli module."""
+    encodings = ['gzip', 'deflate']
+    for mod in ('brotli', 'brotlicffi'):
+        try:
+            __import__(mod)
+        except Exception:
+            continue
+        encodings.append('br')
+        break
+    return ', '.join(encodings)
+
+
+def request_timeout(connect: Optional[float] = None, read: Optional[float] = None) -> Tuple[float, float]:
+    """(connect, read) timeout tuple, defaulting to the MODELSCOPE_*_TIMEOUT env settings."""
+    return (DEFAULT_CONNECT_TIMEOUT if connect is None else float(connect),
+            DEFAULT_READ_TIMEOUT if read is None else float(read))
+
+
+class ListingClient:
+    """HubApi-compatible subset backed by a pooled keep-alive session."""
+
+    def __init__(self, endpoint: Optional[str] = None, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None, pool_size: int = DEFAULT_POOL_SIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.endpoint = (endpoint or os.environ.get('MODELSCOPE_ENDPOINT') or DEFAULT_ENDPOINT).rstrip('/')
+        self.timeout = request_timeout(connect_timeout, read_timeout)
+        self.headers = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Encoding': accept_encoding(),
+        })
+
+    def builder_headers(self, headers):
+        built = dict(headers or {})
+        built.setdefault('Content-Type', 'application/json')
+        return built
+
+    def login(self, token: str):
+        """Exchange an access token for session cookies (same call HubApi.login makes)."""
+        r = self.session.post(self.endpoint + LOGIN_PATH, json={'AccessToken': token},
+                              headers=self.builder_headers(self.headers), timeout=self.timeout)
+        r.raise_for_status()
+        data = r.json() if r.content else {}
+        if isinstance(data, dict) and data.get('Success') is False:
+            raise RuntimeError(f"Login failed: {data.get('Message')}")
+        return data
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,230 @@
+"""
+Disk-quota-bounded image directories with LRU eviction.
+
+Cover directories (`cache/images/<task>/`) and generated outputs
+(`cache/outputs/images/`) are each kept under a byte quota:
+
+  - `touch(path)` records that an image was used (a page of the UI gallery was
+    shown, an output was downloaded). Accesses are buffered in memory and
+    flushed at most every `FLUSH_INTERVAL` seconds into a small per-directory
+    index, `<dir>/.access.json` ({file name: last access}).
+  - `gc_directory(directory, quota_bytes, protected)` makes one `os.scandir`
+    pass. Orphans (files no current cache file references, and stale
+    `.part`/`.tmp` leftovers) older than `min_age` are removed first. Then
+    unprotected files are evicted least recently used first until the
+    directory fits its quota. A file's last use is the later of its indexed
+    access and its mtime, so fresh downloads count as used.
+  - Covers referenced by a current cache file (`referenced_covers`) are never
+    removed, so the UI never points at a deleted cover.
+
+`maybe_gc` runs that at most every `GC_INTERVAL` seconds per directory and is
+called after refreshes and output downloads; `top-loras gc-images` runs it on
+demand. Quotas default to TOP_LORAS_IMAGE_QUOTA_MB per cover directory and
+TOP_LORAS_OUTPUT_QUOTA_MB for outputs.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+from . import metrics
+from .cache import write_atomic
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = '.access.json'
+DEFAULT_COVER_QUOTA = int(float(os.environ.get('TOP_LORAS_IMAGE_QUOTA_MB', '200')) * 1024 * 1024)
+DEFAULT_OUTPUT_QUOTA = int(float(os.environ.get('TOP_LORAS_OUTPUT_QUOTA_MB', '500')) * 1024 * 1024)
+DEFAULT_MIN_AGE = 3600.0
+FLUSH_INTERVAL = 30.0
+GC_INTERVAL = 300.0
+_TEMP_SUFFIXES = ('.part', '.tmp')
+
+_pending: Dict[str, Dict[str, float]] = {}
+_last_flush = 0.0
+_last_gc: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def touch(path, now: Optional[float] = None):
+    """Record an access to the image at `path` (buffered; see `flush_access`)."""
+    global _last_flush
+    if not path or str(path).startswith(('http://', 'https://', 'data:')):
+        return
+    p = Path(path)
+    now = time.time() if now is None else now
+    with _lock:
+        _pending.setdefault(str(p.parent), {})[p.name] = now
+        due = now - _last_flush >= FLUSH_INTERVAL
+    if due:
+        flush_access()
+
+
+def _read_index(directory: Path) -> Dict[str, float]:
+    try:
+        data = json.loads((directory / INDEX_FILE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    files = data.get('files') if isinstance(data, dict) else None
+    return files if isinstance(files, dict) else {}
+
+
+def _write_index(directory: Path, files: Dict[str, float]):
+    write_atomic(directory / INDEX_FILE, json.dumps({'files': files}, ensure_ascii=False, separators=(',', ':')))
+
+
+def flush_access():
+    """Merge buffered accesses into each directory's index file."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.time()
+    for directory, accesses in pending.items():
+        d = Path(directory)
+        if not d.is_dir():
+            continue
+        files = _read_index(d)
+        for name, ts in accesses.items():
+            files[name] = max(ts, files.get(name) or 0)
+        try:
+            _write_index(d, files)
+        except OSError as e:
+            logger.warning(f"Failed to write image access index in {d}: {e}")
+
+
+def referenced_covers(cache_dir: str) -> Set[str]:
+    """Absolute paths of every `cover_local` in the cache files under `cache_dir`."""
+    refs: Set[str] = set()
+    root = Path(cache_dir)
+    if not root.is_dir():
+        return refs
+    for path in root.glob('*.json'):
+        if path.name.endswith('.gallery.json'):
+            continue
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        results = data.get('results') if isinstance(data, dict) else None
+        for r in results or []:
+            cover = r.get('cover_local') if isinstance(r, dict) else None
+            if cover:
+                refs.add(os.path.abspath(cover))
+    return refs
+
+
+def gc_directory(directory, quota_bytes: int, protected: Optional[Iterable[str]] = None,
+                 sweep_orphans: bool = False, min_age: float = DEFAULT_MIN_AGE,
+                 dry_run: bool = False) -> Dict[str, Any]:
+    """Sweep orphans (optional) and evict LRU files until `directory` fits `quota_bytes`.
+
+    `protected` holds absolute paths that are never removed. Without
+    `sweep_orphans` unprotected files are only removed for the quota (e.g.
+    generated outputs, which no cache file references).
+    """
+    d = Path(directory)
+    stats = {'directory': str(d), 'files': 0, 'bytes': 0, 'orphans': 0, 'evicted': 0,
+             'freed_bytes': 0, 'protected_bytes': 0}
+    if not d.is_dir():
+        return stats
+    flush_access()
+    protected = set(protected or ())
+    index = _read_index(d)
+    now = time.time()
+    entries = []
+    with os.scandir(d) as it:
+        for entry in it:
+            if entry.name == INDEX_FILE or not entry.is_file(follow_symlinks=False):
+                continue
+            st = entry.stat(follow_symlinks=False)
+            entries.append((max(index.get(entry.name) or 0, st.st_mtime), entry.name, st.st_size))
+
+    def _remove(name, size, reason):
+        if not dry_run:
+            try:
+                os.remove(d / name)
+            except OSError as e:
+                logger.warning(f"Failed to evict {d / name}: {e}")
+                return False
+        index.pop(name, None)
+        stats['freed_bytes'] += size
+        metrics.inc('image_cache_evictions_total', reason=reason)
+        metrics.inc('image_cache_evicted_bytes_total', size, reason=reason)
+        return True
+
+    kept = []
+    for last_used, name, size in entries:
+        is_protected = os.path.abspath(d / name) in protected
+        old = now - last_used >= min_age
+        orphan = sweep_orphans or name.endswith(_TEMP_SUFFIXES)
+        if not is_protected and orphan and old and _remove(name, size, 'orphan'):
+            stats['orphans'] += 1
+            continue
+        kept.append((last_used, name, size, is_protected))
+
+    total = sum(size for _t, _n, size, _p in kept)
+    stats['protected_bytes'] = sum(size for _t, _n, size, p in kept if p)
+    for last_used, name, size, is_protected in sorted(kept):
+        if total <= quota_bytes:
+            break
+        if is_protected:
+            continue
+        if _remove(name, size, 'quota'):
+            stats['evicted'] += 1
+            total -= size
+    if total > quota_bytes:
+        logger.warning(f"{d} holds {total} bytes of referenced images, over its {quota_bytes} byte quota")
+
+    live = {name for _t, name, _s, _p in kept}
+    stats['files'] = len(live) - stats['evicted']
+    stats['bytes'] = total
+    if not dry_run:
+        try:
+            _write_index(d, {name: ts for name, ts in index.items() if name in live})
+        except OSError as e:
+            logger.warning(f"Failed to write image access index in {d}: {e}")
+    metrics.set_gauge('image_cache_bytes', total, directory=str(d))
+    return stats
+
+
+def gc_images(images_root: str = 'cache/images', outputs_dir: Optional[str] = 'cache/outputs/images',
+              cache_dir: str = 'cache', quota_bytes: int = DEFAULT_COVER_QUOTA,
+              output_quota_bytes: int = DEFAULT_OUTPUT_QUOTA, sweep: bool = True,
+              min_age: float = DEFAULT_MIN_AGE, dry_run: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Collect every cover directory (`images_root` and its task subdirectories) and the outputs directory."""
+    protected = referenced_covers(cache_dir)
+    results = {}
+    root = Path(images_root)
+    directories = [root] + sorted(p for p in root.iterdir() if p.is_dir()) if root.is_dir() else []
+    for directory in directories:
+        results[str(directory)] = gc_directory(directory, quota_bytes, protected, sweep_orphans=sweep,
+                                               min_age=min_age, dry_run=dry_run)
+    if outputs_dir and Path(outputs_dir).is_dir():
+        results[str(outputs_dir)] = gc_directory(outputs_dir, output_quota_bytes, min_age=min_age,
+                                                 dry_run=dry_run)
+    return results
+
+
+def maybe_gc(directory, quota_bytes: int, cache_dir: Optional[str] = None,
+             interval: float = GC_INTERVAL) -> Optional[Dict[str, Any]]:
+    """`gc_directory` at most once per `interval` seconds per directory (best effort).
+
+    With `cache_dir`, covers referenced by its cache files are protected and
+    orphans are swept; otherwise only the quota is enforced.
+    """
+    key = str(directory)
+    now = time.time()
+    with _lock:
+        if now - _last_gc.get(key, 0) < interval:
+            return None
+        _last_gc[key] = now
+    try:
+        protected = referenced_covers(cache_dir) if cache_dir else None
+        return gc_directory(directory, quota_bytes, protected, sweep_orphans=cache_dir is not None)
+    except Exception as e:
+        logger.warning(f"Image cache GC failed for {directory}: {e}")
+        return None
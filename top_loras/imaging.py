@@ -0,0 +1,98 @@
+"""
+Cover verification, dimensions and low-quality image placeholders (LQIP).
+
+`inspect_image(path)` decodes a downloaded cover once with Pillow and returns
+`{'width', 'height', 'lqip'}`, where `lqip` is a `data:image/jpeg;base64,...`
+URI of the image shrunk to at most `LQIP_MAX_SIDE` pixels (a few hundred
+bytes). The download stage stores these on each record as `cover_width`,
+`cover_height` and `cover_lqip`. The UI's Cards view (`ui.loaders.card_page`)
+uses them to reserve the cover's aspect ratio and to show the blurred
+placeholder while the remote image loads; Gradio's Gallery takes only
+(image, caption) pairs and does not use them.
+
+Files Pillow cannot decode raise `InvalidImageError`, so corrupt downloads
+are caught at refresh time rather than in the browser. Pillow is imported on
+first use and is optional: without it `inspect_image` returns None and
+records simply carry no dimensions.
+"""
+import base64
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LQIP_MAX_SIDE = 16
+LQIP_QUALITY = 40
+_MEMO_MAX = 1024
+
+# (path, mtime_ns, size) -> info: a cover shared by several tasks, or unchanged
+# since the last refresh in this process, is decoded once
+_MEMO: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+
+
+class InvalidImageError(ValueError):
+    """The file is not a decodable image (truncated or corrupt download, HTML error page, ...)."""
+
+
+def _pil_image():
+    try:
+        from PIL import Image
+    except Exception:
+        return None
+    return Image
+
+
+def lqip_data_uri(img) -> str:
+    """Tiny JPEG data URI of an opened Pillow image."""
+    thumb = img.copy()
+    thumb.thumbnail((LQIP_MAX_SIDE, LQIP_MAX_SIDE))
+    if thumb.mode != 'RGB':
+        # flatten transparency onto white instead of black
+        background = _pil_image().new('RGB', thumb.size, (255, 255, 255))
+        rgba = thumb.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[-1])
+        thumb = background
+    buf = io.BytesIO()
+    thumb.save(buf, format='JPEG', quality=LQIP_QUALITY, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def inspect_image(path) -> Optional[Dict[str, Any]]:
+    """`{'width', 'height', 'lqip'}` for the image at `path`, or None without Pillow.
+
+    Raises `InvalidImageError` when the file cannot be decoded.
+    """
+    Image = _pil_image()
+    if Image is None:
+        return None
+    p = Path(path)
+    st = os.stat(p)
+    key = (str(p), st.st_mtime_ns, st.st_size)
+    with _MEMO_LOCK:
+        info = _MEMO.get(key)
+    if info is not None:
+        return info
+    try:
+        with Image.open(p) as img:
+            # verify() checks structure without decoding; the image must be reopened after it
+            img.verify()
+        with Image.open(p) as img:
+            # JPEG can decode at a reduced scale, which is all the placeholder needs
+            width, height = img.size
+            img.draft('RGB', (LQIP_MAX_SIDE * 4, LQIP_MAX_SIDE * 4))
+            img.load()
+            lqip = lqip_data_uri(img)
+    except Exception as e:
+        raise InvalidImageError(f"{p}: {e}") from e
+    info = {'width': width, 'height': height, 'lqip': lqip}
+    with _MEMO_LOCK:
+        _MEMO[key] = info
+        while len(_MEMO) > _MEMO_MAX:
+            _MEMO.popitem(last=False)
+    return info
@@ -2,19 +2,46 @@ import os
 import json
 import time
 import uuid
+import hashlib
+import threading
+import mimetypes
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from base64 import b64decode
 
+from . import image_cache
+from . import metrics
+from . import resilience
+
 # Tiny transparent PNG data URI as fallback/mock image
 _PLACEHOLDER_DATA_URI = (
-    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAAWgmWQ0AAAAASUVORK5CYII="
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNgYGBgAAAABQABeqhXUAAAAABJRU5ErkJggg=="
 )
 
 DEFAULT_TIMEOUT = 30
 MAX_RETRIES = 3
 IMAGE_POLL_INTERVAL = float(os.environ.get("MODELSCOPE_IMAGE_POLL_INTERVAL", "3"))
 IMAGE_POLL_MAX_SECONDS = int(os.environ.get("MODELSCOPE_IMAGE_POLL_MAX_SECONDS", "60"))
+OUTPUT_IMAGES_DIR = Path("cache") / "outputs" / "images"
+OUTPUT_DOWNLOAD_WORKERS = int(os.environ.get("MODELSCOPE_OUTPUT_DOWNLOAD_WORKERS", "4"))
+_CHUNK_SIZE = 64 * 1024
+
+# Content types we expect from the inference CDN; other image/* types go through mimetypes
+_IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp",
+}
+# Untyped bodies: the extension comes from the URL (or defaults to .jpg)
+_GENERIC_CONTENT_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+
+# Shared pool so output downloads overlap with the caller's next job instead of
+# blocking the return of `_remote_infer_image`.
+_DOWNLOAD_POOL = ThreadPoolExecutor(max_workers=OUTPUT_DOWNLOAD_WORKERS, thread_name_prefix="tl-output-dl")
 
 
 def _ensure_dir(path: str) -> None:
@@ -35,7 +62,8 @@ def _requests_with_retries(method: str, url: str, max_retries: int = MAX_RETRIES
     for attempt in range(1, max_retries + 1):
         try:
             func = getattr(requests, method.lower())
-            resp = func(url, **kwargs)
+            # only GETs (polls, output images) are safe to hedge; a POST submits a job
+            resp = resilience.call(url, lambda: func(url, **kwargs), hedge=method.lower() == "get")
             # Retry on rate limit or server errors
             if resp.status_code == 429 or resp.status_code >= 500:
                 if attempt == max_retries:
@@ -45,6 +73,8 @@ def _requests_with_retries(method: str, url: str, max_retries: int = MAX_RETRIES
                 backoff *= 2
                 continue
             return resp
+        except resilience.CircuitOpenError:
+            raise
         except Exception as exc:
             # Network-level errors (ConnectionError, Timeout, etc.) -> retry
             if attempt == max_retries:
@@ -67,13 +97,153 @@ def _write_job_file(task: str, job_id: str, payload: Dict[str, Any]) -> str:
     return str(out_file)
 
 
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def _is_image_response(content_type: Optional[str]) -> bool:
+    ctype = _media_type(content_type)
+    return ctype.startswith("image/") or ctype in _GENERIC_CONTENT_TYPES
+
+
+def _extension_for(content_type: Optional[str], url: str) -> str:
+    ctype = _media_type(content_type)
+    if ctype in _IMAGE_EXTENSIONS:
+        return _IMAGE_EXTENSIONS[ctype]
+    guessed = mimetypes.guess_extension(ctype) if ctype.startswith("image/") else None
+    if guessed:
+        return guessed
+    suffix = Path(url.split("?", 1)[0]).suffix.lower()
+    return suffix if suffix in _IMAGE_EXTENSIONS.values() else ".jpg"
+
+
+def _download_output_image(url: str, dest_dir: Path) -> Dict[str, Any]:
+    """Stream one output image to disk, hashing it on the way.
+
+    The file is written under a temporary name and renamed once the extension
+    is known from the response Content-Type; a failed download removes it.
+    A response that is not an image (e.g. an HTML error page served with 200)
+    counts as a failed download.
+    """
+    resp = _requests_with_retries("get", url, timeout=DEFAULT_TIMEOUT, stream=True)
+    tmp_path = None
+    try:
+        resp.raise_for_status()
+        content_type = resp.headers.get("Content-Type")
+        if not _is_image_response(content_type):
+            raise RuntimeError(f"Output {url} is not an image (Content-Type {_media_type(content_type)})")
+        stem = f"gen_{uuid.uuid4().hex[:10]}"
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest_dir / f"{stem}.part"
+        digest = hashlib.sha256()
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for chunk in resp.iter_content(_CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        file_path = dest_dir / f"{stem}{_extension_for(content_type, url)}"
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        close = getattr(resp, "close", None)
+        if close:
+            close()
+    metrics.inc("image_bytes_total", size, kind="output")
+    metrics.inc("images_downloaded_total", kind="output", result="ok")
+    image_cache.maybe_gc(dest_dir, image_cache.DEFAULT_OUTPUT_QUOTA)
+    return {
+        "url": url,
+        "path": str(file_path),
+        "content_type": content_type,
+        "sha256": digest.hexdigest(),
+        "bytes": size,
+    }
+
+
+def _gather_downloads(urls: List[str], futures: List[Future]) -> List[Dict[str, Any]]:
+    records = []
+    for url, fut in zip(urls, futures):
+        try:
+            records.append(fut.result())
+        except Exception as exc:
+            metrics.inc("images_downloaded_total", kind="output", result="failed")
+            records.append({"url": url, "error": str(exc)})
+    return records
+
+
+def _start_output_downloads(output_images: List[Any], dest_dir: Path = OUTPUT_IMAGES_DIR) -> Optional[Future]:
+    """Start concurrent downloads of all output image URLs without waiting.
+
+    Returns a Future resolving to one record per URL (in order); failed
+    downloads yield a record with an `error` key instead of `path`.
+    """
+    urls = [u for u in output_images if isinstance(u, str) and u.startswith("http")]
+    if not urls:
+        return None
+    futures = [_DOWNLOAD_POOL.submit(_download_output_image, u, dest_dir) for u in urls]
+    combined: Future = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _on_done(_fut):
+        with lock:
+            remaining[0] -= 1
+            finished = remaining[0] == 0
+        if finished:
+            combined.set_result(_gather_downloads(urls, futures))
+
+    for fut in futures:
+        fut.add_done_callback(_on_done)
+    return combined
+
+
+def _apply_downloads(payload: Dict[str, Any], records: List[Dict[str, Any]]) -> None:
+    result = payload.get("result")
+    if not isinstance(result, dict):
+        return
+    result["images_local"] = [r["path"] for r in records if r.get("path")]
+    result["images_meta"] = records
+    errors = [r["error"] for r in records if r.get("error")]
+    if errors:
+        result["download_error"] = "; ".join(errors)
+
+
+def collect_downloads(job: Dict[str, Any], timeout: Optional[float] = None) -> List[str]:
+    """Wait for a job's pending output downloads and record them.
+
+    Merges local paths and checksums into `job["result"]` and rewrites the job
+    file. Returns the list of local image paths (empty if nothing was pending).
+    """
+    fut = job.pop("pending_downloads", None)
+    if fut is None:
+        result = job.get("result") or {}
+        return list(result.get("images_local") or []) if isinstance(result, dict) else []
+    try:
+        records = fut.result(timeout=timeout)
+    except Exception as exc:
+        records = [{"error": str(exc)}]
+    _apply_downloads(job, records)
+    file_path = job.get("file_path")
+    if file_path:
+        record = {k: v for k, v in job.items() if k != "file_path"}
+        Path(file_path).write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+    return list(job["result"].get("images_local") or []) if isinstance(job.get("result"), dict) else []
+
+
 def _remote_infer_image(model_id: str, params: Dict[str, Any], token: str) -> Dict[str, Any]:
     """Image generation via ModelScope async API.
 
     Flow:
       1. POST /v1/images/generations with model + prompt (+ optional params) and header X-ModelScope-Async-Mode: true
       2. Poll /v1/tasks/{task_id} with header X-ModelScope-Task-Type: image_generation until SUCCEED/FAILED or timeout.
-    Returns dict with status/result/raw.
+      3. Start background downloads of every output image.
+    Returns dict with status/result/raw plus `downloads`, a Future resolving to
+    the download records (None when there is nothing to download).
     """
     try:
         import requests
@@ -106,7 +276,8 @@ def _remote_infer_image(model_id: str, params: Dict[str, Any], token: str) -> Di
         body["guidance"] = params.get("guidance")
 
     # Submit generation task
-    submit_resp = _requests_with_retries("post", gen_url, json=body, headers=headers, timeout=DEFAULT_TIMEOUT)
+    with metrics.stage("generation_submit"):
+        submit_resp = _requests_with_retries("post", gen_url, json=body, headers=headers, timeout=DEFAULT_TIMEOUT)
     if submit_resp.status_code == 401:
         raise RuntimeError("Unauthorized (401) image generation")
     if submit_resp.status_code >= 400:
@@ -131,7 +302,8 @@ def _remote_infer_image(model_id: str, params: Dict[str, Any], token: str) -> Di
     deadline = time.time() + IMAGE_POLL_MAX_SECONDS
     last_data = None
     while time.time() < deadline:
-        poll_resp = _requests_with_retries("get", task_url, headers=poll_headers, timeout=DEFAULT_TIMEOUT)
+        with metrics.stage("generation_poll"):
+            poll_resp = _requests_with_retries("get", task_url, headers=poll_headers, timeout=DEFAULT_TIMEOUT)
         if poll_resp.status_code == 401:
             raise RuntimeError("Unauthorized (401) while polling task")
         if poll_resp.status_code >= 400:
@@ -152,26 +324,8 @@ def _remote_infer_image(model_id: str, params: Dict[str, Any], token: str) -> Di
                 "model_id": model_id,
                 "prompt": body.get("prompt", ""),
             }
-            # Optionally download first image for local display convenience
-            local_paths = []
-            try:
-                if output_images:
-                    first = output_images[0]
-                    if isinstance(first, str) and first.startswith("http"):
-                        img_resp = _requests_with_retries("get", first, timeout=DEFAULT_TIMEOUT)
-                        try:
-                            img_resp.raise_for_status()
-                        except Exception:
-                            raise
-                        img_dir = Path("cache") / "outputs" / "images"
-                        img_dir.mkdir(parents=True, exist_ok=True)
-                        file_path = img_dir / f"gen_{uuid.uuid4().hex[:10]}.jpg"
-                        file_path.write_bytes(img_resp.content)
-                        local_paths.append(str(file_path))
-                        result["images_local"] = local_paths
-            except Exception as _dl_exc:  # pragma: no cover
-                result["download_error"] = str(_dl_exc)
-            return {"status": "succeeded", "result": result, "raw": data}
+            downloads = _start_output_downloads(output_images)
+            return {"status": "succeeded", "result": result, "raw": data, "downloads": downloads}
         if status == "FAILED":
             err = data.get("error") or data
             raise RuntimeError(f"Image generation failed: {err}")
@@ -221,12 +375,18 @@ def _mock_infer(model_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
     return {"status": "succeeded", "result": result}
 
 
-def submit_job(model_id: str, params: Dict[str, Any], token: Optional[str] = None) -> Dict[str, Any]:
+def submit_job(model_id: str, params: Dict[str, Any], token: Optional[str] = None,
+               wait_downloads: bool = True) -> Dict[str, Any]:
     """
     Submit a generation job. If token is provided, try remote inference with retries.
     Otherwise or on failure, return a local mock result.
 
     Writes job payload to cache/outputs/{task}/{job_id}.json with meta/status/result.
+
+    Output images are downloaded in the background. With `wait_downloads=False`
+    the job is returned as soon as the remote task succeeds and carries a
+    `pending_downloads` future; call `collect_downloads(job)` later to record
+    the local files.
     """
     task = (params.get("task") or "unknown").replace("/", "_")
     job_id = params.get("job_id") or uuid.uuid4().hex[:12]
@@ -240,9 +400,11 @@ def submit_job(model_id: str, params: Dict[str, Any], token: Optional[str] = Non
 
     # Try remote path if token provided
     payload: Dict[str, Any]
+    downloads: Optional[Future] = None
     if token:
         try:
             remote = _remote_infer(model_id, params, token)
+            downloads = remote.get("downloads")
             payload = {"meta": meta, "status": remote.get("status", "succeeded"), "result": remote.get("result"), "remote": True}
         except Exception as e:
             # Fall back to mock but preserve error for UI visibility
@@ -250,6 +412,17 @@ def submit_job(model_id: str, params: Dict[str, Any], token: Optional[str] = Non
     else:
         payload = {"meta": meta, "status": "succeeded", "result": _mock_infer(model_id, params)["result"], "remote": False, "mock": True}
 
+    metrics.inc("generation_jobs_total", mode="remote" if payload.get("remote") else ("fallback" if payload.get("error") else "mock"))
+
+    if downloads is not None and wait_downloads:
+        try:
+            _apply_downloads(payload, downloads.result())
+        except Exception as exc:  # pragma: no cover - pool task failures are captured per record
+            payload["result"]["download_error"] = str(exc)
+        downloads = None
+
     file_path = _write_job_file(task, job_id, payload)
     payload["file_path"] = file_path
+    if downloads is not None:
+        payload["pending_downloads"] = downloads
     return payload
@@ -0,0 +1,149 @@
+"""
+Process-wide pipeline metrics: stage timers, counters and gauges.
+
+The fetch pipeline, cache and inference client record into the module-level
+`REGISTRY`; `snapshot()` returns it as JSON-friendly data and
+`to_prometheus()` renders the Prometheus text exposition format.
+
+    from top_loras import metrics
+    with metrics.timer('stage_seconds', stage='parse'):
+        ...
+    metrics.inc('http_requests_total', endpoint='listing', status=200)
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+PROMETHEUS_PREFIX = 'top_loras_'
+
+_LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict) -> _LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for k, v in labels:
+        v = v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{v}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges and timers keyed by name + labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[_LabelKey, float] = {}
+        self._gauges: Dict[_LabelKey, float] = {}
+        # timer -> [count, sum_seconds, max_seconds]
+        self._timers: Dict[_LabelKey, list] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        k = _key(name, labels)
+        with self._lock:
+            self._counters[k] = self._counters.get(k, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        k = _key(name, labels)
+        with self._lock:
+            t = self._timers.get(k)
+            if t is None:
+                self._timers[k] = [1, seconds, seconds]
+            else:
+                t[0] += 1
+                t[1] += seconds
+                t[2] = max(t[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timers.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(self._counters.items())]
+            gauges = [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(self._gauges.items())]
+            timers = [{'name': n, 'labels': dict(l), 'count': t[0], 'sum': t[1], 'max': t[2]}
+                      for (n, l), t in sorted(self._timers.items())]
+        return {'generated_at': time.time(), 'counters': counters, 'gauges': gauges, 'timers': timers}
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            timers = sorted(self._timers.items())
+        lines = []
+        typed = set()
+
+        def _type(metric, kind):
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} {kind}')
+
+        for (name, labels), value in counters:
+            metric = PROMETHEUS_PREFIX + name
+            _type(metric, 'counter')
+            lines.append(f'{metric}{_format_labels(labels)} {value:g}')
+        for (name, labels), value in gauges:
+            metric = PROMETHEUS_PREFIX + name
+            _type(metric, 'gauge')
+            lines.append(f'{metric}{_format_labels(labels)} {value:g}')
+        for (name, labels), (count, total, peak) in timers:
+            metric = PROMETHEUS_PREFIX + name
+            _type(metric, 'summary')
+            lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+            lines.append(f'{metric}_sum{_format_labels(labels)} {total:.6f}')
+        for (name, labels), (_count, _total, peak) in timers:
+            metric = PROMETHEUS_PREFIX + name + '_max'
+            _type(metric, 'gauge')
+            lines.append(f'{metric}{_format_labels(labels)} {peak:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set_gauge
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+snapshot = REGISTRY.snapshot
+to_prometheus = REGISTRY.to_prometheus
+
+
+def stage(name: str):
+    """Shorthand for timing one pipeline stage under `stage_seconds{stage=name}`."""
+    return REGISTRY.timer('stage_seconds', stage=name)
+
+
+def write_metrics(path: str, registry: MetricsRegistry = REGISTRY) -> str:
+    """Write metrics to `path`: Prometheus text for .prom/.txt, JSON snapshot otherwise."""
+    p = Path(path)
+    if p.suffix in ('.prom', '.txt'):
+        text = registry.to_prometheus()
+    else:
+        text = json.dumps(registry.snapshot(), ensure_ascii=False, indent=2)
+    # import here: cache itself records metrics
+    from .cache import write_atomic
+    write_atomic(p, text)
+    return str(p)
@@ -0,0 +1,151 @@
+"""
+Opt-in profiling of a refresh run.
+
+`profile_run(cache_file)` wraps a block with cProfile, tracemalloc and a
+small stack sampler and, on exit, writes next to the cache file:
+
+  <cache>.profile-<ts>.prof       cProfile stats (snakeviz, flameprof, pstats)
+  <cache>.profile-<ts>.collapsed  sampled stacks, one "frame;frame;... count"
+                                  line each (flamegraph.pl, speedscope, inferno)
+  <cache>.profile-<ts>.txt        top-N hotspot summary (CPU and allocations)
+
+The CLI enables it with --profile; the Gradio refresh callbacks enable it when
+the TOP_LORAS_PROFILE environment variable is set to a truthy value.
+
+cProfile only records the thread that entered `profile_run`. Work done on
+other threads (the per-task workers of `--all-tasks`, cover downloads) shows
+up in the sampled stacks, which cover every thread, but not in the .prof
+file. Only one `maybe_profile` block runs at a time: a refresh that starts
+while another is being profiled runs unprofiled.
+"""
+import contextlib
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+PROFILE_ENV = 'TOP_LORAS_PROFILE'
+DEFAULT_TOP_N = 25
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+logger = logging.getLogger(__name__)
+# held while a maybe_profile block runs; tracemalloc and the sampler are process-wide
+_ACTIVE = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class _StackSampler(threading.Thread):
+    """Sample every thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(name='tl-profile-sampler', daemon=True)
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _hotspots(profiler: cProfile.Profile, snapshot, top_n: int, elapsed: float, label: str) -> str:
+    out = io.StringIO()
+    out.write(f"Profile of {label}: {elapsed:.3f}s wall\n\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs()
+    out.write(f"== Top {top_n} by cumulative time\n")
+    stats.sort_stats('cumulative').print_stats(top_n)
+    out.write(f"== Top {top_n} by own time\n")
+    stats.sort_stats('tottime').print_stats(top_n)
+    if snapshot is not None:
+        out.write(f"== Top {top_n} allocation sites (tracemalloc)\n")
+        for stat in snapshot.statistics('lineno')[:top_n]:
+            out.write(f"{stat}\n")
+    return out.getvalue()
+
+
+@contextlib.contextmanager
+def profile_run(cache_file: str, label: Optional[str] = None, top_n: int = DEFAULT_TOP_N,
+                trace_memory: bool = True, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+    """Profile the enclosed block and write the dumps next to `cache_file`.
+
+    Yields a dict that is filled with the written paths once the block exits.
+    """
+    report = {}
+    label = label or Path(cache_file).name
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(10)
+    sampler = _StackSampler(sample_interval)
+    sampler.start()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot() if trace_memory and tracemalloc.is_tracing() else None
+        if started_tracing:
+            tracemalloc.stop()
+
+        cache_path = Path(cache_file)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        stem = cache_path.parent / f"{cache_path.name}.profile-{time.strftime('%Y%m%dT%H%M%S')}"
+        prof_path = stem.with_name(stem.name + '.prof')
+        collapsed_path = stem.with_name(stem.name + '.collapsed')
+        summary_path = stem.with_name(stem.name + '.txt')
+
+        profiler.dump_stats(str(prof_path))
+        collapsed_path.write_text(''.join(f"{k} {v}\n" for k, v in sampler.counts.most_common()), encoding='utf-8')
+        summary_path.write_text(_hotspots(profiler, snapshot, top_n, elapsed, label), encoding='utf-8')
+        report.update({'prof': str(prof_path), 'collapsed': str(collapsed_path),
+                       'summary': str(summary_path), 'seconds': elapsed})
+        print(f"Profile written: {summary_path} (flamegraph: {collapsed_path})")
+
+
+@contextlib.contextmanager
+def maybe_profile(cache_file: str, label: Optional[str] = None):
+    """`profile_run` when TOP_LORAS_PROFILE is set and no other block is being profiled, else a no-op."""
+    if not profiling_enabled():
+        yield {}
+        return
+    if not _ACTIVE.acquire(blocking=False):
+        logger.info(f"Profiler busy; not profiling {label or Path(cache_file).name}")
+        yield {}
+        return
+    try:
+        with profile_run(cache_file, label=label) as report:
+            yield report
+    finally:
+        _ACTIVE.release()
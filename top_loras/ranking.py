@@ -0,0 +1,192 @@
+"""
+Composite ranking of models by downloads, likes and recency.
+
+A profile is a list of weighted terms `(feature, weight, transform)`; a
+model's score is the sum of `weight * transform(feature)`:
+
+  features    downloads, likes, age_days (days since `updated_at`)
+  transforms  raw, log (log1p), norm (min-max to [0, 1] over the ranked set),
+              log_norm (log1p then min-max), decay (2 ** (-age / half-life);
+              1.0 for an update today, 0 without a date)
+
+`PROFILES` holds the named profiles offered by the CLI (`--rank-profile`) and
+the UI's sort menu; `resolve_profile` also accepts an ad-hoc spec such as
+`downloads:0.6:log_norm,age_days:0.4:decay`.
+
+`Ranker(models)` extracts the feature columns once, so re-ranking a cached
+leaderboard under another profile is a few vectorized operations (NumPy when
+installed, plain Python lists otherwise) plus one stable argsort. Ties keep
+the input order.
+
+Profiles are applied at read time only: cache files always hold the top
+`limit` by downloads as `results`, plus the next best models (up to
+`pool_size(limit)` in total) as `candidates`. The refresh plans its crawl
+for `pool_size(limit)` accepted models (see `crawl.CrawlPlanner`). Known
+limits of that pool:
+
+  - it holds at most what the crawl reached: the listing is not
+    download-ordered, and `max_pages` caps the crawl, so with a low LoRA
+    yield the pool can be smaller than `pool_size(limit)`, and models on
+    later listing pages are never considered;
+  - covers are only downloaded for `results`, so candidates promoted by a
+    profile carry `cover_url` but no `cover_local`;
+  - the UI sort menu re-ranks the loaded leaderboard (`results`) only.
+"""
+import math
+import time
+from calendar import timegm
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+FEATURES = ('downloads', 'likes', 'age_days')
+TRANSFORMS = ('raw', 'log', 'norm', 'log_norm', 'decay')
+DEFAULT_PROFILE = 'downloads'
+DEFAULT_HALF_LIFE_DAYS = 30.0
+# candidate pool persisted per cache: max(limit * POOL_FACTOR, MIN_POOL) models
+POOL_FACTOR = 5
+MIN_POOL = 100
+
+Term = Tuple[str, float, str]
+
+PROFILES: Dict[str, List[Term]] = {
+    # the historical leaderboard order
+    'downloads': [('downloads', 1.0, 'raw')],
+    'likes': [('likes', 1.0, 'raw')],
+    'popular': [('downloads', 0.7, 'log_norm'), ('likes', 0.3, 'log_norm')],
+    'trending': [('downloads', 0.4, 'log_norm'), ('likes', 0.2, 'log_norm'), ('age_days', 0.4, 'decay')],
+    'fresh': [('age_days', 0.7, 'decay'), ('downloads', 0.3, 'log_norm')],
+}
+
+
+def pool_size(limit: int) -> int:
+    """Models kept per cache (leaderboard plus candidates) for profiles to re-rank."""
+    return max(limit * POOL_FACTOR, MIN_POOL)
+
+
+def is_default(profile) -> bool:
+    """True when `profile` is the plain download ranking the cache is stored in."""
+    return profile is None or profile == DEFAULT_PROFILE
+
+
+def _np():
+    # NumPy is optional and only imported when a profile is actually computed
+    try:
+        import numpy
+    except Exception:
+        return None
+    return numpy
+
+
+def resolve_profile(profile) -> List[Term]:
+    """Terms for a profile name, an ad-hoc `feature:weight[:transform],...` spec, or a term list."""
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, str):
+        if profile in PROFILES:
+            return PROFILES[profile]
+        terms = []
+        for part in profile.split(','):
+            bits = [b.strip() for b in part.split(':')]
+            if len(bits) not in (2, 3):
+                raise ValueError(f"Bad ranking term {part!r}; expected feature:weight[:transform]")
+            terms.append((bits[0], float(bits[1]), bits[2] if len(bits) == 3 else 'raw'))
+        profile = terms
+    for feature, _weight, transform in profile:
+        if feature not in FEATURES:
+            raise ValueError(f"Unknown ranking feature {feature!r}; expected one of {FEATURES}")
+        if transform not in TRANSFORMS:
+            raise ValueError(f"Unknown transform {transform!r}; expected one of {TRANSFORMS}")
+    return list(profile)
+
+
+def _timestamp(value) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value / 1000.0 if value > 1e12 else float(value)
+    if not isinstance(value, str) or len(value) < 10:
+        return None
+    try:
+        # updated_at is ISO-8601 UTC ('2025-03-07T08:19:08Z' or a bare date)
+        return float(timegm(time.strptime(value[:19].replace(' ', 'T'), '%Y-%m-%dT%H:%M:%S')))
+    except ValueError:
+        try:
+            return float(timegm(time.strptime(value[:10], '%Y-%m-%d')))
+        except ValueError:
+            return None
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+
+
+class Ranker:
+    """Feature columns of one model list, re-rankable under any profile."""
+
+    def __init__(self, models: Sequence[Dict[str, Any]], now: Optional[float] = None,
+                 half_life_days: float = DEFAULT_HALF_LIFE_DAYS):
+        now = time.time() if now is None else now
+        self.size = len(models)
+        self.half_life_days = half_life_days
+        ages = []
+        for m in models:
+            ts = _timestamp(m.get('updated_at'))
+            ages.append(max(0.0, (now - ts) / 86400.0) if ts is not None else math.nan)
+        self.columns = {
+            'downloads': [_number(m.get('downloads')) for m in models],
+            'likes': [_number(m.get('likes')) for m in models],
+            'age_days': ages,
+        }
+        self._np = _np()
+        if self._np is not None:
+            self.columns = {k: self._np.asarray(v, dtype=float) for k, v in self.columns.items()}
+
+    def _transform(self, column, transform: str):
+        np = self._np
+        if np is not None:
+            if transform == 'decay':
+                out = np.exp2(-column / self.half_life_days)
+                return np.where(np.isnan(out), 0.0, out)
+            values = np.log1p(np.maximum(column, 0.0)) if transform in ('log', 'log_norm') else column
+            if transform in ('norm', 'log_norm') and len(values):
+                lo, hi = values.min(), values.max()
+                values = (values - lo) / (hi - lo) if hi > lo else np.zeros_like(values)
+            return values
+        if transform == 'decay':
+            return [0.0 if math.isnan(a) else 2.0 ** (-a / self.half_life_days) for a in column]
+        values = [math.log1p(max(v, 0.0)) for v in column] if transform in ('log', 'log_norm') else list(column)
+        if transform in ('norm', 'log_norm') and values:
+            lo, hi = min(values), max(values)
+            values = [(v - lo) / (hi - lo) if hi > lo else 0.0 for v in values]
+        return values
+
+    def _total(self, profile):
+        total = None
+        for feature, weight, transform in resolve_profile(profile):
+            term = self._transform(self.columns[feature], transform)
+            if self._np is not None:
+                term = term * weight
+                total = term if total is None else total + term
+            else:
+                term = [weight * v for v in term]
+                total = term if total is None else [a + b for a, b in zip(total, term)]
+        if total is None:
+            return self._np.zeros(self.size) if self._np is not None else [0.0] * self.size
+        return total
+
+    def scores(self, profile=None) -> List[float]:
+        total = self._total(profile)
+        return total.tolist() if self._np is not None else total
+
+    def order(self, profile=None) -> List[int]:
+        """Positions by descending score; ties keep input order."""
+        total = self._total(profile)
+        if self._np is not None:
+            return self._np.argsort(-total, kind='stable').tolist()
+        return sorted(range(self.size), key=lambda p: -total[p])
+
+
+def rank_models(models: Sequence[Dict[str, Any]], profile=None, limit: Optional[int] = None,
+                now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """`models` re-ordered under `profile`, truncated to `limit`."""
+    order = Ranker(models, now=now).order(profile)
+    if limit is not None:
+        order = order[:limit]
+    return [models[p] for p in order]
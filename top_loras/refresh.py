@@ -0,0 +1,153 @@
+"""
+Background leaderboard refreshes for interactive callers.
+
+`REFRESHES.start(task, per_task_cache)` runs `fetcher.fetch_top_loras` on a
+background thread and returns a `RefreshJob`. Concurrent requests for the same
+(task, per_task_cache) while a job is running get that same job instead of
+starting a second crawl; across worker processes, refreshes of one cache file
+are serialized by `cache.cache_lock`. A worker that finds the lock held waits
+(up to `LOCK_WAIT_TIMEOUT` seconds) for the other refresh instead of crawling
+again, then serves the cache it wrote; if the holder does not finish in time
+the job serves the stale cache rather than hanging.
+
+Callers follow a job's progress events (see `fetch_top_loras(progress=...)`)
+with `RefreshJob.wait_events`, e.g. to stream partial results into the UI; the
+finished cache file is picked up by readers through its changed mtime.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import fetcher as fetch_module
+from . import metrics
+from .cache import cache_lock, load_cache
+
+logger = logging.getLogger(__name__)
+
+# how long a refresh waits for another process's refresh of the same cache
+LOCK_WAIT_TIMEOUT = float(os.environ.get('TOP_LORAS_REFRESH_WAIT_TIMEOUT', '300'))
+LOCK_POLL_INTERVAL = 0.5
+
+
+def _wait_for_lock(cache_file: str, timeout: float) -> bool:
+    """Poll until the refresh lock of `cache_file` is free; False if `timeout` ran out first."""
+    deadline = time.monotonic() + timeout
+    while True:
+        with cache_lock(cache_file, blocking=False) as owner:
+            if owner:
+                return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(LOCK_POLL_INTERVAL, remaining))
+
+
+class RefreshJob:
+    def __init__(self, task: Optional[str], per_task_cache: bool):
+        self.key = (task, per_task_cache)
+        self.task = task
+        self.per_task_cache = per_task_cache
+        self.status = 'running'
+        self.events: List[Dict[str, Any]] = []
+        self.results: Optional[list] = None
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status != 'running'
+
+    def emit(self, event: Dict[str, Any]):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def _finish(self, results=None, error: Optional[str] = None):
+        with self._cond:
+            self.results = results
+            self.error = error
+            self.status = 'error' if error else 'done'
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def wait_events(self, since: int = 0, timeout: Optional[float] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Events after index `since` (blocking up to `timeout` for new ones) and whether the job is done."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.events) > since or self.done, timeout=timeout)
+            return self.events[since:], self.done
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout=timeout)
+
+
+class RefreshManager:
+    """Start refresh jobs, coalescing concurrent requests per (task, per_task_cache)."""
+
+    def __init__(self, fetch: Optional[Callable[..., list]] = None):
+        self._fetch = fetch
+        self._jobs: Dict[Tuple[Optional[str], bool], RefreshJob] = {}
+        self._lock = threading.Lock()
+
+    def get(self, task: Optional[str], per_task_cache: bool = True) -> Optional[RefreshJob]:
+        with self._lock:
+            return self._jobs.get((task, per_task_cache))
+
+    def start(self, task: Optional[str], per_task_cache: bool = True, **fetch_kwargs) -> Tuple[RefreshJob, bool]:
+        """Return `(job, started)`; `started` is False when a running job was joined."""
+        key = (task, per_task_cache)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.done:
+                metrics.inc('refresh_jobs_total', result='coalesced')
+                return job, False
+            job = RefreshJob(task, per_task_cache)
+            self._jobs[key] = job
+        metrics.inc('refresh_jobs_total', result='started')
+        threading.Thread(target=self._run, args=(job, fetch_kwargs), name=f"tl-refresh-{task}",
+                         daemon=True).start()
+        return job, True
+
+    def _run(self, job: RefreshJob, fetch_kwargs: Dict[str, Any]):
+        fetch = self._fetch or fetch_module.fetch_top_loras
+        downloader = None
+        if fetch_kwargs.get('download_images', True) and 'downloader' not in fetch_kwargs:
+            from .download import SharedImageDownloader
+            downloader = SharedImageDownloader(max_workers=fetch_module.DEFAULT_IMAGE_WORKERS)
+            fetch_kwargs['downloader'] = downloader
+        from . import profiling
+
+        cache_file = (fetch_module.task_cache_paths(job.task)[0] if job.per_task_cache and job.task
+                      else fetch_module.DEFAULT_CACHE_FILE)
+        try:
+            with cache_lock(cache_file, blocking=False) as owner:
+                if owner:
+                    # TOP_LORAS_PROFILE=1 writes profile dumps next to the task cache
+                    with profiling.maybe_profile(cache_file, label=f"ui refresh task={job.task}"):
+                        results = fetch(force_refresh=True, task=job.task, per_task_cache=job.per_task_cache,
+                                        progress=job.emit, **fetch_kwargs)
+            if not owner:
+                # another worker process (or the refresh daemon) is already
+                # refreshing this cache: wait for it and serve its result
+                job.emit({'stage': 'waiting', 'cache_file': cache_file})
+                metrics.inc('refresh_jobs_total', result='waited')
+                if not _wait_for_lock(cache_file, LOCK_WAIT_TIMEOUT):
+                    logger.warning(f"Refresh of {cache_file} by another process did not finish within "
+                                   f"{LOCK_WAIT_TIMEOUT:.0f}s; serving the stale cache")
+                    metrics.inc('refresh_jobs_total', result='wait_timeout')
+                results = load_cache(cache_file, ttl=10 ** 9) or []
+        except Exception as e:
+            logger.warning(f"Refresh failed for task={job.task}: {e}")
+            job._finish(error=str(e))
+        else:
+            job._finish(results=results)
+        finally:
+            if downloader is not None:
+                downloader.close()
+
+
+REFRESHES = RefreshManager()
@@ -0,0 +1,274 @@
+"""
+Per-host hedged requests and circuit breakers.
+
+The listing client (`api.request_page`), cover downloads
+(`download.download_image`) and the inference client all send their HTTP
+calls through `call(url, fn)`, which keeps one `HostState` per host:
+
+  - `LatencyTracker`: a sliding window of successful request latencies. Once
+    it holds `min_samples`, a hedged call that is still running after the
+    host's p95 fires one duplicate request and returns whichever finishes
+    first (the loser's response is closed). Hedges are capped at
+    `HEDGE_BUDGET` of the host's requests so a slow host does not get double
+    the load. Only idempotent requests are hedged.
+  - `CircuitBreaker`: after `failure_threshold` consecutive failures
+    (exceptions or 5xx responses) the host is open and calls fail fast with
+    `CircuitOpenError` for `reset_timeout` seconds; then a single probe is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+
+Reported through `metrics`: `circuit_breaker_state{host}` (0 closed,
+1 half-open, 2 open), `circuit_breaker_trips_total{host}`,
+`circuit_rejections_total{host}`, `hedged_requests_total{host,result}` and
+`host_latency_p95_seconds{host}`; `snapshot()` returns the same per host.
+
+Tunables: TOP_LORAS_HEDGE=0 disables hedging, TOP_LORAS_BREAKER_FAILURES
+and TOP_LORAS_BREAKER_RESET set the breaker threshold and open time.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from . import metrics
+
+HEDGE_ENABLED = os.environ.get('TOP_LORAS_HEDGE', '1') != '0'
+HEDGE_BUDGET = 0.1
+MIN_HEDGE_DELAY = 0.25
+DEFAULT_WINDOW = 200
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_FAILURE_THRESHOLD = int(os.environ.get('TOP_LORAS_BREAKER_FAILURES', '5'))
+DEFAULT_RESET_TIMEOUT = float(os.environ.get('TOP_LORAS_BREAKER_RESET', '30'))
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Hedged attempts run here so the caller can wait on the first to finish
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix='tl-hedge')
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+    def __init__(self, host: str):
+        super().__init__(f"Circuit open for {host}: failing fast while the host is unhealthy")
+        self.host = host
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc or url
+
+
+def is_failure(result: Any) -> bool:
+    """Server-side failures count against a host; 4xx answers do not."""
+    status = getattr(result, 'status_code', None)
+    return isinstance(status, int) and status >= 500
+
+
+class LatencyTracker:
+    def __init__(self, window: int = DEFAULT_WINDOW, min_samples: int = DEFAULT_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._p95: Optional[float] = None
+        self._since_update = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_update += 1
+            # re-sorting the window on every sample is wasted work at listing rates
+            if self._p95 is None or self._since_update >= 10:
+                self._p95 = self._percentile(0.95)
+                self._since_update = 0
+
+    def _percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self._p95
+
+
+class CircuitBreaker:
+    def __init__(self, host: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.set_gauge('circuit_breaker_state', _STATE_GAUGE[state], host=self.host)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def release_probe(self):
+        """End a half-open probe that finished without a verdict (e.g. KeyboardInterrupt)."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+                metrics.inc('circuit_breaker_trips_total', host=self.host)
+
+
+class HostState:
+    def __init__(self, host: str):
+        self.host = host
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(host)
+        self.requests = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off for now."""
+        p95 = self.latency.p95
+        if p95 is None:
+            return None
+        with self._lock:
+            if self.hedges >= HEDGE_BUDGET * self.requests:
+                return None
+        return max(p95, MIN_HEDGE_DELAY)
+
+
+_HOSTS: Dict[str, HostState] = {}
+_HOSTS_LOCK = threading.Lock()
+
+
+def host_state(url_or_host: str) -> HostState:
+    host = host_of(url_or_host)
+    with _HOSTS_LOCK:
+        state = _HOSTS.get(host)
+        if state is None:
+            state = _HOSTS[host] = HostState(host)
+        return state
+
+
+def is_open(url: str) -> bool:
+    """True while requests to `url`'s host would be rejected (without claiming a half-open probe)."""
+    breaker = host_state(url).breaker
+    return breaker.state == OPEN and time.monotonic() - breaker.opened_at < breaker.reset_timeout
+
+
+def reset():
+    """Forget all host state (tests, or after a network change)."""
+    with _HOSTS_LOCK:
+        _HOSTS.clear()
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    with _HOSTS_LOCK:
+        states = list(_HOSTS.values())
+    return {s.host: {'state': s.breaker.state, 'failures': s.breaker.failures, 'p95': s.latency.p95,
+                     'requests': s.requests, 'hedges': s.hedges} for s in states}
+
+
+def _close_quietly(fut):
+    try:
+        close = getattr(fut.result(), 'close', None)
+    except Exception:
+        return
+    if close:
+        close()
+
+
+def _hedged(state: HostState, attempt: Callable[[], Any]):
+    delay = state.hedge_delay()
+    if delay is None:
+        return attempt()
+    primary = _HEDGE_POOL.submit(attempt)
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeout:
+        pass
+    with state._lock:
+        state.hedges += 1
+    metrics.inc('hedged_requests_total', host=state.host, result='fired')
+    backup = _HEDGE_POOL.submit(attempt)
+    pending = {primary, backup}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is not None:
+                error = error or fut.exception()
+                continue
+            if fut is backup:
+                metrics.inc('hedged_requests_total', host=state.host, result='won')
+            for loser in pending:
+                loser.add_done_callback(_close_quietly)
+            return fut.result()
+    raise error
+
+
+def call(url: str, fn: Callable[[], Any], hedge: bool = True):
+    """Run `fn()` (one HTTP request to `url`) under the host's breaker, hedging it if allowed.
+
+    Raises `CircuitOpenError` without calling `fn` while the host is open.
+    """
+    state = host_state(url)
+    if not state.breaker.allow():
+        metrics.inc('circuit_rejections_total', host=state.host)
+        raise CircuitOpenError(state.host)
+    with state._lock:
+        state.requests += 1
+
+    def _attempt():
+        started = time.perf_counter()
+        result = fn()
+        if not is_failure(result):
+            state.latency.record(time.perf_counter() - started)
+        return result
+
+    try:
+        try:
+            result = _hedged(state, _attempt) if hedge and HEDGE_ENABLED else _attempt()
+        except Exception:
+            state.breaker.record_failure()
+            raise
+        if is_failure(result):
+            state.breaker.record_failure()
+        else:
+            state.breaker.record_success()
+    finally:
+        # a BaseException skips both verdicts; never leave the host stuck half-open
+        state.breaker.release_probe()
+    if state.latency.p95 is not None:
+        metrics.set_gauge('host_latency_p95_seconds', state.latency.p95, host=state.host)
+    return result
@@ -0,0 +1,157 @@
+"""
+In-memory search/sort/facet index over one cached leaderboard.
+
+`LeaderboardIndex(models)` is built once per cache load (see
+`ui.loaders.load_model_store`) and answers queries with set operations on
+precomputed postings and sort orders instead of scanning every record:
+
+  - text search over title_cn / title_en / id / trigger_words (ASCII words
+    with prefix matching on the last query word, CJK character bigrams)
+  - sort by downloads, likes or updated_at, or by any `ranking.PROFILES`
+    composite score (computed on first use and memoized per index)
+  - facet filters on base_models, tags_en, vision_foundation and author
+
+Results are model positions (indices into the list the index was built from).
+"""
+import bisect
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from . import ranking
+
+FACETS = ('base_models', 'tags_en', 'vision_foundation', 'author')
+SORT_FIELDS = ('downloads', 'likes', 'updated_at')
+TEXT_FIELDS = ('title_cn', 'title_en', 'id', 'trigger_words')
+
+_WORD_RE = re.compile(r'[0-9a-z]+')
+_CJK_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]+')
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(v) for v in value if v not in (None, '')]
+    return [str(value)] if value != '' else []
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased ASCII words plus CJK unigrams and bigrams."""
+    text = (text or '').lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _query_terms(query: str):
+    """Split a query into (exact_terms, prefix_term)."""
+    query = (query or '').lower()
+    words = _WORD_RE.findall(query)
+    terms = []
+    for run in _CJK_RE.findall(query):
+        # bigrams are selective; a single character falls back to its unigram
+        terms.extend([run[i:i + 2] for i in range(len(run) - 1)] or [run])
+    prefix = None
+    if words and query.rstrip().endswith(words[-1]):
+        prefix = words.pop()
+    return words + terms, prefix
+
+
+class LeaderboardIndex:
+    def __init__(self, models: Sequence[Dict[str, Any]]):
+        self.size = len(models)
+        self._models = models
+        self._ranker: Optional[ranking.Ranker] = None
+        self._postings: Dict[str, Set[int]] = {}
+        self._facets: Dict[str, Dict[str, Set[int]]] = {f: {} for f in FACETS}
+        for pos, m in enumerate(models):
+            for field in TEXT_FIELDS:
+                for value in _as_list(m.get(field)):
+                    for tok in tokenize(value):
+                        self._postings.setdefault(tok, set()).add(pos)
+            for facet in FACETS:
+                for value in _as_list(m.get(facet)):
+                    self._facets[facet].setdefault(value, set()).add(pos)
+        self._vocab = sorted(self._postings)
+
+        self._orders: Dict[str, List[int]] = {}
+        self._ranks: Dict[str, List[int]] = {}
+        for field in SORT_FIELDS:
+            if field == 'updated_at':
+                # ISO-8601 strings sort chronologically; missing dates go last
+                key = lambda p, f=field: (models[p].get(f) is not None, str(models[p].get(f) or ''))
+            else:
+                key = lambda p, f=field: models[p].get(f) if isinstance(models[p].get(f), (int, float)) else 0
+            # stable sort keeps leaderboard order for ties
+            self._set_order(field, sorted(range(self.size), key=key, reverse=True))
+
+    def _set_order(self, sort: str, order: List[int]):
+        rank = [0] * self.size
+        for r, p in enumerate(order):
+            rank[p] = r
+        self._orders[sort] = order
+        self._ranks[sort] = rank
+
+    def _ensure_order(self, sort: str):
+        if sort in self._orders:
+            return
+        if sort not in ranking.PROFILES:
+            raise ValueError(f"Unknown sort {sort!r}; expected one of {SORT_FIELDS + tuple(ranking.PROFILES)}")
+        if self._ranker is None:
+            self._ranker = ranking.Ranker(self._models)
+        # benign race: concurrent callers compute the same order
+        self._set_order(sort, self._ranker.order(sort))
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        out: Set[int] = set()
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            out |= self._postings[self._vocab[i]]
+            i += 1
+        return out
+
+    def search(self, query: str = '', sort: str = 'downloads', descending: bool = True,
+               filters: Optional[Dict[str, Iterable[str]]] = None) -> List[int]:
+        """Return matching positions ordered by `sort`."""
+        self._ensure_order(sort)
+        candidates: Optional[Set[int]] = None
+
+        def _narrow(found: Set[int]):
+            nonlocal candidates
+            candidates = set(found) if candidates is None else candidates & found
+
+        terms, prefix = _query_terms(query)
+        for term in terms:
+            _narrow(self._postings.get(term, set()))
+            if not candidates:
+                return []
+        if prefix:
+            _narrow(self._prefix_matches(prefix))
+
+        for facet, values in (filters or {}).items():
+            values = _as_list(values)
+            if facet not in self._facets or not values:
+                continue
+            matched: Set[int] = set()
+            for v in values:
+                matched |= self._facets[facet].get(v, set())
+            _narrow(matched)
+
+        order = self._orders[sort]
+        if candidates is None:
+            result = list(order)
+        elif len(candidates) * 8 < self.size:
+            result = sorted(candidates, key=self._ranks[sort].__getitem__)
+        else:
+            result = [p for p in order if p in candidates]
+        if not descending:
+            result.reverse()
+        return result
+
+    def facet_values(self, facet: str, limit: Optional[int] = None) -> List[tuple]:
+        """(value, count) pairs for a facet, most common first."""
+        counts = sorted(((v, len(ps)) for v, ps in self._facets.get(facet, {}).items()),
+                        key=lambda vc: (-vc[1], vc[0]))
+        return counts[:limit] if limit else counts
@@ -0,0 +1,73 @@
+"""
+Single-flight coalescing of concurrent identical calls.
+
+`Group.do(key, fn, ...)` runs `fn` once per key at a time: callers arriving
+while a call with the same key is in flight block until it finishes and get
+its result (or its exception) instead of running `fn` again. Nothing is
+memoized afterwards; the next call after completion runs `fn` afresh.
+
+Two process-wide groups are used by the package:
+
+  FETCHES  network refreshes in `fetcher.fetch_top_loras`, keyed by
+           (tag, task, limit, page_size, max_pages, cache_file)
+  LOADS    cache parses in `ui.loaders`, keyed by cache path (and file version)
+
+so a burst of UI refreshes, dropdown loads and CLI runs for the same task
+shares one crawl and one disk parse.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from . import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.shared = 0
+
+
+class Group:
+    """Coalesce concurrent calls by key; `name` labels the group in metrics."""
+
+    def __init__(self, name: str = 'default'):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.shared += 1
+        if not leader:
+            metrics.inc('singleflight_calls_total', group=self.name, result='shared')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.inc('singleflight_calls_total', group=self.name, result='leader')
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+FETCHES = Group('fetch')
+LOADS = Group('load')
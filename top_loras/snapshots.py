@@ -0,0 +1,310 @@
+"""
+Append-only time series of leaderboard snapshots, for velocity rankings.
+
+Every `cache.save_cache` appends one snapshot of the saved models (the
+leaderboard and its candidate pool) to a small columnar store next to the
+cache file:
+
+  <cache dir>/snapshots/<cache stem>/meta.json        generation, committed row
+                                                       count, model id dictionary
+  <cache dir>/snapshots/<cache stem>/<gen>.<col>.bin   one native-endian column
+                                                       per file (`array` layout)
+
+Rows are `(ts float64, model uint32, downloads int64, likes int64)`, where
+`model` indexes `meta['ids']`, and are appended in time order. An append
+writes the column tails first and then commits the new row count in
+`meta.json`, so a crash mid-append leaves a tail that readers ignore and the
+next append truncates. `velocity` answers "downloads gained per day over the
+last N days" with one binary search for the window and per-model first/last
+rows (NumPy when installed, plain `array` loops otherwise).
+
+`compact` keeps the store small: snapshots younger than `full_days` are kept
+as is, older ones are downsampled to the last snapshot per `bucket_seconds`,
+and anything older than `max_age_days` is dropped. Compaction writes the next
+generation of column files and switches to it with one atomic `meta.json`
+replace; `record` runs it at most every `COMPACT_INTERVAL` seconds.
+
+Writers (`record`, `compact`) hold a thread lock and an inter-process file
+lock on `<store>/store.lock` (see `cache.cache_lock`), so CLI fetches, the
+refresh daemon and UI workers can append to one store concurrently. Readers
+take no lock: they only read the row count committed in `meta.json`.
+"""
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cache import cache_lock, write_atomic
+
+SNAPSHOT_SUBDIR = 'snapshots'
+META_FILE = 'meta.json'
+COLUMNS = (('ts', 'd'), ('model', 'I'), ('downloads', 'q'), ('likes', 'q'))
+DEFAULT_WINDOW_DAYS = 7.0
+# a model seen for less than this is rated over this span, so a pair of
+# snapshots minutes apart cannot extrapolate to a huge daily rate
+MIN_SPAN_DAYS = 1.0
+DEFAULT_FULL_DAYS = 14.0
+DEFAULT_BUCKET_SECONDS = 86400.0
+DEFAULT_MAX_AGE_DAYS = 365.0
+COMPACT_INTERVAL = 86400.0
+
+_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _writer_lock(d: Path):
+    # threads of this process first, then other processes sharing the store
+    with _lock, cache_lock(str(d / 'store')):
+        yield
+
+
+def _np():
+    # NumPy is optional and only imported when a query runs
+    try:
+        import numpy
+    except Exception:
+        return None
+    return numpy
+
+
+def store_dir(cache_file: str) -> Path:
+    """Snapshot directory of a cache file: `<cache dir>/snapshots/<cache stem>`."""
+    p = Path(cache_file)
+    return p.parent / SNAPSHOT_SUBDIR / p.stem
+
+
+def _read_meta(d: Path) -> Dict[str, Any]:
+    try:
+        meta = json.loads((d / META_FILE).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        meta = {}
+    meta.setdefault('generation', 0)
+    meta.setdefault('rows', 0)
+    meta.setdefault('ids', [])
+    meta.setdefault('compacted_at', None)
+    return meta
+
+
+def _column_path(d: Path, generation: int, name: str) -> Path:
+    return d / f"{generation}.{name}.bin"
+
+
+def _int(value) -> int:
+    return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def load(cache_file: str) -> Dict[str, Any]:
+    """`{'ids': [...], 'ts', 'model', 'downloads', 'likes'}` with each column an `array` of committed rows."""
+    d = store_dir(cache_file)
+    meta = _read_meta(d)
+    out: Dict[str, Any] = {'ids': meta['ids']}
+    for name, typecode in COLUMNS:
+        col = array(typecode)
+        path = _column_path(d, meta['generation'], name)
+        if meta['rows']:
+            with open(path, 'rb') as f:
+                col.fromfile(f, meta['rows'])
+        out[name] = col
+    return out
+
+
+def _append(d: Path, meta: Dict[str, Any], columns: Dict[str, array]):
+    rows = meta['rows']
+    for name, typecode in COLUMNS:
+        path = _column_path(d, meta['generation'], name)
+        with open(path, 'ab') as f:
+            # drop a tail left by an append that crashed before committing
+            f.truncate(rows * array(typecode).itemsize)
+            columns[name].tofile(f)
+    meta['rows'] = rows + len(columns['ts'])
+    write_atomic(d / META_FILE, json.dumps(meta, ensure_ascii=False))
+
+
+def record(cache_file: str, models: Iterable[Dict[str, Any]], ts: Optional[float] = None) -> int:
+    """Append one snapshot of `models` (one row per distinct id); returns the rows written."""
+    ts = time.time() if ts is None else ts
+    d = store_dir(cache_file)
+    d.mkdir(parents=True, exist_ok=True)
+    with _writer_lock(d):
+        meta = _read_meta(d)
+        if meta['rows']:
+            # rows must stay time-ordered for the binary searches, even if the clock steps back
+            with open(_column_path(d, meta['generation'], 'ts'), 'rb') as f:
+                f.seek((meta['rows'] - 1) * array('d').itemsize)
+                last = array('d')
+                last.fromfile(f, 1)
+            ts = max(ts, last[0])
+        positions = {mid: i for i, mid in enumerate(meta['ids'])}
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        seen = set()
+        for m in models:
+            mid = m.get('id') if isinstance(m, dict) else None
+            if not mid or mid in seen:
+                continue
+            seen.add(mid)
+            if mid not in positions:
+                positions[mid] = len(meta['ids'])
+                meta['ids'].append(mid)
+            columns['ts'].append(ts)
+            columns['model'].append(positions[mid])
+            columns['downloads'].append(_int(m.get('downloads')))
+            columns['likes'].append(_int(m.get('likes')))
+        if columns['ts']:
+            _append(d, meta, columns)
+        compacted_at = meta['compacted_at']
+        if compacted_at is None:
+            meta['compacted_at'] = ts
+            write_atomic(d / META_FILE, json.dumps(meta, ensure_ascii=False))
+        elif ts - compacted_at >= COMPACT_INTERVAL:
+            _compact(d, meta, now=ts)
+    return len(columns['ts'])
+
+
+def _keep_timestamps(timestamps: List[float], now: float, full_days: float, bucket_seconds: float,
+                     max_age_days: float) -> set:
+    keep = set()
+    last_in_bucket: Dict[int, float] = {}
+    for t in timestamps:
+        age = now - t
+        if age > max_age_days * 86400.0:
+            continue
+        if age <= full_days * 86400.0:
+            keep.add(t)
+        else:
+            bucket = int(t // bucket_seconds)
+            last_in_bucket[bucket] = max(t, last_in_bucket.get(bucket, t))
+    return keep | set(last_in_bucket.values())
+
+
+def _compact(d: Path, meta: Dict[str, Any], now: float, full_days: float = DEFAULT_FULL_DAYS,
+             bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+             max_age_days: float = DEFAULT_MAX_AGE_DAYS) -> Dict[str, int]:
+    old_gen = meta['generation']
+    data = {}
+    for name, typecode in COLUMNS:
+        col = array(typecode)
+        if meta['rows']:
+            with open(_column_path(d, old_gen, name), 'rb') as f:
+                col.fromfile(f, meta['rows'])
+        data[name] = col
+    keep = _keep_timestamps(sorted(set(data['ts'])), now, full_days, bucket_seconds, max_age_days)
+    rows = [i for i, t in enumerate(data['ts']) if t in keep]
+
+    # ids no longer referenced are dropped and the rest renumbered
+    remap: Dict[int, int] = {}
+    ids: List[str] = []
+    for i in rows:
+        old = data['model'][i]
+        if old not in remap:
+            remap[old] = len(ids)
+            ids.append(meta['ids'][old])
+
+    new_gen = old_gen + 1
+    for name, typecode in COLUMNS:
+        if name == 'model':
+            col = array(typecode, (remap[data['model'][i]] for i in rows))
+        else:
+            col = array(typecode, (data[name][i] for i in rows))
+        with open(_column_path(d, new_gen, name), 'wb') as f:
+            col.tofile(f)
+    stats = {'rows_before': meta['rows'], 'rows': len(rows), 'snapshots': len(keep)}
+    meta.update(generation=new_gen, rows=len(rows), ids=ids, compacted_at=now)
+    write_atomic(d / META_FILE, json.dumps(meta, ensure_ascii=False))
+    for name, _typecode in COLUMNS:
+        try:
+            os.remove(_column_path(d, old_gen, name))
+        except FileNotFoundError:
+            pass
+    return stats
+
+
+def compact(cache_file: str, now: Optional[float] = None, full_days: float = DEFAULT_FULL_DAYS,
+            bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+            max_age_days: float = DEFAULT_MAX_AGE_DAYS) -> Dict[str, int]:
+    """Apply retention and downsampling to a cache's snapshots; returns row counts before/after."""
+    d = store_dir(cache_file)
+    if not (d / META_FILE).exists():
+        return {'rows_before': 0, 'rows': 0, 'snapshots': 0}
+    with _writer_lock(d):
+        if not (d / META_FILE).exists():
+            return {'rows_before': 0, 'rows': 0, 'snapshots': 0}
+        return _compact(d, _read_meta(d), time.time() if now is None else now, full_days=full_days,
+                        bucket_seconds=bucket_seconds, max_age_days=max_age_days)
+
+
+def _first_last(model, lo: int, hi: int):
+    """{model: (first row, last row)} over rows [lo, hi) (rows are time-ordered)."""
+    spans: Dict[int, List[int]] = {}
+    for i in range(lo, hi):
+        span = spans.get(model[i])
+        if span is None:
+            spans[model[i]] = [i, i]
+        else:
+            span[1] = i
+    return spans
+
+
+def velocity(cache_file: str, days: float = DEFAULT_WINDOW_DAYS, now: Optional[float] = None,
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Models by downloads gained per day over the last `days` days, fastest first.
+
+    The baseline of each model is its value in the last snapshot at or
+    before the window start (or its first snapshot inside the window), so
+    downsampled history still spans the whole window. Each entry has `id`,
+    `downloads`, `likes` (latest), `delta_downloads`, `delta_likes`,
+    `downloads_per_day` and `days` (the span rated, at least `MIN_SPAN_DAYS`).
+    """
+    now = time.time() if now is None else now
+    data = load(cache_file)
+    ts = data['ts']
+    if not ts:
+        return []
+    np = _np()
+    start = now - days * 86400.0
+    if np is not None:
+        cols = {name: np.frombuffer(data[name], dtype=np.dtype(typecode)) for name, typecode in COLUMNS}
+        t = cols['ts']
+        base = int(np.searchsorted(t, start, side='right')) - 1
+        lo = int(np.searchsorted(t, t[base], side='left')) if base >= 0 else int(np.searchsorted(t, start))
+        hi = int(np.searchsorted(t, now, side='right'))
+        if hi <= lo:
+            return []
+        model = cols['model'][lo:hi]
+        uniq, first = np.unique(model, return_index=True)
+        last = len(model) - 1 - np.unique(model[::-1], return_index=True)[1]
+        first, last = first + lo, last + lo
+        delta = cols['downloads'][last] - cols['downloads'][first]
+        delta_likes = cols['likes'][last] - cols['likes'][first]
+        span = np.maximum((t[last] - t[first]) / 86400.0, MIN_SPAN_DAYS)
+        rate = delta / span
+        order = np.argsort(-rate, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        return [{'id': data['ids'][int(uniq[k])], 'downloads': int(cols['downloads'][last[k]]),
+                 'likes': int(cols['likes'][last[k]]), 'delta_downloads': int(delta[k]),
+                 'delta_likes': int(delta_likes[k]), 'downloads_per_day': float(rate[k]), 'days': float(span[k])}
+                for k in order.tolist()]
+
+    base = bisect.bisect_right(ts, start) - 1
+    lo = bisect.bisect_left(ts, ts[base]) if base >= 0 else bisect.bisect_left(ts, start)
+    hi = bisect.bisect_right(ts, now)
+    out = []
+    # sorted by model number, matching np.unique, so ties order identically
+    for mid, (first, last) in sorted(_first_last(data['model'], lo, hi).items()):
+        span = max((ts[last] - ts[first]) / 86400.0, MIN_SPAN_DAYS)
+        delta = data['downloads'][last] - data['downloads'][first]
+        out.append({'id': data['ids'][mid], 'downloads': data['downloads'][last], 'likes': data['likes'][last],
+                    'delta_downloads': delta, 'delta_likes': data['likes'][last] - data['likes'][first],
+                    'downloads_per_day': delta / span, 'days': span})
+    out.sort(key=lambda r: -r['downloads_per_day'])
+    return out[:limit] if limit is not None else out
+
+
+def timestamps(cache_file: str) -> List[float]:
+    """Distinct snapshot times stored for a cache, oldest first."""
+    return sorted(set(load(cache_file)['ts']))
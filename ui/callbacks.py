@@ -172,7 +172,8 @@ def do_generate(model, model_id, prompt_text, neg_text, size_v, steps_v, guidanc
     imgs = []
     try:
         if isinstance(result, dict):
-            images_field = result.get("images")
+            # Prefer the locally downloaded copies; fall back to remote URLs
+            images_field = result.get("images_local") or result.get("images")
             if isinstance(images_field, (list, tuple)):
                 imgs = [i for i in images_field if isinstance(i, str)]
             elif isinstance(result.get("image"), str):
@@ -1,19 +1,36 @@
 from pathlib import Path
 from base64 import b64decode
+from collections import OrderedDict
+import html
 import json
-import os
+import math
+import threading
 from typing import Any, Iterable, Optional
 
 from top_loras import cache as tl_cache
-import fetch_top_models as fetch_module
+from top_loras import fetcher as fetch_module
+from top_loras import gallery as tl_gallery
+from top_loras import image_cache as tl_image_cache
+from top_loras import ranking
+from top_loras import singleflight
 from top_loras.download import sanitize_filename
+from top_loras.search import FACETS, SORT_FIELDS, LeaderboardIndex
 
 # Tiny transparent PNG data URI as fallback placeholder used by the UI
 _PLACEHOLDER_DATA_URI = (
-    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAAWgmWQ0AAAAASUVORK5CYII="
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNgYGBgAAAABQABeqhXUAAAAABJRU5ErkJggg=="
 )
 _PLACEHOLDER_PATH: Optional[str] = None
 
+DEFAULT_PAGE_SIZE = 24
+PAGE_SIZE_CHOICES = [12, 24, 48, 96]
+
+# Server-side model store: cache_file -> normalized models, rebuilt only when
+# the cache file's (mtime, size) changes. The browser only ever receives the
+# (cover, title) tuples of the visible page; full records are looked up here.
+_MODEL_STORE: dict[str, dict[str, Any]] = {}
+_MODEL_STORE_LOCK = threading.Lock()
+
 
 def get_cache_path(task: Optional[str], per_task_cache: bool = True) -> str:
     default = fetch_module.DEFAULT_CACHE_FILE
@@ -24,6 +41,11 @@ def get_cache_path(task: Optional[str], per_task_cache: bool = True) -> str:
 
 
 def load_results_from_cache(cache_file: str) -> list[dict[str, Any]]:
+    # concurrent loads of one file share a single parse
+    return singleflight.LOADS.do(("results", cache_file), _read_results, cache_file)
+
+
+def _read_results(cache_file: str) -> list[dict[str, Any]]:
     try:
         results = tl_cache.load_cache(cache_file, ttl=60 * 60 * 24 * 365)
         return results or []
@@ -39,13 +61,7 @@ def load_results_from_cache(cache_file: str) -> list[dict[str, Any]]:
         return results or []
 
 
-def _resolve_cover_uri(raw_cover: Optional[str]) -> Optional[str]:
-    if not raw_cover:
-        return None
-    candidate = Path(raw_cover)
-    if candidate.exists():
-        return str(candidate)
-    return raw_cover
+_BROWSER_URL = ("http://", "https://", "data:")
 
 
 def _ensure_placeholder_image() -> str:
@@ -80,26 +96,10 @@ def sanitize_models(models: Iterable[dict[str, Any]] | None) -> tuple[list[dict[
         if not isinstance(model, dict):
             continue
 
-        cover_uri = (
-            _resolve_cover_uri(model.get("cover_local"))
-            or _resolve_cover_uri(model.get("cover"))
-            or _resolve_cover_uri(model.get("cover_url"))
-            or _ensure_placeholder_image()
-        )
-
-        title = (
-            model.get("title_cn")
-            or model.get("title_en")
-            or model.get("title")
-            or model.get("id")
-            or f"Model {idx + 1}"
-        )
-
-        normalized_model = {
-            **model,
-            "title": title,
-            "cover": cover_uri,
-        }
+        normalized_model = tl_gallery.normalize_model(model, idx)
+        if not normalized_model["cover"]:
+            normalized_model["cover"] = _ensure_placeholder_image()
+        title = normalized_model["title"]
 
         normalized.append(normalized_model)
         gallery_items.append(
@@ -107,80 +107,166 @@ def sanitize_models(models: Iterable[dict[str, Any]] | None) -> tuple[list[dict[
                 "idx": idx,
                 "id": normalized_model.get("id"),
                 "title": title,
-                "cover": cover_uri or _ensure_placeholder_image(),
+                "cover": normalized_model["cover"],
             }
         )
 
     return normalized, gallery_items
 
 
-def render_markdown_for_models(models: Iterable[dict[str, Any]] | None) -> str:
-    if not models:
-        return "<div class='empty'>No cached results found. Try <b>Refresh</b> to fetch data.</div>"
+_file_version = tl_gallery.file_version
 
-    cards: list[str] = []
 
-    for model in models:
-        if not isinstance(model, dict):
+def model_key(model: dict[str, Any], idx: int) -> str:
+    """Stable lookup key for a cached model (its id, or its position when id is missing)."""
+    mid = model.get("id")
+    return str(mid) if mid else f"#{idx}"
+
+
+def load_model_store(cache_file: str) -> dict[str, Any]:
+    """Return the normalized models for ``cache_file``, reloading only when it changed.
+
+    The store has ``version``, ``order`` (model keys in leaderboard order),
+    ``by_key`` (full normalized records) and ``cards`` (per-key cover/title).
+    """
+    version = _file_version(cache_file)
+    with _MODEL_STORE_LOCK:
+        entry = _MODEL_STORE.get(cache_file)
+        if entry is not None and entry["version"] == version:
+            return entry
+    # a burst of callers after a refresh builds the new store once
+    return singleflight.LOADS.do(("store", cache_file, version), _build_model_store, cache_file, version)
+
+
+def _build_model_store(cache_file: str, version) -> dict[str, Any]:
+    # Fast path: the precomputed gallery written at refresh time (one read, no
+    # per-model stat calls); fall back to normalizing the cache itself.
+    normalized = tl_gallery.load_gallery(cache_file, version) if version is not None else None
+    if normalized is not None:
+        gallery_items = []
+        for idx, model in enumerate(normalized):
+            if not model.get("cover"):
+                model["cover"] = _ensure_placeholder_image()
+            gallery_items.append({"idx": idx, "id": model.get("id"), "title": model["title"], "cover": model["cover"]})
+    else:
+        models = load_results_from_cache(cache_file) if version is not None else []
+        normalized, gallery_items = sanitize_models(models)
+    order: list[str] = []
+    by_key: dict[str, dict[str, Any]] = {}
+    cards: dict[str, dict[str, Any]] = {}
+    for model, item in zip(normalized, gallery_items):
+        key = model_key(model, item["idx"])
+        if key in by_key:
             continue
+        order.append(key)
+        by_key[key] = model
+        cards[key] = {"cover": item.get("cover"), "title": item.get("title")}
+
+    entry = {"version": version, "order": order, "by_key": by_key, "cards": cards, "index": None}
+    with _MODEL_STORE_LOCK:
+        _MODEL_STORE[cache_file] = entry
+    return entry
 
-        title = (
-            model.get("title_cn")
-            or model.get("title_en")
-            or model.get("title")
-            or model.get("id")
-            or "Unknown model"
-        )
-        cover_uri = (
-            _resolve_cover_uri(model.get("cover"))
-            or _resolve_cover_uri(model.get("cover_local"))
-            or _resolve_cover_uri(model.get("cover_url"))
-            or _ensure_placeholder_image()
-        )
-        author = model.get("author") or "Unknown"
-        downloads = model.get("downloads") or 0
-        likes = model.get("likes") or 0
-        description = model.get("description") or ""
-
-        if cover_uri:
-            image_html = f"<img src='{cover_uri}' alt='{title}' loading='lazy'/>"
-        else:
-            image_html = "<div class='card-placeholder'>No cover</div>"
-
-        truncated_desc = description[:160]
-        if description and len(description) > 160:
-            truncated_desc += "…"
-
-        cards.append(
-            """
-            <div class='tl-card'>
-                <div class='tl-card-image'>%s</div>
-                <div class='tl-card-body'>
-                    <div class='tl-card-title'>%s</div>
-                    <div class='tl-card-meta'>
-                        <span>ID: %s</span>
-                        <span>Author: %s</span>
-                    </div>
-                    <div class='tl-card-stats'>
-                        <span>Downloads: %s</span>
-                        <span>Likes: %s</span>
-                    </div>
-                    <div class='tl-card-desc'>%s</div>
-                </div>
-            </div>
-            """
-            % (
-                image_html,
-                title,
-                model.get("id", "n/a"),
-                author,
-                downloads,
-                likes,
-                truncated_desc,
-            )
-        )
 
-    css = """
+def search_index(cache_file: str) -> LeaderboardIndex:
+    """Return the search index for ``cache_file``, built once per store version."""
+    store = load_model_store(cache_file)
+    index = store["index"]
+    if index is None:
+        index = LeaderboardIndex([store["by_key"][k] for k in store["order"]])
+        # benign race: two builders produce equivalent indexes for one version
+        store["index"] = index
+    return index
+
+
+def _is_default_query(query: Optional[dict[str, Any]]) -> bool:
+    if not query:
+        return True
+    return (
+        not (query.get("text") or "").strip()
+        and query.get("sort", "downloads") == "downloads"
+        and not any((query.get("filters") or {}).values())
+    )
+
+
+def search_keys(cache_file: str, query: Optional[dict[str, Any]]) -> Optional[list[str]]:
+    """Model keys matching ``query`` ({"text", "sort", "filters"}) in result order.
+
+    ``sort`` is a field in ``SORT_FIELDS`` or a ``ranking.PROFILES`` name.
+
+    Returns None for the default query (full leaderboard, download order).
+    """
+    if _is_default_query(query):
+        return None
+    store = load_model_store(cache_file)
+    sort = query.get("sort") or "downloads"
+    if sort not in SORT_FIELDS and sort not in ranking.PROFILES:
+        sort = "downloads"
+    positions = search_index(cache_file).search(query.get("text") or "", sort=sort, filters=query.get("filters"))
+    order = store["order"]
+    return [order[p] for p in positions]
+
+
+def facet_choices(cache_file: str, facet: str, limit: int = 50) -> list[str]:
+    """Most common values of ``facet`` in the cached leaderboard (for filter dropdowns)."""
+    if facet not in FACETS:
+        return []
+    return [value for value, _count in search_index(cache_file).facet_values(facet, limit=limit)]
+
+
+def gallery_page(
+    cache_file: str,
+    page: int = 0,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    keys: Optional[list[str]] = None,
+    query: Optional[dict[str, Any]] = None,
+) -> tuple[list[tuple[Any, Any]], dict[str, Any]]:
+    """Return ``(gallery_items, page_state)`` for one page of a cached leaderboard.
+
+    ``keys`` restricts/reorders the models explicitly; otherwise ``query`` (see
+    ``search_keys``) is run against the cached search index. Both default to
+    the full leaderboard. ``page_state`` carries only what later events need
+    to resolve records server-side: cache file, query, paging info and the
+    keys shown.
+    """
+    store = load_model_store(cache_file)
+    if keys is None and query:
+        keys = search_keys(cache_file, query)
+    order = store["order"] if keys is None else [k for k in keys if k in store["cards"]]
+    page_size = max(1, int(page_size or DEFAULT_PAGE_SIZE))
+    total = len(order)
+    pages = max(1, math.ceil(total / page_size))
+    page = min(max(0, int(page or 0)), pages - 1)
+    page_keys = order[page * page_size:(page + 1) * page_size]
+    items = [(store["cards"][k]["cover"], store["cards"][k]["title"]) for k in page_keys]
+    for k in page_keys:
+        # recency for the cover LRU (buffered in memory, flushed periodically)
+        tl_image_cache.touch(store["by_key"][k].get("cover_local"))
+    state = {
+        "cache_file": cache_file,
+        "query": query,
+        "page": page,
+        "page_size": page_size,
+        "pages": pages,
+        "total": total,
+        "keys": page_keys,
+    }
+    return items, state
+
+
+def resolve_models(cache_file: str, keys: Iterable[str]) -> list[dict[str, Any]]:
+    """Look up full normalized records by key from the server-side store."""
+    by_key = load_model_store(cache_file)["by_key"]
+    return [by_key[k] for k in keys if k in by_key]
+
+
+def page_label(state: Optional[dict[str, Any]]) -> str:
+    if not state or not state.get("total"):
+        return "No models"
+    return f"Page {state['page'] + 1} / {state['pages']} · {state['total']} models"
+
+
+_CARD_CSS = """
 <style>
 body { background-color: #111322; color: #d9e0ee; font-family: Inter, system-ui, -apple-system, "Segoe UI", sans-serif; }
 .tl-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(240px, 1fr)); gap: 16px; margin-top: 12px; }
@@ -196,13 +282,154 @@ body { background-color: #111322; color: #d9e0ee; font-family: Inter, system-ui,
 </style>
 """
 
-    body = """
-<div class='tl-grid'>
-%s
-</div>
-""" % ("\n".join(cards))
+_EMPTY_HTML = "<div class='empty'>No cached results found. Try <b>Refresh</b> to fetch data.</div>"
+
+# Rendered card fragments keyed by what a card shows, so re-rendering after a
+# refresh only rebuilds changed entries; assembled grids keyed by the caller's
+# version (e.g. cache file + mtime). Both are bounded LRUs.
+_CARD_CACHE_MAX = 2048
+_GRID_CACHE_MAX = 16
+_CARD_CACHE: "OrderedDict[tuple, str]" = OrderedDict()
+_GRID_CACHE: "OrderedDict[Any, str]" = OrderedDict()
+_RENDER_LOCK = threading.Lock()
+
+
+def _lru_get(cache: OrderedDict, key):
+    with _RENDER_LOCK:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _lru_put(cache: OrderedDict, key, value, max_size: int):
+    with _RENDER_LOCK:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+def _card_key(model: dict[str, Any]) -> tuple:
+    # downloads/likes change between refreshes without touching updated_at
+    return (
+        model.get("id"),
+        model.get("updated_at"),
+        model.get("cover"),
+        model.get("cover_local"),
+        model.get("cover_url"),
+        model.get("downloads"),
+        model.get("likes"),
+        model.get("cover_width"),
+        model.get("cover_height"),
+        model.get("cover_lqip"),
+    )
+
+
+def _render_card(model: dict[str, Any]) -> str:
+    title = (
+        model.get("title_cn")
+        or model.get("title_en")
+        or model.get("title")
+        or model.get("id")
+        or "Unknown model"
+    )
+    # The browser loads card images itself and cannot reach paths on this
+    # server, so cards use the remote cover; the local copy still provides the
+    # dimensions and LQIP shown while it loads.
+    cover_uri = next(
+        (c for c in (model.get("cover_url"), model.get("cover")) if isinstance(c, str) and c.startswith(_BROWSER_URL)),
+        None,
+    )
+    description = model.get("description") or ""
+    truncated_desc = description[:160]
+    if len(description) > 160:
+        truncated_desc += "…"
+
+    esc = html.escape
+    # Known dimensions reserve the cover's aspect ratio (clamped so one odd
+    # cover cannot stretch its grid row) and the LQIP shows until it loads.
+    width, height = model.get("cover_width"), model.get("cover_height")
+    sized = isinstance(width, int) and isinstance(height, int) and width > 0 and height > 0
+    box_style = ""
+    if sized:
+        box_style += f"padding-top:{min(max(height / width, 0.5), 1.5) * 100:.2f}%;"
+    lqip = model.get("cover_lqip")
+    if isinstance(lqip, str) and lqip.startswith("data:image/jpeg;base64,"):
+        box_style += f"background-image:url({lqip});background-size:cover;background-position:center;"
+    if cover_uri:
+        size_attrs = f" width='{width}' height='{height}'" if sized else ""
+        image_html = f"<img src='{esc(str(cover_uri))}' alt='{esc(str(title))}'{size_attrs} loading='lazy'/>"
+    else:
+        image_html = "<div class='card-placeholder'>No cover</div>"
+    box_attr = f" style='{esc(box_style)}'" if box_style else ""
+
+    return (
+        "<div class='tl-card'>"
+        f"<div class='tl-card-image'{box_attr}>{image_html}</div>"
+        "<div class='tl-card-body'>"
+        f"<div class='tl-card-title'>{esc(str(title))}</div>"
+        "<div class='tl-card-meta'>"
+        f"<span>ID: {esc(str(model.get('id', 'n/a')))}</span>"
+        f"<span>Author: {esc(str(model.get('author') or 'Unknown'))}</span>"
+        "</div>"
+        "<div class='tl-card-stats'>"
+        f"<span>Downloads: {esc(str(model.get('downloads') or 0))}</span>"
+        f"<span>Likes: {esc(str(model.get('likes') or 0))}</span>"
+        "</div>"
+        f"<div class='tl-card-desc'>{esc(truncated_desc)}</div>"
+        "</div>"
+        "</div>"
+    )
+
+
+def render_markdown_for_models(models: Iterable[dict[str, Any]] | None, version: Any = None) -> str:
+    """Render models as an HTML card grid (all text HTML-escaped).
+
+    Card fragments are memoized per model content; when ``version`` is given
+    (see ``card_page``) the assembled grid is memoized too.
+    """
+    if version is not None:
+        cached = _lru_get(_GRID_CACHE, version)
+        if cached is not None:
+            return cached
+    if not models:
+        return _EMPTY_HTML
+
+    cards: list[str] = []
+    for model in models:
+        if not isinstance(model, dict):
+            continue
+        key = _card_key(model)
+        card = _lru_get(_CARD_CACHE, key)
+        if card is None:
+            card = _render_card(model)
+            _lru_put(_CARD_CACHE, key, card, _CARD_CACHE_MAX)
+        cards.append(card)
+
+    rendered = _CARD_CSS + "\n<div class='tl-grid'>\n" + "\n".join(cards) + "\n</div>\n"
+    if version is not None:
+        _lru_put(_GRID_CACHE, version, rendered, _GRID_CACHE_MAX)
+    return rendered
+
 
-    return css + body
+def card_page(state: Optional[dict[str, Any]]) -> str:
+    """Card grid for the page described by a ``gallery_page`` state (the UI's Cards view).
+
+    Cards show stats, reserve each cover's aspect ratio and show its LQIP
+    while it loads. The grid is memoized by (cache file, store version, page
+    keys), so paging back and forth re-renders nothing.
+    """
+    if not state or not state.get("keys"):
+        return _EMPTY_HTML
+    cache_file = state["cache_file"]
+    keys = tuple(state["keys"])
+    store = load_model_store(cache_file)
+    version = (cache_file, store["version"], keys)
+    cached = _lru_get(_GRID_CACHE, version)
+    if cached is not None:
+        return cached
+    return render_markdown_for_models(resolve_models(cache_file, keys), version=version)
 
 
 def _tasks_from_presets() -> list[str]:
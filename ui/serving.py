@@ -0,0 +1,120 @@
+"""Production serving for the Top-LoRAs Gradio app.
+
+Queue concurrency is set per event type:
+
+  select    gallery selection, paging, search/sort/facets, task switch (cheap)
+  generate  remote image generation (slow, bounded by the inference API)
+  refresh   cache refreshes (one crawl at a time per worker)
+
+Defaults can be overridden with TOP_LORAS_CONCURRENCY_<TYPE> (e.g.
+TOP_LORAS_CONCURRENCY_GENERATE=8) or from the command line.
+
+`serve(workers=N)` starts N independent Gradio servers on ports
+`port .. port + N - 1`; it does not balance load itself. Clients must reach
+them through a reverse proxy that pins each browser to one worker (sticky
+sessions). A page's queue connection, `gr.State` values (page state, selected
+model, session token) and streamed refresh progress live only in the worker
+that served the page. A request routed to another worker fails or sees
+empty state. With nginx, for example:
+
+  upstream top_loras { ip_hash; server 127.0.0.1:7860; server 127.0.0.1:7861; }
+  location / { proxy_pass http://top_loras; proxy_http_version 1.1;
+               proxy_set_header Upgrade $http_upgrade; proxy_set_header Connection "upgrade";
+               proxy_buffering off; }
+
+(`ip_hash` or a cookie hash; buffering off so progress events stream.)
+
+Workers share nothing in memory: each one reads the cache files and their
+precomputed gallery payloads, reloading when a file's mtime changes, and
+refreshes of one cache file are serialized across workers by
+`top_loras.cache.cache_lock`.
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+from typing import Any, Optional
+
+EVENT_TYPES = ("select", "generate", "refresh")
+DEFAULT_CONCURRENCY = {"select": 32, "generate": 4, "refresh": 1}
+CONCURRENCY_ENV = "TOP_LORAS_CONCURRENCY_{}"
+QUEUE_SIZE_ENV = "TOP_LORAS_QUEUE_SIZE"
+DEFAULT_QUEUE_SIZE = 128
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7860
+
+
+def concurrency_limits(overrides: Optional[dict[str, Any]] = None) -> dict[str, int]:
+    """Per-event-type concurrency: explicit overrides, then env settings, then defaults."""
+    limits = {}
+    for event in EVENT_TYPES:
+        value = (overrides or {}).get(event)
+        if value is None:
+            value = os.environ.get(CONCURRENCY_ENV.format(event.upper())) or DEFAULT_CONCURRENCY[event]
+        limits[event] = max(1, int(value))
+    return limits
+
+
+def queue_size(value: Optional[int] = None) -> int:
+    if value is None:
+        value = os.environ.get(QUEUE_SIZE_ENV) or DEFAULT_QUEUE_SIZE
+    return max(1, int(value))
+
+
+def _worker(host: str, port: int, concurrency: Optional[dict[str, Any]], max_queue: Optional[int]) -> None:
+    import app
+
+    app.build_ui(concurrency=concurrency, queue_size=max_queue, server_name=host, server_port=port)
+
+
+def serve(
+    workers: int = 1,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    concurrency: Optional[dict[str, Any]] = None,
+    max_queue: Optional[int] = None,
+) -> None:
+    """Serve the UI from ``workers`` processes on ports ``port .. port + workers - 1``."""
+    if workers <= 1:
+        _worker(host, port, concurrency, max_queue)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    procs: dict[int, Any] = {}
+    stopping = False
+
+    def _start(worker_port: int):
+        proc = ctx.Process(
+            target=_worker,
+            args=(host, worker_port, concurrency, max_queue),
+            name=f"top-loras-ui-{worker_port}",
+        )
+        proc.start()
+        procs[worker_port] = proc
+
+    def _stop(_signum=None, _frame=None):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for i in range(workers):
+        _start(port + i)
+    print(f"Serving {workers} workers on http://{host}:{port}-{port + workers - 1} "
+          "(route browsers through a reverse proxy with sticky sessions; see ui/serving.py)")
+
+    try:
+        while not stopping:
+            time.sleep(1.0)
+            for worker_port, proc in list(procs.items()):
+                if not proc.is_alive() and not stopping:
+                    print(f"[warn] worker on port {worker_port} exited ({proc.exitcode}); restarting")
+                    _start(worker_port)
+    finally:
+        for proc in procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        for proc in procs.values():
+            proc.join(timeout=10)